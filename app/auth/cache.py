@@ -0,0 +1,76 @@
+# app/auth/cache.py
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+from app.config.config import settings
+
+class PrincipalCache:
+    """
+    Caché LRU con TTL de usuarios autenticados, indexada por token.
+
+    Guarda el usuario ya desacoplado de la sesión (con rol y permisos cargados)
+    para que las peticiones protegidas no consulten la base de datos.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: int = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # token -> (expira_en, usuario)
+        self._tokens_by_user = {}      # user_id -> set(tokens)
+        self._lock = threading.Lock()
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def set(self, token: str, user, token_exp: Optional[float] = None):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        # Nunca mantener al usuario más allá de la expiración del propio token
+        if token_exp is not None:
+            expires_at = min(expires_at, float(token_exp))
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+            self._entries[token] = (expires_at, user)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                oldest_token = next(iter(self._entries))
+                self._remove(oldest_token)
+
+    def invalidate_user(self, user_id: int):
+        """Eliminar todas las entradas de un usuario (tras actualizarlo, borrarlo o cambiar su rol)"""
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, token: str):
+        _, user = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+principal_cache = PrincipalCache(
+    max_entries=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
@@ -3,6 +3,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.config.database import get_db
 from app.auth.utils import get_current_user
+from app.auth.permissions import permission_registry
+from app.auth.cache import principal_cache
+from app.config.executors import run_db
 from app.models.user import User
 from app.models.role import Role
 from app.models.permission import Permission
@@ -36,7 +39,7 @@ async def get_admin_user(current_user: User = Depends(get_current_active_user)):
     """
     Dependencia para verificar que el usuario es admin
     """
-    if not any(role.name == "administrador" for role in current_user.roles):
+    if not current_user.role or current_user.role.name != "administrador":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de administrador"
@@ -47,7 +50,7 @@ async def get_gerente_user(current_user: User = Depends(get_current_active_user)
     """
     Dependencia para verificar que el usuario es gerente
     """
-    if not any(role.name == "gerente" for role in current_user.roles):
+    if not current_user.role or current_user.role.name != "gerente":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos de gerente"
@@ -68,7 +71,11 @@ async def get_current_active_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user = get_current_user(credentials.credentials, db)
+    # Con la caché caliente no hay trabajo bloqueante; si no, la consulta
+    # se hace en el pool de BD para no bloquear el event loop
+    user = principal_cache.get(credentials.credentials)
+    if user is None:
+        user = await run_db(get_current_user, credentials.credentials, db)
     
     if not user:
         raise HTTPException(
@@ -105,13 +112,11 @@ async def check_permission(permission_name: str, current_user: User = Depends(ge
     """
     Dependencia para verificar si el usuario tiene un permiso específico
     """
-    # Verificar si el usuario tiene el permiso en su rol
-    has_permission = any(
-        permission.name == permission_name 
-        for permission in current_user.role.permissions
-    )
+    if permission_registry.is_stale():
+        await run_db(permission_registry.ensure_loaded)
     
-    if not has_permission:
+    # Verificar el permiso contra la máscara compilada del rol (sin consultar la BD)
+    if not permission_registry.has_permission(current_user, permission_name):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"No tienes el permiso: {permission_name}"
@@ -128,21 +133,15 @@ async def can_view_reports(current_user: User = Depends(get_current_active_user)
     """Verificar permiso para ver reportes"""
     return await check_permission("reports.view", current_user)
 
-def can_manage_products(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
+def can_manage_products(current_user: User = Depends(get_current_active_user)):
     """Verificar si el usuario puede gestionar productos"""
-    # Cargar el rol y permisos del usuario
-    user_with_permissions = db.query(User).join(User.role).filter(User.id == current_user.id).first()
-    
-    if not user_with_permissions or not user_with_permissions.role:
+    if not current_user.role_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes permisos para gestionar productos"
         )
     
-    # Verificar si tiene el permiso products.manage
-    user_permissions = [perm.name for perm in user_with_permissions.role.permissions]
-    
-    if "products.manage" not in user_permissions:
+    if not permission_registry.has_permission(current_user, "products.manage"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tienes el permiso: products.manage"
@@ -0,0 +1,94 @@
+# app/auth/permissions.py
+import time
+import threading
+from app.config.config import settings
+from app.config.database import SessionLocal
+from app.models.permission import Permission
+from app.models.role import role_permission
+from app.scripts.seed_permissions import PERMISSIONS_DATA
+
+class PermissionRegistry:
+    """
+    Registro de permisos compilados a máscaras de bits.
+
+    Cada permiso ocupa una posición de bit (primero los de seed_permissions,
+    luego los creados dinámicamente) y cada rol se compila una sola vez a un
+    entero, de modo que verificar un permiso es un AND sin acceso a la base de datos.
+    """
+
+    def __init__(self, ttl_seconds: int = 300):
+        self.ttl_seconds = ttl_seconds
+        self._bits = {perm["name"]: 1 << index for index, perm in enumerate(PERMISSIONS_DATA)}
+        self._role_masks = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def bit(self, permission_name: str) -> int:
+        return self._bits.get(permission_name, 0)
+
+    def mask_for(self, permission_names) -> int:
+        self.ensure_loaded()
+        mask = 0
+        for name in permission_names:
+            mask |= self.bit(name)
+        return mask
+
+    def role_mask(self, role_id: int) -> int:
+        self.ensure_loaded()
+        return self._role_masks.get(role_id, 0)
+
+    def has_permission(self, user, permission_name: str) -> bool:
+        if user is None or user.role_id is None:
+            return False
+        # role_mask() recarga el registro si venció: leer el bit después para ver permisos nuevos
+        mask = self.role_mask(user.role_id)
+        required = self.bit(permission_name)
+        return required != 0 and (mask & required) == required
+
+    def permission_names(self, role_id: int):
+        mask = self.role_mask(role_id)
+        return [name for name, bit in list(self._bits.items()) if mask & bit]
+
+    def ensure_loaded(self):
+        if self.is_stale():
+            with self._lock:
+                # Otro hilo pudo haber recargado mientras se esperaba el lock
+                if self.is_stale():
+                    self._load(None)
+
+    def load(self, db=None):
+        """Compilar las máscaras de todos los roles con una sola consulta a role_permission"""
+        with self._lock:
+            self._load(db)
+
+    def _load(self, db):
+        own_session = db is None
+        if own_session:
+            db = SessionLocal()
+        try:
+            rows = db.query(role_permission.c.role_id, Permission.name).join(
+                Permission, Permission.id == role_permission.c.permission_id
+            ).all()
+        finally:
+            if own_session:
+                db.close()
+
+        role_masks = {}
+        for role_id, permission_name in rows:
+            if permission_name not in self._bits:
+                self._bits[permission_name] = 1 << len(self._bits)
+            role_masks[role_id] = role_masks.get(role_id, 0) | self._bits[permission_name]
+
+        self._role_masks = role_masks
+        self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Forzar la recompilación en la próxima verificación (tras cambiar role_permission)"""
+        self._loaded_at = None
+
+    def is_stale(self) -> bool:
+        if self._loaded_at is None:
+            return True
+        return self.ttl_seconds > 0 and time.monotonic() - self._loaded_at > self.ttl_seconds
+
+permission_registry = PermissionRegistry(ttl_seconds=settings.PERMISSION_REGISTRY_TTL_SECONDS)
@@ -1,10 +1,13 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.config.database import SessionLocal
 from app.models.user import User
+from app.models.role import Role
 from app.config.config import settings
+from app.auth.cache import principal_cache
+from app.config.executors import run_db, run_password_hash
 
 # Configuración
 SECRET_KEY = settings.SECRET_KEY
@@ -52,7 +55,37 @@ def authenticate_user(email: str, password: str):
         return False
     return user
 
+def load_principal(email: str):
+    """
+    Cargar el usuario con su rol y permisos en una sesión propia.
+    Al cerrar la sesión el objeto queda desacoplado y puede guardarse en caché.
+    """
+    db = SessionLocal()
+    try:
+        return db.query(User).options(
+            joinedload(User.role).selectinload(Role.permissions)
+        ).filter(User.email == email).first()
+    finally:
+        db.close()
+
+async def authenticate_user_async(email: str, password: str):
+    """
+    Igual que authenticate_user, pero la consulta va al pool de BD y bcrypt
+    al pool de procesos para no bloquear el event loop durante el login
+    """
+    user = await run_db(get_user_by_email, email)
+    if not user:
+        return False
+    if not await run_password_hash(verify_password, password, user.password):
+        return False
+    return user
+
 def get_current_user(token: str, db = None):
+    # ✅ Si el token ya fue validado recientemente no se toca la base de datos
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
     try:
         print(f"🔍 Verificando token: {token[:50]}...")  # ✅ LOG para debug
         
@@ -72,15 +105,11 @@ def get_current_user(token: str, db = None):
         print(f"❌ Error inesperado: {e}")  # ✅ LOG para debug
         return None
     
-    if db:
-        user = db.query(User).filter(User.email == email).first()
-    else:
-        from app.config.database import SessionLocal
-        db_session = SessionLocal()
-        try:
-            user = db_session.query(User).filter(User.email == email).first()
-        finally:
-            db_session.close()
+    # El usuario se carga siempre en una sesión propia para poder cachearlo
+    # sin que los commits de la sesión de la petición lo expiren
+    user = load_principal(email)
     
     print(f"🔍 Usuario encontrado: {user}")  # ✅ LOG para debug
-    return user
\ No newline at end of file
+    if user:
+        principal_cache.set(token, user, token_exp=payload.get("exp"))
+    return user
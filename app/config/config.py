@@ -5,6 +5,16 @@ from typing import Optional
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    DB_ASYNC_MODE: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None  # Por defecto DATABASE_URL con mssql+aioodbc
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30       # segundos esperando una conexión libre
+    DB_POOL_RECYCLE: int = 1800     # segundos antes de reciclar una conexión
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: int = 0         # conexiones a abrir al arrancar
+    DB_POOL_WARMUP_STRICT: bool = True  # si el precalentamiento falla, abortar el arranque
+    DB_FAST_EXECUTEMANY: bool = True  # executemany en un solo envío con pyodbc
     
     # JWT
     SECRET_KEY: str
@@ -15,6 +25,56 @@ class Settings(BaseSettings):
     PASSWORD_MIN_LENGTH: int = 8
     PASSWORD_MAX_LENGTH: int = 128
     
+    # Caché de usuarios autenticados
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Recompilación periódica de máscaras de permisos (para otros workers)
+    PERMISSION_REGISTRY_TTL_SECONDS: int = 300
+    
+    # Pools de ejecución para trabajo bloqueante
+    DB_THREAD_POOL_SIZE: int = 20
+    PASSWORD_HASH_WORKERS: int = 2  # 0 = usar el pool de hilos de BD
+    
+    # Serialización rápida: orjson por defecto y listados sin revalidar (ver app/routes/serializacion.py)
+    FAST_JSON_RESPONSES: bool = False
+    
+    # Pedidos
+    PEDIDOS_LOTE_MAX: int = 500
+    IDEMPOTENCY_CACHE_SIZE: int = 10000
+    IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS: int = 300  # reserva sin respuesta que se da por abandonada
+    IDEMPOTENCY_TTL_HOURS: int = 24               # las claves más antiguas se purgan
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 600
+    EXPORT_YIELD_PER: int = 5000  # filas por lote al exportar con cursor del servidor
+    
+    # Dashboard
+    DASHBOARD_VENTAS_DESDE_ROLLUP: bool = True  # leer ventas de ventas_diarias (ver backfill_ventas_diarias)
+    # TTL en segundos de cada sección en caché (0 = sin caché)
+    DASHBOARD_CACHE_TTL_RESUMEN: int = 30
+    DASHBOARD_CACHE_TTL_METRICAS: int = 60
+    DASHBOARD_CACHE_TTL_POPULARES: int = 300
+    DASHBOARD_CACHE_TTL_PENDIENTES: int = 15
+    DASHBOARD_CACHE_TTL_RUTAS: int = 120
+    DASHBOARD_CACHE_TTL_MENSUALES: int = 600
+    DASHBOARD_PARALLEL: bool = False  # calcular las secciones en paralelo, cada una con su conexión
+    DASHBOARD_SECTION_TIMEOUT_SECONDS: float = 5.0
+    # Canal SSE /dashboard/stream
+    DASHBOARD_STREAM_DEBOUNCE_SECONDS: float = 1.0  # agrupar escrituras seguidas en un solo recálculo
+    DASHBOARD_STREAM_QUEUE_SIZE: int = 16           # mensajes pendientes por cliente antes de resincronizar
+    DASHBOARD_STREAM_KEEPALIVE_SECONDS: int = 15
+    DASHBOARD_STREAM_RESYNC_SECONDS: int = 30       # recálculo periódico de secciones sin TTL (cambios de otros workers)
+    
+    # Rutas
+    RUTA_OPTIMIZACION_SEGUNDOS: float = 0.3  # tiempo máximo de mejora (2-opt / Or-opt) por ruta
+    RUTA_GENERACION_SEGUNDOS: float = 3.0    # tiempo de mejora repartido entre todas las rutas generadas
+    DISTANCIAS_CACHE_MAX_RUTAS: int = 128     # matrices de distancias guardadas en memoria
+    DISTANCIAS_CACHE_DIR: Optional[str] = None  # carpeta para compartir las matrices entre workers (memory-map)
+    DISTANCIAS_CACHE_DISCO_TTL_HORAS: float = 168  # matrices en disco sin usar más tiempo se eliminan (0 = nunca)
+    
+    # Índice espacial de clientes (GET /clientes/cercanos)
+    CLIENTES_INDICE_CELDA_GRADOS: float = 0.05  # ~5.5 km por celda
+    CLIENTES_INDICE_TTL_SECONDS: int = 300      # reconstrucción periódica (cambios de otros workers)
+    
     # App
     APP_NAME: str = "FastAPI Auth API"
     DEBUG: bool = False
@@ -2,8 +2,24 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config.config import settings
+from app.config.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool
 
-engine = create_engine(settings.DATABASE_URL)
+# ✅ Pool configurable: pre-ping y recycle evitan conexiones muertas detrás del balanceador
+POOL_OPTIONS = {
+    "pool_size": settings.DB_POOL_SIZE,
+    "max_overflow": settings.DB_MAX_OVERFLOW,
+    "pool_timeout": settings.DB_POOL_TIMEOUT,
+    "pool_recycle": settings.DB_POOL_RECYCLE,
+    "pool_pre_ping": settings.DB_POOL_PRE_PING,
+}
+
+ENGINE_OPTIONS = {}
+if settings.DB_FAST_EXECUTEMANY and settings.DATABASE_URL.startswith("mssql+pyodbc"):
+    ENGINE_OPTIONS["fast_executemany"] = True
+
+engine = create_engine(
+    settings.DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS, **ENGINE_OPTIONS
+)
 SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
@@ -12,4 +28,29 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# ✅ Modo asíncrono opcional (DB_ASYNC_MODE=true): motor aioodbc sin un hilo por consulta
+async_engine = None
+AsyncSessionLocal = None
+
+def get_async_database_url():
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    return settings.DATABASE_URL.replace("mssql+pyodbc://", "mssql+aioodbc://", 1)
+
+if settings.DB_ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    
+    async_engine = create_async_engine(
+        get_async_database_url(), poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS
+    )
+    # expire_on_commit=False: los objetos se serializan después del commit sin nueva E/S
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependencia de sesión según el modo configurado; usar junto con run_crud
+get_session = get_async_db if settings.DB_ASYNC_MODE else get_db
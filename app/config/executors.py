@@ -0,0 +1,128 @@
+# app/config/executors.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.config import settings
+from app.config.database import SessionLocal, AsyncSessionLocal
+
+class PoolMonitor:
+    """Contadores de uso de un pool para detectar saturación"""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def submitted(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def finished(self, elapsed: float, ok: bool = True):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_seconds += elapsed
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self):
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.max_workers),
+                "saturation": round(self.in_flight / self.max_workers, 2) if self.max_workers else 0,
+                "max_in_flight": self.max_in_flight,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_ms": round(self.total_seconds * 1000 / done, 2) if done else 0
+            }
+
+db_executor = ThreadPoolExecutor(
+    max_workers=settings.DB_THREAD_POOL_SIZE,
+    thread_name_prefix="db"
+)
+db_monitor = PoolMonitor("db", settings.DB_THREAD_POOL_SIZE)
+
+# El pool de procesos se crea bajo demanda para no lanzar procesos en scripts
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+hash_monitor = PoolMonitor("password_hash", settings.PASSWORD_HASH_WORKERS)
+
+def get_hash_executor():
+    global _hash_executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return db_executor
+    if _hash_executor is None:
+        with _hash_executor_lock:
+            if _hash_executor is None:
+                _hash_executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_executor
+
+async def _run(executor, monitor: PoolMonitor, func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    monitor.submitted()
+    start = time.perf_counter()
+    ok = False
+    try:
+        result = await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+        ok = True
+        return result
+    finally:
+        monitor.finished(time.perf_counter() - start, ok)
+
+async def run_db(func, *args, **kwargs):
+    """Ejecutar trabajo bloqueante de base de datos fuera del event loop"""
+    return await _run(db_executor, db_monitor, func, *args, **kwargs)
+
+async def run_password_hash(func, *args, **kwargs):
+    """Ejecutar hash/verificación de contraseñas (CPU intensivo) en el pool de procesos"""
+    return await _run(get_hash_executor(), hash_monitor, func, *args, **kwargs)
+
+async def run_crud(db, func, *args, **kwargs):
+    """
+    Ejecutar una función síncrona de app/crud con la sesión del modo activo:
+    con AsyncSession corre en el greenlet del motor async, si no en el pool de BD
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    return await run_db(func, db, *args, **kwargs)
+
+async def run_crud_isolated(func, *args, **kwargs):
+    """Ejecutar una función síncrona de app/crud en una sesión nueva, con su propia conexión del pool"""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(func, *args, **kwargs)
+
+    def in_new_session():
+        db = SessionLocal()
+        try:
+            return func(db, *args, **kwargs)
+        finally:
+            db.close()
+
+    return await run_db(in_new_session)
+
+def executor_stats():
+    return {
+        "db": db_monitor.snapshot(),
+        "password_hash": hash_monitor.snapshot()
+    }
+
+def shutdown_executors():
+    global _hash_executor
+    db_executor.shutdown(wait=False)
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
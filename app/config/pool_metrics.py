@@ -0,0 +1,95 @@
+# app/config/pool_metrics.py
+import bisect
+import threading
+import time
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+class WaitHistogram:
+    """Histograma acumulado del tiempo de espera para obtener una conexión del pool"""
+
+    BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000]
+
+    def __init__(self):
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        elapsed_ms = seconds * 1000
+        index = bisect.bisect_left(self.BUCKETS_MS, elapsed_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._total_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            total = sum(self._counts)
+            buckets = {f"le_{bound}ms": count for bound, count in zip(self.BUCKETS_MS, self._counts)}
+            buckets["gt_5000ms"] = self._counts[-1]
+            return {
+                "count": total,
+                "avg_ms": round(self._total_ms / total, 3) if total else 0,
+                "max_ms": round(self._max_ms, 3),
+                "buckets": buckets
+            }
+
+class _CheckoutTimingMixin:
+    """Registra cuánto espera cada checkout en el histograma propio del pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = WaitHistogram()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkout_wait.observe(time.perf_counter() - start)
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+def pool_stats(engine):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": pool.status()}
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # overflow() es negativo mientras el pool aún no abre todas sus conexiones
+        "overflow": max(0, pool.overflow()),
+        "checkout_wait": pool.checkout_wait.snapshot() if hasattr(pool, "checkout_wait") else None
+    }
+
+def warmup_pool(engine, connections: int):
+    """Abrir N conexiones a la vez para que las primeras peticiones no paguen el connect"""
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+async def warmup_async_pool(engine, connections: int):
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = await engine.connect()
+            await conn.execute(text("SELECT 1"))
+            opened.append(conn)
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
@@ -0,0 +1,44 @@
+# app/crud/aio.py
+"""
+Variantes asíncronas de los módulos de app/crud.
+
+Cada función se expone como corrutina que recibe la sesión de get_session
+(Session o AsyncSession) y reutiliza exactamente la misma lógica de consulta.
+"""
+from app.config.executors import run_crud
+from app.crud import user as user_crud
+from app.crud import role as role_crud
+from app.crud import permission as permission_crud
+from app.crud import cliente as cliente_crud
+from app.crud import producto as producto_crud
+from app.crud import pedido as pedido_crud
+from app.crud import ruta as ruta_crud
+from app.crud import dashboard as dashboard_crud
+from app.crud import idempotency as idempotency_crud
+
+class AsyncCrud:
+    def __init__(self, module):
+        self._module = module
+
+    def __getattr__(self, name):
+        func = getattr(self._module, name)
+        if not callable(func):
+            return func
+
+        async def call(db, *args, **kwargs):
+            return await run_crud(db, func, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = func.__doc__
+        setattr(self, name, call)
+        return call
+
+user = AsyncCrud(user_crud)
+role = AsyncCrud(role_crud)
+permission = AsyncCrud(permission_crud)
+cliente = AsyncCrud(cliente_crud)
+producto = AsyncCrud(producto_crud)
+pedido = AsyncCrud(pedido_crud)
+ruta = AsyncCrud(ruta_crud)
+dashboard = AsyncCrud(dashboard_crud)
+idempotency = AsyncCrud(idempotency_crud)
@@ -1,6 +1,9 @@
 from sqlalchemy.orm import Session
 from app.models.cliente import Cliente
 from app.schemas.cliente import ClienteCreate, ClienteUpdate
+from app.crud.pagination import paginate
+from app.services.distancias import invalidar_cliente
+from app.services.indice_espacial import indice_clientes
 
 def get_cliente(db: Session, cliente_id: int):
     return db.query(Cliente).filter(Cliente.id == cliente_id).first()
@@ -8,14 +11,43 @@ def get_cliente(db: Session, cliente_id: int):
 def get_cliente_by_nit(db: Session, nit: str):
     return db.query(Cliente).filter(Cliente.nit == nit).first()
 
-def get_clientes(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Cliente).order_by(Cliente.id).offset(skip).limit(limit).all()
+def get_clientes(db: Session, skip: int = 0, limit: int = 100, after: int = None):
+    return paginate(db.query(Cliente), Cliente.id, skip=skip, limit=limit, after=after)
+
+def get_coordenadas_clientes_activos(db: Session):
+    return db.query(Cliente.id, Cliente.latitud, Cliente.longitud).filter(
+        Cliente.estado == True,
+        Cliente.latitud.isnot(None),
+        Cliente.longitud.isnot(None)
+    ).all()
+
+def get_clientes_cercanos(db: Session, latitud: float, longitud: float, radio_km: float, limit: int = 50):
+    """Clientes activos a menos de radio_km del punto, del más cercano al más lejano (con distancia_km)"""
+    indice_clientes.asegurar(lambda: get_coordenadas_clientes_activos(db))
+    cercanos = indice_clientes.cercanos(latitud, longitud, radio_km, limit)
+    if not cercanos:
+        return []
+    
+    clientes = {
+        cliente.id: cliente
+        for cliente in db.query(Cliente).filter(Cliente.id.in_([cliente_id for cliente_id, _ in cercanos]))
+    }
+    resultado = []
+    for cliente_id, distancia in cercanos:
+        cliente = clientes.get(cliente_id)
+        # El índice puede ir unos instantes por detrás de otro worker
+        if cliente is None or not cliente.estado:
+            continue
+        cliente.distancia_km = round(distancia, 3)
+        resultado.append(cliente)
+    return resultado
 
 def create_cliente(db: Session, cliente: ClienteCreate):
     db_cliente = Cliente(**cliente.dict())
     db.add(db_cliente)
     db.commit()
     db.refresh(db_cliente)
+    indice_clientes.actualizar(db_cliente.id, db_cliente.latitud, db_cliente.longitud, db_cliente.estado)
     return db_cliente
 
 def update_cliente(db: Session, cliente_id: int, cliente_update: ClienteUpdate):
@@ -24,11 +56,15 @@ def update_cliente(db: Session, cliente_id: int, cliente_update: ClienteUpdate):
         return None
     
     update_data = cliente_update.dict(exclude_unset=True)
+    coordenadas = (db_cliente.latitud, db_cliente.longitud)
     for field, value in update_data.items():
         setattr(db_cliente, field, value)
     
     db.commit()
+    if (db_cliente.latitud, db_cliente.longitud) != coordenadas:
+        invalidar_cliente(cliente_id)
     db.refresh(db_cliente)
+    indice_clientes.actualizar(db_cliente.id, db_cliente.latitud, db_cliente.longitud, db_cliente.estado)
     return db_cliente
 
 def delete_cliente(db: Session, cliente_id: int):
@@ -36,5 +72,6 @@ def delete_cliente(db: Session, cliente_id: int):
     if db_cliente:
         db_cliente.estado = False
         db.commit()
+        indice_clientes.eliminar(cliente_id)
         return True
     return False
\ No newline at end of file
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, and_, cast, Date
-from datetime import datetime, timedelta, date
+from sqlalchemy import func, extract, and_, case, select
+from datetime import datetime, timedelta, date, time
 from decimal import Decimal
 from app.models.cliente import Cliente
 from app.models.producto import Producto
@@ -8,74 +8,104 @@ from app.models.pedido import Pedido, EstadoPedido
 from app.models.detalle_pedido import DetallePedido
 from app.models.ruta import Ruta
 from app.models.ruta_asignada import RutaAsignada
+from app.models.ruta_cliente import RutaCliente
 from app.models.user import User
+from app.models.venta_diaria import VentaDiaria
+from app.crud.venta_producto import get_top_productos
+from app.config.config import settings
+
+def _conteo(modelo, *filtros):
+    return select(func.count()).select_from(modelo).where(*filtros).scalar_subquery()
 
 def get_resumen_general(db: Session):
-    """Obtener resumen general del sistema"""
-    total_clientes = db.query(Cliente).filter(Cliente.estado == True).count()
-    total_productos = db.query(Producto).filter(Producto.estado == True).count()
-    total_pedidos = db.query(Pedido).count()
-    
-    # Total de ventas (suma de todos los pedidos)
-    total_ventas_result = db.query(func.sum(Pedido.total)).scalar()
-    total_ventas = total_ventas_result if total_ventas_result else Decimal('0.00')
-    
-    # Pedidos pendientes de entrega
-    pedidos_pendientes = db.query(Pedido).filter(
-        Pedido.estado == EstadoPedido.PENDIENTE_ENTREGA
-    ).count()
+    """Obtener resumen general del sistema (una sola consulta)"""
+    if settings.DASHBOARD_VENTAS_DESDE_ROLLUP:
+        # Totales desde el acumulado diario (filas = días x estados, no pedidos)
+        pedidos = select(
+            func.sum(VentaDiaria.cantidad_pedidos).label("total_pedidos"),
+            func.sum(VentaDiaria.total_ventas).label("total_ventas"),
+            func.sum(case(
+                (VentaDiaria.estado == EstadoPedido.PENDIENTE_ENTREGA, VentaDiaria.cantidad_pedidos),
+                else_=0
+            )).label("pedidos_pendientes")
+        ).subquery()
+    else:
+        pedidos = select(
+            func.count(Pedido.id).label("total_pedidos"),
+            func.sum(Pedido.total).label("total_ventas"),
+            func.sum(case(
+                (Pedido.estado == EstadoPedido.PENDIENTE_ENTREGA, 1),
+                else_=0
+            )).label("pedidos_pendientes")
+        ).subquery()
     
-    # Rutas activas
-    rutas_activas = db.query(Ruta).filter(Ruta.estado == True).count()
+    resumen = db.execute(
+        select(
+            _conteo(Cliente, Cliente.estado == True).label("total_clientes"),
+            _conteo(Producto, Producto.estado == True).label("total_productos"),
+            _conteo(Ruta, Ruta.estado == True).label("rutas_activas"),
+            pedidos.c.total_pedidos,
+            pedidos.c.total_ventas,
+            pedidos.c.pedidos_pendientes
+        ).select_from(pedidos)
+    ).one()
     
     return {
-        "total_clientes": total_clientes,
-        "total_productos": total_productos,
-        "total_pedidos": total_pedidos,
-        "total_ventas": total_ventas,
-        "pedidos_pendientes": pedidos_pendientes,
-        "rutas_activas": rutas_activas
+        "total_clientes": resumen.total_clientes,
+        "total_productos": resumen.total_productos,
+        "total_pedidos": int(resumen.total_pedidos or 0),
+        "total_ventas": resumen.total_ventas if resumen.total_ventas else Decimal('0.00'),
+        "pedidos_pendientes": int(resumen.pedidos_pendientes or 0),
+        "rutas_activas": resumen.rutas_activas
     }
 
+def _suma_en_rango(columna_fecha, columna_total, desde, hasta):
+    """SUM(CASE ...) de un periodo semiabierto [desde, hasta)"""
+    return func.sum(case(
+        (and_(columna_fecha >= desde, columna_fecha < hasta), columna_total),
+        else_=0
+    ))
+
 def get_metricas_ventas(db: Session):
-    """Obtener métricas de ventas por periodo"""
+    """Obtener métricas de ventas por periodo (los cuatro periodos en una sola consulta)"""
     hoy = datetime.now().date()
+    manana = hoy + timedelta(days=1)
     inicio_semana = hoy - timedelta(days=hoy.weekday())
     inicio_mes = hoy.replace(day=1)
     
-    # Ventas de hoy - USAR CAST para SQL Server
-    ventas_hoy_result = db.query(func.sum(Pedido.total)).filter(
-        cast(Pedido.created_at, Date) == hoy  # ✅ CORREGIDO para SQL Server
-    ).scalar()
-    ventas_hoy = ventas_hoy_result if ventas_hoy_result else Decimal('0.00')
-    
-    # Ventas de esta semana
-    ventas_semana_result = db.query(func.sum(Pedido.total)).filter(
-        cast(Pedido.created_at, Date) >= inicio_semana  # ✅ CORREGIDO
-    ).scalar()
-    ventas_semana = ventas_semana_result if ventas_semana_result else Decimal('0.00')
-    
-    # Ventas de este mes
-    ventas_mes_result = db.query(func.sum(Pedido.total)).filter(
-        cast(Pedido.created_at, Date) >= inicio_mes  # ✅ CORREGIDO
-    ).scalar()
-    ventas_mes = ventas_mes_result if ventas_mes_result else Decimal('0.00')
-    
     # Ventas del mes anterior para calcular crecimiento
     if inicio_mes.month == 1:
         mes_anterior_inicio = inicio_mes.replace(year=inicio_mes.year-1, month=12)
     else:
         mes_anterior_inicio = inicio_mes.replace(month=inicio_mes.month-1)
     
-    mes_anterior_fin = inicio_mes - timedelta(days=1)
+    if settings.DASHBOARD_VENTAS_DESDE_ROLLUP:
+        columna_fecha, columna_total = VentaDiaria.fecha, VentaDiaria.total_ventas
+    else:
+        # Rangos de datetime sin CAST sobre la columna para poder usar el índice de created_at
+        columna_fecha, columna_total = Pedido.created_at, Pedido.total
+        hoy, manana, inicio_semana, inicio_mes, mes_anterior_inicio = (
+            datetime.combine(dia, time.min)
+            for dia in (hoy, manana, inicio_semana, inicio_mes, mes_anterior_inicio)
+        )
     
-    ventas_mes_anterior_result = db.query(func.sum(Pedido.total)).filter(
-        and_(
-            cast(Pedido.created_at, Date) >= mes_anterior_inicio,  # ✅ CORREGIDO
-            cast(Pedido.created_at, Date) <= mes_anterior_fin      # ✅ CORREGIDO
+    ventas = db.execute(
+        select(
+            _suma_en_rango(columna_fecha, columna_total, hoy, manana).label("ventas_hoy"),
+            _suma_en_rango(columna_fecha, columna_total, inicio_semana, manana).label("ventas_semana"),
+            _suma_en_rango(columna_fecha, columna_total, inicio_mes, manana).label("ventas_mes"),
+            _suma_en_rango(columna_fecha, columna_total, mes_anterior_inicio, inicio_mes).label("ventas_mes_anterior")
+        ).where(
+            # La semana puede empezar en el mes anterior, por eso el límite inferior es el menor de ambos
+            columna_fecha >= min(mes_anterior_inicio, inicio_semana),
+            columna_fecha < manana
         )
-    ).scalar()
-    ventas_mes_anterior = ventas_mes_anterior_result if ventas_mes_anterior_result else Decimal('0.00')
+    ).one()
+    
+    ventas_hoy = ventas.ventas_hoy if ventas.ventas_hoy else Decimal('0.00')
+    ventas_semana = ventas.ventas_semana if ventas.ventas_semana else Decimal('0.00')
+    ventas_mes = ventas.ventas_mes if ventas.ventas_mes else Decimal('0.00')
+    ventas_mes_anterior = ventas.ventas_mes_anterior if ventas.ventas_mes_anterior else Decimal('0.00')
     
     # Calcular crecimiento porcentual
     if ventas_mes_anterior > 0:
@@ -90,18 +120,26 @@ def get_metricas_ventas(db: Session):
         "crecimiento_mensual": crecimiento_mensual
     }
 
-def get_productos_populares(db: Session, limit: int = 5):
-    """Obtener productos más vendidos"""
-    productos_populares = db.query(
-        Producto.id,
-        Producto.nombre,
-        Producto.sku,
-        func.sum(DetallePedido.cantidad).label('cantidad_vendida'),
-        func.sum(DetallePedido.subtotal).label('total_ventas')
-    ).join(DetallePedido, Producto.id == DetallePedido.producto_id
-    ).group_by(Producto.id, Producto.nombre, Producto.sku
-    ).order_by(func.sum(DetallePedido.cantidad).desc()
-    ).limit(limit).all()
+def get_productos_populares(db: Session, limit: int = 5, dias: int = None):
+    """Obtener productos más vendidos (opcionalmente de los últimos N días)"""
+    if settings.DASHBOARD_VENTAS_DESDE_ROLLUP:
+        # Ranking desde los contadores por producto en lugar de agregar detalle_pedidos
+        productos_populares = get_top_productos(db, limit, dias)
+    else:
+        consulta = db.query(
+            Producto.id,
+            Producto.nombre,
+            Producto.sku,
+            func.sum(DetallePedido.cantidad).label('cantidad_vendida'),
+            func.sum(DetallePedido.subtotal).label('total_ventas')
+        ).join(DetallePedido, Producto.id == DetallePedido.producto_id)
+        if dias is not None:
+            desde = datetime.combine(datetime.now().date() - timedelta(days=dias - 1), time.min)
+            consulta = consulta.join(Pedido, Pedido.id == DetallePedido.pedido_id
+            ).filter(Pedido.created_at >= desde)
+        productos_populares = consulta.group_by(Producto.id, Producto.nombre, Producto.sku
+        ).order_by(func.sum(DetallePedido.cantidad).desc()
+        ).limit(limit).all()
     
     return [
         {
@@ -133,45 +171,78 @@ def get_pedidos_pendientes(db: Session, limit: int = 5):
     ]
 
 def get_rutas_activas(db: Session):
-    """Obtener rutas activas con información de repartidores"""
-    rutas_activas = db.query(Ruta).filter(Ruta.estado == True).all()
-    
-    resultado = []
-    for ruta in rutas_activas:
-        # Contar clientes en la ruta
-        total_clientes = len(ruta.rutas_clientes)
-        
-        # Obtener repartidor asignado (si existe)
-        repartidor = None
-        if ruta.rutas_asignadas:
-            ultima_asignacion = ruta.rutas_asignadas[-1]  # La más reciente
-            repartidor = f"{ultima_asignacion.usuario.username}"
-        
-        resultado.append({
+    """Obtener rutas activas con información de repartidores (una sola consulta)"""
+    # Clientes por ruta sin cargar las filas de rutas_clientes
+    clientes_por_ruta = select(
+        RutaCliente.ruta_id,
+        func.count(RutaCliente.id).label("total_clientes")
+    ).group_by(RutaCliente.ruta_id).subquery()
+    
+    # Asignación más reciente de cada ruta
+    asignaciones = select(
+        RutaAsignada.ruta_id,
+        RutaAsignada.usuario_id,
+        func.row_number().over(
+            partition_by=RutaAsignada.ruta_id,
+            order_by=RutaAsignada.id.desc()
+        ).label("posicion")
+    ).subquery()
+    
+    rutas_activas = db.execute(
+        select(
+            Ruta.id,
+            Ruta.nombre,
+            Ruta.tipo,
+            func.coalesce(clientes_por_ruta.c.total_clientes, 0).label("total_clientes"),
+            User.username.label("repartidor")
+        ).outerjoin(clientes_por_ruta, clientes_por_ruta.c.ruta_id == Ruta.id
+        ).outerjoin(asignaciones, and_(
+            asignaciones.c.ruta_id == Ruta.id,
+            asignaciones.c.posicion == 1
+        )).outerjoin(User, User.id == asignaciones.c.usuario_id
+        ).where(Ruta.estado == True
+        ).order_by(Ruta.id)
+    ).all()
+    
+    return [
+        {
             "id": ruta.id,
             "nombre": ruta.nombre,
             "tipo": ruta.tipo.value,
-            "total_clientes": total_clientes,
-            "repartidor": repartidor
-        })
-    
-    return resultado
+            "total_clientes": ruta.total_clientes,
+            "repartidor": ruta.repartidor
+        }
+        for ruta in rutas_activas
+    ]
 
 def get_ventas_mensuales(db: Session, meses: int = 6):
     """Obtener estadísticas de ventas de los últimos meses"""
     fecha_limite = datetime.now() - timedelta(days=30*meses)
     
-    # Usar extract para SQL Server - CORREGIDO
-    ventas_mensuales = db.query(
-        extract('year', Pedido.created_at).label('ano'),
-        extract('month', Pedido.created_at).label('mes'),
-        func.sum(Pedido.total).label('total_ventas'),
-        func.count(Pedido.id).label('cantidad_pedidos')
-    ).filter(Pedido.created_at >= fecha_limite
-    ).group_by(
-        extract('year', Pedido.created_at),
-        extract('month', Pedido.created_at)
-    ).order_by('ano', 'mes').all()
+    if settings.DASHBOARD_VENTAS_DESDE_ROLLUP:
+        # Agrupar días del acumulado en lugar de pedidos individuales
+        ventas_mensuales = db.query(
+            extract('year', VentaDiaria.fecha).label('ano'),
+            extract('month', VentaDiaria.fecha).label('mes'),
+            func.sum(VentaDiaria.total_ventas).label('total_ventas'),
+            func.sum(VentaDiaria.cantidad_pedidos).label('cantidad_pedidos')
+        ).filter(VentaDiaria.fecha >= fecha_limite.date()
+        ).group_by(
+            extract('year', VentaDiaria.fecha),
+            extract('month', VentaDiaria.fecha)
+        ).order_by('ano', 'mes').all()
+    else:
+        # Usar extract para SQL Server - CORREGIDO
+        ventas_mensuales = db.query(
+            extract('year', Pedido.created_at).label('ano'),
+            extract('month', Pedido.created_at).label('mes'),
+            func.sum(Pedido.total).label('total_ventas'),
+            func.count(Pedido.id).label('cantidad_pedidos')
+        ).filter(Pedido.created_at >= fecha_limite
+        ).group_by(
+            extract('year', Pedido.created_at),
+            extract('month', Pedido.created_at)
+        ).order_by('ano', 'mes').all()
     
     # Formatear resultado
     meses_espanol = {
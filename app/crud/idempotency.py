@@ -0,0 +1,155 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from app.models.idempotency_key import IdempotencyKey
+from app.config.config import settings
+
+class ClaveEnProcesoError(Exception):
+    """La petición original con la misma Idempotency-Key aún no termina"""
+    pass
+
+class ClaveReutilizadaError(Exception):
+    """La Idempotency-Key ya se usó con un cuerpo de petición distinto"""
+    pass
+
+# LRU en memoria con las respuestas ya guardadas:
+# (user_id, endpoint, clave) -> (huella, status_code, body, vence_en)
+_respuestas_recientes = OrderedDict()
+_lock = threading.Lock()
+_ultima_purga = 0.0
+
+def huella_peticion(peticion) -> str:
+    """Hash del cuerpo de la petición (modelo Pydantic) que se guarda junto a la clave"""
+    return hashlib.sha256(peticion.model_dump_json().encode("utf-8")).hexdigest()
+
+def _ahora():
+    # created_at se fija desde aquí para comparar siempre con el mismo reloj (UTC)
+    return datetime.now(timezone.utc)
+
+def _recordar(cache_key, huella, status_code, body):
+    with _lock:
+        _respuestas_recientes[cache_key] = (huella, status_code, body, time.monotonic() + settings.IDEMPOTENCY_TTL_HOURS * 3600)
+        _respuestas_recientes.move_to_end(cache_key)
+        while len(_respuestas_recientes) > settings.IDEMPOTENCY_CACHE_SIZE:
+            _respuestas_recientes.popitem(last=False)
+
+def _buscar_en_memoria(cache_key):
+    with _lock:
+        guardada = _respuestas_recientes.get(cache_key)
+        if guardada is None:
+            return None
+        if guardada[3] < time.monotonic():
+            del _respuestas_recientes[cache_key]
+            return None
+        _respuestas_recientes.move_to_end(cache_key)
+        return guardada
+
+def _comprobar_huella(clave: str, guardada, huella):
+    # Las claves guardadas antes de registrar la huella (NULL) no se pueden comparar
+    if guardada is not None and huella is not None and guardada != huella:
+        raise ClaveReutilizadaError(clave)
+
+def purgar_claves(db: Session, antes_de: datetime = None) -> int:
+    """Eliminar las claves creadas antes de antes_de (por defecto, más antiguas que IDEMPOTENCY_TTL_HOURS)"""
+    if antes_de is None:
+        antes_de = _ahora() - timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+    eliminadas = db.query(IdempotencyKey).filter(
+        IdempotencyKey.created_at < antes_de
+    ).delete(synchronize_session=False)
+    db.commit()
+    return eliminadas
+
+def _purgar_si_toca(db: Session):
+    # Como mucho una purga por intervalo en cada worker
+    global _ultima_purga
+    ahora = time.monotonic()
+    if ahora - _ultima_purga < settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS:
+        return
+    _ultima_purga = ahora
+    try:
+        eliminadas = purgar_claves(db)
+        if eliminadas:
+            print(f"✅ {eliminadas} Idempotency-Keys vencidas eliminadas")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error purgando Idempotency-Keys: {e}")
+
+def reclamar_clave(db: Session, user_id: int, endpoint: str, clave: str, huella: str = None):
+    """
+    Reservar la clave para procesar la petición.
+    Devuelve (status_code, body) si la clave ya tiene respuesta guardada o None si es nueva;
+    lanza ClaveEnProcesoError si otra petición con la misma clave sigue en curso y
+    ClaveReutilizadaError si la clave se usó con otro cuerpo (huella distinta).
+    Una reserva sin respuesta más antigua que IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS se
+    considera abandonada (worker caído) y se vuelve a reservar.
+    """
+    cache_key = (user_id, endpoint, clave)
+    guardada = _buscar_en_memoria(cache_key)
+    if guardada is not None:
+        _comprobar_huella(clave, guardada[0], huella)
+        return guardada[1], guardada[2]
+    
+    _purgar_si_toca(db)
+    try:
+        db.add(IdempotencyKey(user_id=user_id, endpoint=endpoint, clave=clave, request_hash=huella, created_at=_ahora()))
+        db.commit()
+        return None
+    except IntegrityError:
+        db.rollback()
+    
+    filtro = (
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.clave == clave
+    )
+    existente = db.query(
+        IdempotencyKey.status_code, IdempotencyKey.response_body, IdempotencyKey.request_hash
+    ).filter(*filtro).first()
+    if existente is None:
+        raise ClaveEnProcesoError(clave)
+    _comprobar_huella(clave, existente.request_hash, huella)
+    
+    if existente.status_code is None:
+        # Tomar la reserva abandonada solo si nadie la tomó antes (UPDATE condicional)
+        limite = _ahora() - timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS)
+        tomadas = db.query(IdempotencyKey).filter(
+            *filtro,
+            IdempotencyKey.status_code == None,
+            IdempotencyKey.created_at < limite
+        ).update({"created_at": _ahora(), "request_hash": huella}, synchronize_session=False)
+        db.commit()
+        if tomadas:
+            print(f"🔍 Idempotency-Key abandonada reclamada de nuevo: {clave}")
+            return None
+        raise ClaveEnProcesoError(clave)
+    
+    respuesta = (existente.status_code, json.loads(existente.response_body))
+    _recordar(cache_key, existente.request_hash, *respuesta)
+    return respuesta
+
+def guardar_respuesta(db: Session, user_id: int, endpoint: str, clave: str, status_code: int, body, huella: str = None):
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.clave == clave
+    ).update(
+        {"status_code": status_code, "response_body": json.dumps(body)},
+        synchronize_session=False
+    )
+    db.commit()
+    _recordar((user_id, endpoint, clave), huella, status_code, body)
+
+def liberar_clave(db: Session, user_id: int, endpoint: str, clave: str):
+    """Eliminar la reserva cuando la petición falla, para que el reintento vuelva a procesarse"""
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.endpoint == endpoint,
+        IdempotencyKey.clave == clave,
+        IdempotencyKey.status_code == None
+    ).delete(synchronize_session=False)
+    db.commit()
@@ -0,0 +1,58 @@
+import base64
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, or_
+
+def paginate(query, id_column, skip: int = 0, limit: int = 100, after: Optional[int] = None):
+    """
+    Paginar una consulta ordenada por id.
+    Con after se usa paginación por clave (id > after), que cuesta lo mismo en
+    cualquier página; sin after se mantiene el OFFSET clásico.
+    """
+    query = query.order_by(id_column)
+    if after is not None:
+        return query.filter(id_column > after).limit(limit).all()
+    return query.offset(skip).limit(limit).all()
+
+def encode_cursor(last_id: int) -> str:
+    """Cursor opaco para continuar después del último id devuelto"""
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """Obtener el id de un cursor; lanza ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise ValueError("Cursor inválido")
+    prefix, _, value = raw.partition(":")
+    if prefix != "id" or not value.isdigit():
+        raise ValueError("Cursor inválido")
+    return int(value)
+
+def paginate_keyset_desc(query, date_column, id_column, limit: int = 100, after=None):
+    """
+    Paginar de más reciente a más antiguo por (fecha, id).
+    after es la pareja (fecha, id) de la última fila de la página anterior.
+    """
+    if after is not None:
+        after_date, after_id = after
+        query = query.filter(or_(
+            date_column < after_date,
+            and_(date_column == after_date, id_column < after_id)
+        ))
+    return query.order_by(date_column.desc(), id_column.desc()).limit(limit).all()
+
+def encode_keyset_cursor(value: datetime, last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"ts:{value.isoformat()}|{last_id}".encode()).decode().rstrip("=")
+
+def decode_keyset_cursor(cursor: str):
+    """Obtener (fecha, id) de un cursor; lanza ValueError si no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, _, rest = raw.partition(":")
+        value, _, last_id = rest.rpartition("|")
+        if prefix != "ts":
+            raise ValueError
+        return datetime.fromisoformat(value), int(last_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
@@ -1,68 +1,384 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.orm import Session, selectinload, noload
+from sqlalchemy import and_, case, func, insert, update, select
+from datetime import datetime
 from decimal import Decimal
+from types import SimpleNamespace
 from app.models.pedido import Pedido, EstadoPedido
 from app.models.detalle_pedido import DetallePedido
 from app.models.producto import Producto
+from app.models.cliente import Cliente
+from app.models.user import User
 from app.schemas.pedidos import PedidoCreate, PedidoUpdate
+from app.crud.venta_diaria import registrar_venta, cambiar_estado_venta
+from app.crud.venta_producto import registrar_ventas_productos, lineas_por_producto
+from app.services.dashboard_cache import invalidar_pedidos
+from app.crud.pagination import paginate, paginate_keyset_desc
 
-def get_pedido(db: Session, pedido_id: int):
-    return db.query(Pedido).filter(Pedido.id == pedido_id).first()
+# Relaciones que se pueden pedir con ?include= en los endpoints de pedidos
+PEDIDO_INCLUDES = {
+    "detalles": Pedido.detalle_pedidos,
+    "cliente": Pedido.cliente,
+}
 
-def get_pedidos(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Pedido).order_by(Pedido.id).offset(skip).limit(limit).all()
+def _opciones_carga(include=()):
+    """
+    Cargar las relaciones incluidas con un selectinload por página (una consulta IN)
+    y dejar vacías las demás, para que serializar PedidoResponse nunca haga lazy loads
+    """
+    return [
+        selectinload(relacion) if nombre in include else noload(relacion)
+        for nombre, relacion in PEDIDO_INCLUDES.items()
+    ]
 
-def get_pedidos_by_cliente(db: Session, cliente_id: int):
-    return db.query(Pedido).filter(Pedido.cliente_id == cliente_id).all()
+def get_pedido(db: Session, pedido_id: int, include=()):
+    return db.query(Pedido).options(*_opciones_carga(include)).filter(Pedido.id == pedido_id).first()
 
-def get_pedidos_by_vendedor(db: Session, vendedor_id: int):
-    return db.query(Pedido).filter(Pedido.vendedor_id == vendedor_id).all()
+def _recargar_pedido(db: Session, pedido_id: int, include=("detalles",)):
+    """Volver a leer un pedido recién escrito (ya presente en la sesión) con sus relaciones"""
+    return db.query(Pedido).options(*_opciones_carga(include)).populate_existing(
+    ).filter(Pedido.id == pedido_id).first()
 
-def create_pedido(db: Session, pedido: PedidoCreate):
-    # Calcular total y verificar stock
-    total = Decimal('0.00')
+def get_pedidos(db: Session, skip: int = 0, limit: int = 100, after: int = None, include=()):
+    query = db.query(Pedido).options(*_opciones_carga(include))
+    return paginate(query, Pedido.id, skip=skip, limit=limit, after=after)
+
+def buscar_pedidos(
+    db: Session,
+    cliente_id: int = None,
+    vendedor_id: int = None,
+    estado: EstadoPedido = None,
+    desde: datetime = None,
+    hasta: datetime = None,
+    limit: int = 100,
+    after=None,
+    include=()
+):
+    """
+    Pedidos filtrados por cliente, vendedor y/o estado en [desde, hasta),
+    del más reciente al más antiguo y paginados por cursor (created_at, id).
+    Cada filtro más el rango de fechas usa su índice compuesto (x, created_at).
+    """
+    query = db.query(Pedido).options(*_opciones_carga(include))
+    if cliente_id is not None:
+        query = query.filter(Pedido.cliente_id == cliente_id)
+    if vendedor_id is not None:
+        query = query.filter(Pedido.vendedor_id == vendedor_id)
+    if estado is not None:
+        query = query.filter(Pedido.estado == EstadoPedido(estado))
+    if desde is not None:
+        query = query.filter(Pedido.created_at >= desde)
+    if hasta is not None:
+        query = query.filter(Pedido.created_at < hasta)
+    return paginate_keyset_desc(query, Pedido.created_at, Pedido.id, limit=limit, after=after)
+
+def get_pedidos_by_cliente(db: Session, cliente_id: int, desde: datetime = None, hasta: datetime = None,
+                           limit: int = 100, after=None, include=()):
+    return buscar_pedidos(db, cliente_id=cliente_id, desde=desde, hasta=hasta, limit=limit, after=after, include=include)
+
+def get_pedidos_by_vendedor(db: Session, vendedor_id: int, desde: datetime = None, hasta: datetime = None,
+                            limit: int = 100, after=None, include=()):
+    return buscar_pedidos(db, vendedor_id=vendedor_id, desde=desde, hasta=hasta, limit=limit, after=after, include=include)
+
+def get_pedidos_by_estado(db: Session, estado: EstadoPedido, desde: datetime = None, hasta: datetime = None,
+                          limit: int = 100, after=None, include=()):
+    return buscar_pedidos(db, estado=estado, desde=desde, hasta=hasta, limit=limit, after=after, include=include)
+
+def consulta_exportacion(desde: datetime = None, hasta: datetime = None, estado: EstadoPedido = None,
+                         detalles: bool = True):
+    """
+    SELECT plano (sin ORM) para exportar pedidos, o una fila por línea de pedido si detalles=True.
+    Ordenado por created_at para recorrer el rango por su índice.
+    """
+    columnas = [
+        Pedido.id.label("pedido_id"),
+        Pedido.cliente_id,
+        Pedido.vendedor_id,
+        Pedido.estado,
+        Pedido.total,
+        Pedido.fecha_pedido,
+        Pedido.created_at
+    ]
+    orden = [Pedido.created_at, Pedido.id]
+    if detalles:
+        columnas += [
+            DetallePedido.id.label("detalle_id"),
+            DetallePedido.producto_id,
+            DetallePedido.cantidad,
+            DetallePedido.precio_unitario,
+            DetallePedido.subtotal
+        ]
+        orden.append(DetallePedido.id)
     
-    # Verificar stock y calcular total
-    for detalle in pedido.detalles:
-        producto = db.query(Producto).filter(Producto.id == detalle.producto_id).first()
-        if not producto:
-            raise ValueError(f"Producto con ID {detalle.producto_id} no encontrado")
-        if producto.stock < detalle.cantidad:
-            raise ValueError(f"Stock insuficiente para producto {producto.nombre}")
-        
-        subtotal = detalle.precio_unitario * detalle.cantidad
-        total += subtotal
+    stmt = select(*columnas)
+    if detalles:
+        stmt = stmt.join(DetallePedido, DetallePedido.pedido_id == Pedido.id)
+    if estado is not None:
+        stmt = stmt.where(Pedido.estado == EstadoPedido(estado))
+    if desde is not None:
+        stmt = stmt.where(Pedido.created_at >= desde)
+    if hasta is not None:
+        stmt = stmt.where(Pedido.created_at < hasta)
+    return stmt.order_by(*orden)
+
+class StockInsuficienteError(ValueError):
+    """Error al reservar stock; lineas_fallidas indica qué líneas del pedido no se pudieron atender"""
+    def __init__(self, message: str, lineas_fallidas: list):
+        super().__init__(message)
+        self.lineas_fallidas = lineas_fallidas
+
+def get_demanda_entregas(db: Session, desde: datetime = None, hasta: datetime = None):
+    """
+    Pedidos pendientes de entrega con fecha_pedido en [desde, hasta), agrupados por cliente:
+    (cliente_id, latitud, longitud, pedidos, unidades)
+    """
+    unidades = select(
+        DetallePedido.pedido_id,
+        func.sum(DetallePedido.cantidad).label("unidades")
+    ).group_by(DetallePedido.pedido_id).subquery()
     
-    # Crear pedido
-    db_pedido = Pedido(
-        cliente_id=pedido.cliente_id,
-        vendedor_id=pedido.vendedor_id,
-        fecha_pedido=pedido.fecha_pedido,
-        total=total,
-        estado=EstadoPedido.PENDIENTE_ENTREGA
+    stmt = select(
+        Pedido.cliente_id,
+        Cliente.latitud,
+        Cliente.longitud,
+        func.count(Pedido.id).label("pedidos"),
+        func.coalesce(func.sum(unidades.c.unidades), 0).label("unidades")
+    ).join(Cliente, Cliente.id == Pedido.cliente_id
+    ).outerjoin(unidades, unidades.c.pedido_id == Pedido.id
+    ).where(Pedido.estado == EstadoPedido.PENDIENTE_ENTREGA)
+    if desde is not None:
+        stmt = stmt.where(Pedido.fecha_pedido >= desde)
+    if hasta is not None:
+        stmt = stmt.where(Pedido.fecha_pedido < hasta)
+    stmt = stmt.group_by(Pedido.cliente_id, Cliente.latitud, Cliente.longitud).order_by(Pedido.cliente_id)
+    return db.execute(stmt).all()
+
+def _cantidades_por_producto(detalles):
+    """Agrupar cantidades por producto (un producto puede repetirse en varias líneas)"""
+    cantidades = {}
+    for detalle in detalles:
+        cantidades[detalle.producto_id] = cantidades.get(detalle.producto_id, 0) + detalle.cantidad
+    return cantidades
+
+def _cargar_productos(db: Session, producto_ids):
+    """Cargar id, nombre y stock de todos los productos con una sola consulta IN"""
+    rows = db.query(Producto.id, Producto.nombre, Producto.stock).filter(
+        Producto.id.in_(list(producto_ids))
+    ).all()
+    return {row.id: row for row in rows}
+
+def _ids_existentes(db: Session, columna, ids):
+    """Ids de la tabla de `columna` que existen, con una sola consulta IN"""
+    return {row[0] for row in db.query(columna).filter(columna.in_(list(ids))).all()}
+
+def _lineas_fallidas(detalles, productos: dict, cantidades: dict):
+    fallidas = []
+    for linea, detalle in enumerate(detalles, start=1):
+        producto = productos.get(detalle.producto_id)
+        if producto is None:
+            fallidas.append({
+                "linea": linea,
+                "producto_id": detalle.producto_id,
+                "motivo": f"Producto con ID {detalle.producto_id} no encontrado"
+            })
+        elif (producto.stock or 0) < cantidades[detalle.producto_id]:
+            fallidas.append({
+                "linea": linea,
+                "producto_id": detalle.producto_id,
+                "motivo": f"Stock insuficiente para producto {producto.nombre}",
+                "solicitado": cantidades[detalle.producto_id],
+                "disponible": producto.stock or 0
+            })
+    return fallidas
+
+def _reservar_stock(db: Session, cantidades: dict) -> bool:
+    """
+    Descontar el stock de todos los productos en un único UPDATE condicional.
+    Solo se actualizan filas con stock suficiente, así que si rowcount no coincide
+    con el número de productos alguna línea no pudo reservarse y hay que hacer rollback.
+    """
+    cantidad = case(cantidades, value=Producto.id)
+    result = db.execute(
+        update(Producto)
+        .where(Producto.id.in_(list(cantidades)), Producto.stock >= cantidad)
+        .values(stock=Producto.stock - cantidad)
+        .execution_options(synchronize_session=False)
     )
-    db.add(db_pedido)
-    db.commit()
-    db.refresh(db_pedido)
+    return result.rowcount == len(cantidades)
+
+def _liberar_stock(db: Session, cantidades: dict):
+    """Devolver al stock las cantidades de varios productos en un único UPDATE"""
+    if not cantidades:
+        return
+    cantidad = case(cantidades, value=Producto.id)
+    db.execute(
+        update(Producto)
+        .where(Producto.id.in_(list(cantidades)))
+        .values(stock=Producto.stock + cantidad)
+        .execution_options(synchronize_session=False)
+    )
+
+def _detalle_rows(pedido_id: int, detalles):
+    return [
+        {
+            "pedido_id": pedido_id,
+            "producto_id": detalle.producto_id,
+            "cantidad": detalle.cantidad,
+            "precio_unitario": detalle.precio_unitario,
+            "subtotal": detalle.precio_unitario * detalle.cantidad
+        }
+        for detalle in detalles
+    ]
+
+def create_pedido(db: Session, pedido: PedidoCreate):
+    cantidades = _cantidades_por_producto(pedido.detalles)
     
-    # Crear detalles del pedido y actualizar stock
-    for detalle in pedido.detalles:
-        db_detalle = DetallePedido(
-            pedido_id=db_pedido.id,
-            producto_id=detalle.producto_id,
-            cantidad=detalle.cantidad,
-            precio_unitario=detalle.precio_unitario,
-            subtotal=detalle.precio_unitario * detalle.cantidad
+    # Validar existencia y stock con una sola consulta
+    fallidas = _lineas_fallidas(pedido.detalles, _cargar_productos(db, cantidades), cantidades)
+    if fallidas:
+        raise StockInsuficienteError(fallidas[0]["motivo"], fallidas)
+    
+    total = sum((detalle.precio_unitario * detalle.cantidad for detalle in pedido.detalles), Decimal('0.00'))
+    
+    # Reserva de stock, cabecera y detalles en una sola transacción
+    try:
+        if not _reservar_stock(db, cantidades):
+            # Otro pedido tomó el stock entre la validación y la reserva
+            db.rollback()
+            fallidas = _lineas_fallidas(pedido.detalles, _cargar_productos(db, cantidades), cantidades)
+            message = fallidas[0]["motivo"] if fallidas else "No se pudo reservar el stock, intente de nuevo"
+            raise StockInsuficienteError(message, fallidas)
+        
+        db_pedido = Pedido(
+            cliente_id=pedido.cliente_id,
+            vendedor_id=pedido.vendedor_id,
+            fecha_pedido=pedido.fecha_pedido,
+            total=total,
+            estado=EstadoPedido.PENDIENTE_ENTREGA
         )
-        db.add(db_detalle)
+        db.add(db_pedido)
+        db.flush()
         
-        # Actualizar stock del producto
-        producto = db.query(Producto).filter(Producto.id == detalle.producto_id).first()
-        producto.stock -= detalle.cantidad
+        db.execute(insert(DetallePedido), _detalle_rows(db_pedido.id, pedido.detalles))
+        registrar_venta(db, db_pedido.created_at.date(), db_pedido.estado, total)
+        registrar_ventas_productos(db, db_pedido.created_at.date(), lineas_por_producto(pedido.detalles))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidar_pedidos()
     
-    db.commit()
-    db.refresh(db_pedido)
-    return db_pedido
+    return _recargar_pedido(db, db_pedido.id)
+
+def create_pedidos_lote(db: Session, pedidos):
+    """
+    Crear varios pedidos (sincronización de vendedores sin conexión).
+
+    Todos los pedidos se validan contra una sola lectura de productos, el stock
+    se reserva con un único UPDATE y cabeceras y detalles se insertan con
+    executemany, todo en una transacción. Devuelve un resultado por pedido.
+    """
+    resultados = [None] * len(pedidos)
+    if not pedidos:
+        return resultados
+    
+    # Snapshot único de productos; el stock se va descontando en memoria
+    producto_ids = {detalle.producto_id for pedido in pedidos for detalle in pedido.detalles}
+    snapshot = {
+        row.id: SimpleNamespace(id=row.id, nombre=row.nombre, stock=row.stock or 0)
+        for row in _cargar_productos(db, producto_ids).values()
+    }
+    
+    # Un cliente o vendedor inexistente rompería la llave foránea de todo el lote
+    clientes = _ids_existentes(db, Cliente.id, {pedido.cliente_id for pedido in pedidos})
+    vendedores = _ids_existentes(db, User.id, {pedido.vendedor_id for pedido in pedidos})
+    
+    aceptados = []
+    cantidades_totales = {}
+    for indice, pedido in enumerate(pedidos):
+        if pedido.cliente_id not in clientes:
+            resultados[indice] = {"indice": indice, "ok": False, "error": f"Cliente con ID {pedido.cliente_id} no encontrado"}
+            continue
+        if pedido.vendedor_id not in vendedores:
+            resultados[indice] = {"indice": indice, "ok": False, "error": f"Vendedor con ID {pedido.vendedor_id} no encontrado"}
+            continue
+        cantidades = _cantidades_por_producto(pedido.detalles)
+        fallidas = _lineas_fallidas(pedido.detalles, snapshot, cantidades)
+        if fallidas:
+            resultados[indice] = {
+                "indice": indice,
+                "ok": False,
+                "error": fallidas[0]["motivo"],
+                "lineas_fallidas": fallidas
+            }
+            continue
+        for producto_id, cantidad in cantidades.items():
+            snapshot[producto_id].stock -= cantidad
+            cantidades_totales[producto_id] = cantidades_totales.get(producto_id, 0) + cantidad
+        aceptados.append(indice)
+    
+    if not aceptados:
+        return resultados
+    
+    try:
+        if not _reservar_stock(db, cantidades_totales):
+            # El stock cambió desde el snapshot: procesar pedido por pedido
+            db.rollback()
+            for indice in aceptados:
+                try:
+                    db_pedido = create_pedido(db, pedidos[indice])
+                    resultados[indice] = {"indice": indice, "ok": True, "pedido_id": db_pedido.id, "total": db_pedido.total}
+                except StockInsuficienteError as e:
+                    resultados[indice] = {"indice": indice, "ok": False, "error": str(e), "lineas_fallidas": e.lineas_fallidas}
+            return resultados
+        
+        totales = {}
+        cabeceras = []
+        for indice in aceptados:
+            pedido = pedidos[indice]
+            totales[indice] = sum(
+                (detalle.precio_unitario * detalle.cantidad for detalle in pedido.detalles), Decimal('0.00')
+            )
+            cabecera = {
+                "cliente_id": pedido.cliente_id,
+                "vendedor_id": pedido.vendedor_id,
+                "total": totales[indice],
+                "estado": EstadoPedido.PENDIENTE_ENTREGA
+            }
+            if pedido.fecha_pedido is not None:
+                cabecera["fecha_pedido"] = pedido.fecha_pedido
+            cabeceras.append(cabecera)
+        
+        insertados = db.execute(
+            insert(Pedido).returning(Pedido.id, Pedido.created_at, sort_by_parameter_order=True),
+            cabeceras
+        ).all()
+        pedido_ids = [row.id for row in insertados]
+        
+        detalles = []
+        for indice, pedido_id in zip(aceptados, pedido_ids):
+            detalles.extend(_detalle_rows(pedido_id, pedidos[indice].detalles))
+        db.execute(insert(DetallePedido), detalles)
+        
+        # Acumulados diarios: una actualización por día (y producto), no por pedido
+        ventas_por_dia = {}
+        detalles_por_dia = {}
+        for indice, row in zip(aceptados, insertados):
+            fecha = row.created_at.date()
+            total, cantidad = ventas_por_dia.get(fecha, (Decimal('0.00'), 0))
+            ventas_por_dia[fecha] = (total + totales[indice], cantidad + 1)
+            detalles_por_dia.setdefault(fecha, []).extend(pedidos[indice].detalles)
+        for fecha, (total, cantidad) in ventas_por_dia.items():
+            registrar_venta(db, fecha, EstadoPedido.PENDIENTE_ENTREGA, total, cantidad)
+            registrar_ventas_productos(db, fecha, lineas_por_producto(detalles_por_dia[fecha]))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidar_pedidos()
+    
+    for indice, pedido_id in zip(aceptados, pedido_ids):
+        resultados[indice] = {"indice": indice, "ok": True, "pedido_id": pedido_id, "total": totales[indice]}
+    return resultados
 
 def update_pedido_estado(db: Session, pedido_id: int, pedido_update: PedidoUpdate):
     db_pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
@@ -70,23 +386,29 @@ def update_pedido_estado(db: Session, pedido_id: int, pedido_update: PedidoUpdat
         return None
     
     if pedido_update.estado:
-        db_pedido.estado = pedido_update.estado
+        estado_anterior = db_pedido.estado
+        db_pedido.estado = EstadoPedido(pedido_update.estado.value)
+        cambiar_estado_venta(
+            db, db_pedido.created_at.date(), estado_anterior, db_pedido.estado, db_pedido.total
+        )
     
     db.commit()
-    db.refresh(db_pedido)
-    return db_pedido
+    invalidar_pedidos()
+    return _recargar_pedido(db, pedido_id)
 
 def delete_pedido(db: Session, pedido_id: int):
     db_pedido = db.query(Pedido).filter(Pedido.id == pedido_id).first()
     if db_pedido:
         # Restaurar stock si el pedido se elimina
         if db_pedido.estado == EstadoPedido.PENDIENTE_ENTREGA:
-            for detalle in db_pedido.detalle_pedidos:
-                producto = db.query(Producto).filter(Producto.id == detalle.producto_id).first()
-                if producto:
-                    producto.stock += detalle.cantidad
+            _liberar_stock(db, _cantidades_por_producto(db_pedido.detalle_pedidos))
         
+        registrar_venta(db, db_pedido.created_at.date(), db_pedido.estado, -db_pedido.total, -1)
+        registrar_ventas_productos(
+            db, db_pedido.created_at.date(), lineas_por_producto(db_pedido.detalle_pedidos, signo=-1)
+        )
         db.delete(db_pedido)
         db.commit()
+        invalidar_pedidos()
         return True
     return False
\ No newline at end of file
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
 from app.models.permission import Permission
 from app.schemas.permission import PermissionCreate
+from app.auth.cache import principal_cache
+from app.auth.permissions import permission_registry
 
 def get_permission(db: Session, permission_id: int):
     return db.query(Permission).filter(Permission.id == permission_id).first()
@@ -29,5 +31,8 @@ def assign_permission_to_role(db: Session, role_id: int, permission_id: int):
     if role and permission:
         role.permissions.append(permission)
         db.commit()
+        # Recompilar máscaras y descartar usuarios en caché con los permisos anteriores
+        permission_registry.invalidate()
+        principal_cache.clear()
         return True
     return False
\ No newline at end of file
@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from app.models.producto import Producto
 from app.schemas.producto import ProductoCreate, ProductoUpdate
+from app.crud.pagination import paginate
 
 def get_producto(db: Session, producto_id: int):
     return db.query(Producto).filter(Producto.id == producto_id).first()
@@ -8,8 +9,8 @@ def get_producto(db: Session, producto_id: int):
 def get_producto_by_sku(db: Session, sku: str):
     return db.query(Producto).filter(Producto.sku == sku).first()
 
-def get_productos(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Producto).order_by(Producto.id).offset(skip).limit(limit).all()
+def get_productos(db: Session, skip: int = 0, limit: int = 100, after: int = None):
+    return paginate(db.query(Producto), Producto.id, skip=skip, limit=limit, after=after)
 
 def create_producto(db: Session, producto: ProductoCreate):
     db_producto = Producto(**producto.dict())
@@ -1,14 +1,55 @@
 from sqlalchemy.orm import Session
-from app.models.ruta import Ruta
+from sqlalchemy import insert, text
+from app.models.ruta import Ruta, TipoRuta
 from app.models.ruta_cliente import RutaCliente
-from app.models.ruta_asignada import RutaAsignada
+from app.models.ruta_asignada import RutaAsignada, EstadoAsignacion
+from app.models.cliente import Cliente
 from app.schemas.ruta import RutaCreate, RutaUpdate
+from app.services.dashboard_cache import invalidar_rutas
+from app.crud.pagination import paginate
+
+LOTE_IDS = 2000
+ESPERA_BLOQUEO_PLAN_MS = 30000
+
+class PlanEntregasExistenteError(ValueError):
+    """Ya hay rutas de entrega asignadas a esos repartidores para la fecha"""
+    def __init__(self, message: str, asignacion_ids: list):
+        super().__init__(message)
+        self.asignacion_ids = asignacion_ids
 
 def get_ruta(db: Session, ruta_id: int):
     return db.query(Ruta).filter(Ruta.id == ruta_id).first()
 
-def get_rutas(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(Ruta).order_by(Ruta.id).offset(skip).limit(limit).all()
+def get_clientes_de_ruta(db: Session, ruta_id: int):
+    """Clientes de la ruta con su orden manual, en una sola consulta"""
+    return db.query(RutaCliente.orden, Cliente).join(
+        Cliente, Cliente.id == RutaCliente.cliente_id
+    ).filter(RutaCliente.ruta_id == ruta_id).order_by(RutaCliente.orden, RutaCliente.id).all()
+
+def get_clientes_para_rutas(db: Session, cliente_ids: list = None):
+    """
+    (id, latitud, longitud) de los clientes activos indicados o, si no se
+    indican, de los que no pertenecen a ninguna ruta activa
+    """
+    query = db.query(Cliente.id, Cliente.latitud, Cliente.longitud).filter(Cliente.estado == True)
+    if cliente_ids is None:
+        con_ruta = db.query(RutaCliente.cliente_id).join(
+            Ruta, Ruta.id == RutaCliente.ruta_id
+        ).filter(Ruta.estado == True)
+        return query.filter(Cliente.id.notin_(con_ruta)).order_by(Cliente.id).all()
+    
+    # SQL Server admite como mucho 2100 parámetros por consulta
+    ids = sorted(set(cliente_ids))
+    filas = []
+    for inicio in range(0, len(ids), LOTE_IDS):
+        filas.extend(query.filter(Cliente.id.in_(ids[inicio:inicio + LOTE_IDS])).order_by(Cliente.id).all())
+    return filas
+
+def get_rutas(db: Session, skip: int = 0, limit: int = 100, after: int = None, tipo: str = None):
+    query = db.query(Ruta)
+    if tipo:
+        query = query.filter(Ruta.tipo == tipo)
+    return paginate(query, Ruta.id, skip=skip, limit=limit, after=after)
 
 def get_rutas_activas(db: Session):
     return db.query(Ruta).filter(Ruta.estado == True).all()
@@ -38,9 +79,128 @@ def create_ruta(db: Session, ruta: RutaCreate):
             db.add(db_ruta_cliente)
     
     db.commit()
+    invalidar_rutas()
     db.refresh(db_ruta)
     return db_ruta
 
+def _agregar_rutas(db: Session, tipo, creada_por_id: int, rutas: list, usuario_ids: list = None, fecha=None):
+    """Agregar (sin commit) las rutas [(nombre, [cliente_id en orden])] y sus asignaciones"""
+    db_rutas = [
+        Ruta(nombre=nombre, tipo=tipo, creada_por_id=creada_por_id, estado=True)
+        for nombre, _ in rutas
+    ]
+    if not db_rutas:
+        return [], []
+    db.add_all(db_rutas)
+    db.flush()
+    
+    # Las paradas se insertan en bloque (executemany)
+    db.execute(insert(RutaCliente), [
+        {"ruta_id": db_ruta.id, "cliente_id": cliente_id, "orden": orden}
+        for db_ruta, (_, cliente_ids) in zip(db_rutas, rutas)
+        for orden, cliente_id in enumerate(cliente_ids, start=1)
+    ])
+    
+    asignaciones = []
+    if usuario_ids is not None:
+        asignaciones = [
+            RutaAsignada(ruta_id=db_ruta.id, usuario_id=usuario_id, fecha=fecha)
+            for db_ruta, usuario_id in zip(db_rutas, usuario_ids)
+        ]
+        db.add_all(asignaciones)
+        db.flush()
+    return db_rutas, asignaciones
+
+def crear_rutas_generadas(db: Session, tipo, creada_por_id: int, rutas: list, usuario_ids: list = None, fecha=None):
+    """
+    Crear en una transacción las rutas [(nombre, [cliente_id en orden de visita])]
+    y, si se indican usuario_ids (uno por ruta), sus asignaciones para la fecha.
+    Devuelve (rutas, asignaciones).
+    """
+    db_rutas, asignaciones = _agregar_rutas(db, tipo, creada_por_id, rutas, usuario_ids, fecha)
+    db.commit()
+    invalidar_rutas()
+    return db_rutas, asignaciones
+
+def get_asignaciones_entrega(db: Session, fecha, usuario_ids: list):
+    """Asignaciones no canceladas de rutas de entrega de esos usuarios para la fecha"""
+    return db.query(RutaAsignada).join(Ruta, Ruta.id == RutaAsignada.ruta_id).filter(
+        Ruta.tipo == TipoRuta.ENTREGA,
+        RutaAsignada.fecha == fecha,
+        RutaAsignada.usuario_id.in_(usuario_ids),
+        RutaAsignada.estado != EstadoAsignacion.CANCELADA
+    ).order_by(RutaAsignada.id).all()
+
+def get_clientes_en_entregas(db: Session, fecha, excepto_usuario_ids: list = ()):
+    """Clientes que ya están en una ruta de entrega activa asignada para la fecha (salvo a esos usuarios)"""
+    query = db.query(RutaCliente.cliente_id).join(
+        Ruta, Ruta.id == RutaCliente.ruta_id
+    ).join(RutaAsignada, RutaAsignada.ruta_id == Ruta.id).filter(
+        Ruta.tipo == TipoRuta.ENTREGA,
+        Ruta.estado == True,
+        RutaAsignada.fecha == fecha,
+        RutaAsignada.estado != EstadoAsignacion.CANCELADA
+    )
+    if excepto_usuario_ids:
+        query = query.filter(RutaAsignada.usuario_id.notin_(excepto_usuario_ids))
+    return {cliente_id for (cliente_id,) in query.distinct()}
+
+def sentencia_bloqueo_plan(dialecto: str, fecha):
+    """
+    (sentencia, parámetros) que bloquea en exclusiva el plan de entregas de la fecha
+    hasta que termine la transacción, o (None, None) si el motor no lo admite.
+    """
+    if dialecto != "mssql":
+        return None, None
+    # SQL Server ignora FOR UPDATE; sp_getapplock devuelve < 0 si no obtuvo el bloqueo
+    sentencia = text(
+        "DECLARE @resultado int; "
+        "EXEC @resultado = sp_getapplock @Resource = :recurso, @LockMode = 'Exclusive', "
+        "@LockOwner = 'Transaction', @LockTimeout = :espera; "
+        "IF @resultado < 0 THROW 50000, 'No se pudo bloquear el plan de entregas', 1;"
+    )
+    return sentencia, {"recurso": f"plan_entregas:{fecha.isoformat()}", "espera": ESPERA_BLOQUEO_PLAN_MS}
+
+def bloquear_plan_entregas(db: Session, fecha):
+    """
+    Serializar las planificaciones de una misma fecha. Llamar antes de leer la
+    demanda: el bloqueo dura hasta el commit (o rollback) de crear_plan_entregas.
+    """
+    sentencia, parametros = sentencia_bloqueo_plan(db.get_bind().dialect.name, fecha)
+    if sentencia is not None:
+        db.execute(sentencia, parametros)
+
+def crear_plan_entregas(db: Session, fecha, creada_por_id: int, rutas: list, usuario_ids: list,
+                        repartidor_ids: list, reemplazar: bool = False):
+    """
+    Crear las rutas de entrega del plan y sus asignaciones (usuario_ids, una por ruta)
+    en una sola transacción. Si los repartidores del plan ya tienen entregas para la
+    fecha lanza PlanEntregasExistenteError, salvo con reemplazar: entonces las
+    asignaciones anteriores se cancelan y sus rutas se desactivan en la misma transacción
+    (las ya completadas no se reemplazan). Devuelve (rutas, asignaciones, reemplazadas).
+    Debe ir en la misma transacción que bloquear_plan_entregas.
+    """
+    existentes = get_asignaciones_entrega(db, fecha, repartidor_ids)
+    if existentes:
+        completadas = [a.id for a in existentes if a.estado == EstadoAsignacion.COMPLETADA]
+        if not reemplazar or completadas:
+            db.rollback()
+            detalle = "completadas" if completadas else "asignadas"
+            raise PlanEntregasExistenteError(
+                f"Ya hay rutas de entrega {detalle} para esos repartidores el {fecha}",
+                completadas or [a.id for a in existentes]
+            )
+        for asignacion in existentes:
+            asignacion.estado = EstadoAsignacion.CANCELADA
+        db.query(Ruta).filter(Ruta.id.in_({a.ruta_id for a in existentes})).update(
+            {"estado": False}, synchronize_session=False
+        )
+    
+    db_rutas, asignaciones = _agregar_rutas(db, TipoRuta.ENTREGA, creada_por_id, rutas, usuario_ids, fecha)
+    db.commit()
+    invalidar_rutas()
+    return db_rutas, asignaciones, existentes
+
 def update_ruta(db: Session, ruta_id: int, ruta_update: RutaUpdate):
     db_ruta = db.query(Ruta).filter(Ruta.id == ruta_id).first()
     if not db_ruta:
@@ -51,6 +211,7 @@ def update_ruta(db: Session, ruta_id: int, ruta_update: RutaUpdate):
         setattr(db_ruta, field, value)
     
     db.commit()
+    invalidar_rutas()
     db.refresh(db_ruta)
     return db_ruta
 
@@ -59,6 +220,7 @@ def delete_ruta(db: Session, ruta_id: int):
     if db_ruta:
         db_ruta.estado = False
         db.commit()
+        invalidar_rutas()
         return True
     return False
 
@@ -71,6 +233,7 @@ def add_cliente_a_ruta(db: Session, ruta_id: int, cliente_id: int, orden: int):
     )
     db.add(db_ruta_cliente)
     db.commit()
+    invalidar_rutas()
     db.refresh(db_ruta_cliente)
     return db_ruta_cliente
 
@@ -79,6 +242,7 @@ def remove_cliente_de_ruta(db: Session, ruta_cliente_id: int):
     if db_ruta_cliente:
         db.delete(db_ruta_cliente)
         db.commit()
+        invalidar_rutas()
         return True
     return False
 
@@ -91,6 +255,7 @@ def asignar_ruta_usuario(db: Session, ruta_id: int, usuario_id: int, fecha):
     )
     db.add(db_ruta_asignada)
     db.commit()
+    invalidar_rutas()
     db.refresh(db_ruta_asignada)
     return db_ruta_asignada
 
@@ -99,5 +264,6 @@ def desasignar_ruta_usuario(db: Session, ruta_asignada_id: int):
     if db_ruta_asignada:
         db.delete(db_ruta_asignada)
         db.commit()
+        invalidar_rutas()
         return True
     return False
\ No newline at end of file
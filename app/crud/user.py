@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
 from app.models.user import User
+from app.models.role import Role
 from app.schemas.user import UserCreate, UserUpdate
 from app.auth.utils import get_password_hash
+from app.auth.cache import principal_cache
+from app.crud.pagination import paginate
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
@@ -12,10 +15,20 @@ def get_user_by_username(db: Session, username: str):
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).order_by(User.id).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after: int = None):
+    return paginate(db.query(User), User.id, skip=skip, limit=limit, after=after)
 
-def create_user(db: Session, user: UserCreate):
+def get_repartidores(db: Session, user_ids: list = None):
+    """Usuarios activos con rol repartidor (todos o los indicados)"""
+    query = db.query(User).join(Role, Role.id == User.role_id).filter(
+        Role.name == "repartidor",
+        User.is_active == True
+    )
+    if user_ids is not None:
+        query = query.filter(User.id.in_(user_ids))
+    return query.order_by(User.id).all()
+
+def create_user(db: Session, user: UserCreate, hashed_password: str = None):
     from app.models.role import Role
     default_role = db.query(Role).filter(Role.name == "usuario_sistema").first()
     
@@ -24,7 +37,8 @@ def create_user(db: Session, user: UserCreate):
         if not default_role:
             raise Exception("No hay roles disponibles en la base de datos")
     
-    hashed_password = get_password_hash(user.password)
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -47,6 +61,7 @@ def update_user(db: Session, user_id: int, user_update: UserUpdate):
     
     db.commit()
     db.refresh(db_user)
+    principal_cache.invalidate_user(user_id)
     return db_user
 
 def delete_user(db: Session, user_id: int):
@@ -54,6 +69,7 @@ def delete_user(db: Session, user_id: int):
     if db_user:
         db_user.is_active = False
         db.commit()
+        principal_cache.invalidate_user(user_id)
         return True
     return False
 
@@ -68,4 +84,5 @@ def update_user_role(db: Session, user_id: int, role_id: int):
     user.role_id = role_id
     db.commit()
     db.refresh(user)
+    principal_cache.invalidate_user(user_id)
     return user
\ No newline at end of file
@@ -0,0 +1,60 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import cast, Date, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date
+from decimal import Decimal
+from app.models.pedido import Pedido, EstadoPedido
+from app.models.venta_diaria import VentaDiaria
+
+def registrar_venta(db: Session, fecha: date, estado: EstadoPedido, total: Decimal, cantidad: int = 1):
+    """
+    Sumar (o restar, con valores negativos) un pedido al acumulado del día.
+    No hace commit: se ejecuta dentro de la transacción del pedido.
+    """
+    filtro = (VentaDiaria.fecha == fecha, VentaDiaria.estado == estado)
+    valores = {
+        "total_ventas": VentaDiaria.total_ventas + total,
+        "cantidad_pedidos": VentaDiaria.cantidad_pedidos + cantidad
+    }
+    result = db.execute(
+        update(VentaDiaria).where(*filtro).values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+    
+    # Primera venta del día para este estado; si otra transacción la insertó antes, se actualiza
+    try:
+        with db.begin_nested():
+            db.execute(insert(VentaDiaria).values(
+                fecha=fecha, estado=estado, total_ventas=total, cantidad_pedidos=cantidad
+            ))
+    except IntegrityError:
+        db.execute(
+            update(VentaDiaria).where(*filtro).values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+
+def cambiar_estado_venta(db: Session, fecha: date, estado_anterior, estado_nuevo, total: Decimal):
+    if estado_anterior == estado_nuevo:
+        return
+    registrar_venta(db, fecha, estado_anterior, -total, -1)
+    registrar_venta(db, fecha, estado_nuevo, total, 1)
+
+def backfill_ventas_diarias(db: Session):
+    """Reconstruir el acumulado completo a partir de la tabla pedidos"""
+    fecha = cast(Pedido.created_at, Date)
+    db.query(VentaDiaria).delete(synchronize_session=False)
+    db.execute(
+        insert(VentaDiaria).from_select(
+            ["fecha", "estado", "total_ventas", "cantidad_pedidos"],
+            select(
+                fecha,
+                Pedido.estado,
+                func.coalesce(func.sum(Pedido.total), 0),
+                func.count(Pedido.id)
+            ).group_by(fecha, Pedido.estado)
+        )
+    )
+    db.commit()
+    return db.query(VentaDiaria).count()
@@ -0,0 +1,123 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import cast, Date, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from app.models.pedido import Pedido
+from app.models.detalle_pedido import DetallePedido
+from app.models.producto import Producto
+from app.models.venta_producto import VentaProducto, VentaProductoDiaria
+
+def lineas_por_producto(detalles, signo: int = 1):
+    """Agrupar líneas de pedido en {producto_id: (cantidad, subtotal)}; signo=-1 para restar"""
+    lineas = {}
+    for detalle in detalles:
+        cantidad, subtotal = lineas.get(detalle.producto_id, (0, Decimal('0.00')))
+        lineas[detalle.producto_id] = (
+            cantidad + signo * detalle.cantidad,
+            subtotal + signo * detalle.precio_unitario * detalle.cantidad
+        )
+    return lineas
+
+def _acumular(db: Session, modelo, filtro: tuple, claves: dict, cantidad: int, total: Decimal):
+    valores = {
+        "cantidad_vendida": modelo.cantidad_vendida + cantidad,
+        "total_ventas": modelo.total_ventas + total
+    }
+    result = db.execute(
+        update(modelo).where(*filtro).values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return
+
+    # Primera venta del producto (o del día); si otra transacción la insertó antes, se actualiza
+    try:
+        with db.begin_nested():
+            db.execute(insert(modelo).values(**claves, cantidad_vendida=cantidad, total_ventas=total))
+    except IntegrityError:
+        db.execute(
+            update(modelo).where(*filtro).values(**valores)
+            .execution_options(synchronize_session=False)
+        )
+
+def registrar_ventas_productos(db: Session, fecha: date, lineas: dict):
+    """
+    Sumar (o restar) las líneas de un pedido a los contadores por producto, total y del día.
+    No hace commit: se ejecuta dentro de la transacción del pedido.
+    """
+    for producto_id in sorted(lineas):
+        cantidad, total = lineas[producto_id]
+        _acumular(
+            db, VentaProducto, (VentaProducto.producto_id == producto_id,),
+            {"producto_id": producto_id}, cantidad, total
+        )
+        _acumular(
+            db, VentaProductoDiaria,
+            (VentaProductoDiaria.fecha == fecha, VentaProductoDiaria.producto_id == producto_id),
+            {"fecha": fecha, "producto_id": producto_id}, cantidad, total
+        )
+
+def get_top_productos(db: Session, limit: int = 5, dias: int = None):
+    """Productos más vendidos (histórico o de los últimos N días) desde los contadores"""
+    if dias is None:
+        # Lectura directa de la tabla de contadores, ordenada por el índice de cantidad_vendida
+        ranking = select(
+            VentaProducto.producto_id,
+            VentaProducto.cantidad_vendida,
+            VentaProducto.total_ventas
+        ).where(VentaProducto.cantidad_vendida > 0
+        ).order_by(VentaProducto.cantidad_vendida.desc())
+    else:
+        desde = datetime.now().date() - timedelta(days=dias - 1)
+        cantidad = func.sum(VentaProductoDiaria.cantidad_vendida)
+        ranking = select(
+            VentaProductoDiaria.producto_id,
+            cantidad.label("cantidad_vendida"),
+            func.sum(VentaProductoDiaria.total_ventas).label("total_ventas")
+        ).where(VentaProductoDiaria.fecha >= desde
+        ).group_by(VentaProductoDiaria.producto_id
+        ).having(cantidad > 0
+        ).order_by(cantidad.desc())
+    ranking = ranking.limit(limit).subquery()
+    
+    return db.execute(
+        select(
+            Producto.id,
+            Producto.nombre,
+            Producto.sku,
+            ranking.c.cantidad_vendida,
+            ranking.c.total_ventas
+        ).join(ranking, ranking.c.producto_id == Producto.id
+        ).order_by(ranking.c.cantidad_vendida.desc(), Producto.id)
+    ).all()
+
+def backfill_ventas_productos(db: Session):
+    """Reconstruir los contadores por producto a partir de detalle_pedidos"""
+    fecha = cast(Pedido.created_at, Date)
+    db.query(VentaProducto).delete(synchronize_session=False)
+    db.query(VentaProductoDiaria).delete(synchronize_session=False)
+    db.execute(
+        insert(VentaProducto).from_select(
+            ["producto_id", "cantidad_vendida", "total_ventas"],
+            select(
+                DetallePedido.producto_id,
+                func.sum(DetallePedido.cantidad),
+                func.coalesce(func.sum(DetallePedido.subtotal), 0)
+            ).group_by(DetallePedido.producto_id)
+        )
+    )
+    db.execute(
+        insert(VentaProductoDiaria).from_select(
+            ["fecha", "producto_id", "cantidad_vendida", "total_ventas"],
+            select(
+                fecha,
+                DetallePedido.producto_id,
+                func.sum(DetallePedido.cantidad),
+                func.coalesce(func.sum(DetallePedido.subtotal), 0)
+            ).join(Pedido, Pedido.id == DetallePedido.pedido_id
+            ).group_by(fecha, DetallePedido.producto_id)
+        )
+    )
+    db.commit()
+    return db.query(VentaProducto).count()
@@ -1,6 +1,13 @@
 from fastapi import FastAPI, Depends
 from fastapi.openapi.utils import get_openapi
-from app.config.database import Base, engine
+from app.config.database import Base, engine, async_engine
+from app.config.pool_metrics import pool_stats, warmup_pool, warmup_async_pool
+from app.config.config import settings
+from app.config.executors import executor_stats, shutdown_executors
+from app.services.dashboard_cache import dashboard_cache
+from app.services.distancias import cache_distancias
+from app.services.indice_espacial import indice_clientes
+from app.routes.serializacion import default_response_class
 from app.models.user import User
 from app.models.role import Role
 from app.models.permission import Permission
@@ -18,7 +25,8 @@ app = FastAPI(
     description="Sistema de autenticación con permisos granulares",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=default_response_class()
 )
 
 # ✅ CONFIGURACIÓN PERSONALIZADA DE OPENAPI PARA OCULTAR PARÁMETROS
@@ -69,9 +77,47 @@ app.include_router(dashboard.router)
 def read_root():
     return {"message": "¡FastAPI Auth funcionando con SQL Server!"}
 
+# Resultado del precalentamiento, visible en /health
+warmup_status = {"ok": True, "connections": 0, "error": None}
+
+@app.on_event("startup")
+async def warmup_connections():
+    # Las conexiones se abren antes de que la app empiece a aceptar peticiones
+    warmup = min(settings.DB_POOL_WARMUP, settings.DB_POOL_SIZE)
+    if warmup <= 0:
+        return
+    try:
+        opened = warmup_pool(engine, warmup)
+        if async_engine is not None:
+            await warmup_async_pool(async_engine, warmup)
+        warmup_status["connections"] = opened
+        print(f"✅ Pool de conexiones precalentado ({opened} conexiones)")
+    except Exception as e:
+        warmup_status.update(ok=False, error=repr(e))
+        print(f"❌ Error precalentando el pool: {e}")
+        # Sin base de datos la app no debe anunciarse lista
+        if settings.DB_POOL_WARMUP_STRICT:
+            raise
+
+@app.on_event("shutdown")
+def shutdown():
+    shutdown_executors()
+
 @app.get("/health", tags=["Health"])
 def health_check():
-    return {"status": "healthy"}
+    return {
+        "status": "healthy" if warmup_status["ok"] else "degraded",
+        "db_mode": "async" if settings.DB_ASYNC_MODE else "sync",
+        # El motor síncrono sigue atendiendo las rutas con get_db también en modo async
+        "db_pool": pool_stats(engine),
+        "db_pool_async": pool_stats(async_engine) if async_engine is not None else None,
+        "db_warmup": warmup_status,
+        "pools": executor_stats(),
+        "dashboard_cache": dashboard_cache.stats(),
+        "dashboard_stream": dashboard.dashboard_hub.stats(),
+        "distancias": cache_distancias.stats(),
+        "indice_clientes": indice_clientes.stats()
+    }
 
 @app.get("/protected", tags=["Test"])
 def protected_route(current_user: User = Depends(admin.get_current_active_user)):
@@ -10,6 +10,9 @@ from .pedido import Pedido
 from .detalle_pedido import DetallePedido
 from .entrega import Entrega
 from .cobro import Cobro
+from .idempotency_key import IdempotencyKey
+from .venta_diaria import VentaDiaria
+from .venta_producto import VentaProducto, VentaProductoDiaria
 
 # Esto asegura que SQLAlchemy conozca todos los modelos
-__all__ = ["User", "Role", "Permission", "Cliente", "Producto", "Ruta", "RutaCliente", "RutaAsignada", "Pedido", "DetallePedido", "Entrega", "Cobro"]
\ No newline at end of file
+__all__ = ["User", "Role", "Permission", "Cliente", "Producto", "Ruta", "RutaCliente", "RutaAsignada", "Pedido", "DetallePedido", "Entrega", "Cobro", "IdempotencyKey", "VentaDiaria", "VentaProducto", "VentaProductoDiaria"]
\ No newline at end of file
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.config.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        # El índice único resuelve la búsqueda de reintentos en una sola lectura
+        UniqueConstraint("user_id", "endpoint", "clave", name="uq_idempotency_user_endpoint_clave"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    endpoint = Column(String(100), nullable=False)
+    clave = Column(String(100), nullable=False)
+    request_hash = Column(String(64))  # SHA-256 del cuerpo; otra petición con la misma clave recibe 422
+    status_code = Column(Integer)  # NULL mientras la petición original sigue en proceso
+    response_body = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)  # purga por TTL
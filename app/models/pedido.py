@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, DECIMAL
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Enum, DECIMAL, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.config.database import Base
@@ -12,6 +12,14 @@ class EstadoPedido(str, enum.Enum):
 
 class Pedido(Base):
     __tablename__ = "pedidos"
+    # Devolver created_at/updated_at en el mismo INSERT/UPDATE (se usan para el acumulado diario)
+    __mapper_args__ = {"eager_defaults": True}
+    # Consultas por cliente, vendedor o estado en un rango de fechas (ver buscar_pedidos)
+    __table_args__ = (
+        Index("ix_pedidos_cliente_created_at", "cliente_id", "created_at"),
+        Index("ix_pedidos_vendedor_created_at", "vendedor_id", "created_at"),
+        Index("ix_pedidos_estado_created_at", "estado", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
@@ -19,11 +27,12 @@ class Pedido(Base):
     fecha_pedido = Column(DateTime(timezone=True), server_default=func.now())
     total = Column(DECIMAL(10, 2), nullable=False)
     estado = Column(Enum(EstadoPedido), default=EstadoPedido.PENDIENTE_ENTREGA)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Indexado para los rangos de fecha del dashboard
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relaciones
     cliente = relationship("Cliente", back_populates="pedidos")
     vendedor = relationship("User", back_populates="pedidos")
-    detalle_pedidos = relationship("DetallePedido", back_populates="pedido")
+    detalle_pedidos = relationship("DetallePedido", back_populates="pedido", cascade="all, delete-orphan")
     entrega = relationship("Entrega", back_populates="pedido", uselist=False)
\ No newline at end of file
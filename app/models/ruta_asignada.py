@@ -13,7 +13,7 @@ class RutaAsignada(Base):
     __tablename__ = "rutas_asignadas"
     
     id = Column(Integer, primary_key=True, index=True)
-    ruta_id = Column(Integer, ForeignKey("rutas.id"), nullable=False)
+    ruta_id = Column(Integer, ForeignKey("rutas.id"), nullable=False, index=True)
     usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     fecha = Column(Date, nullable=False)
     estado = Column(Enum(EstadoAsignacion), default=EstadoAsignacion.PROGRAMADA)
@@ -7,7 +7,7 @@ class RutaCliente(Base):
     __tablename__ = "rutas_clientes"
     
     id = Column(Integer, primary_key=True, index=True)
-    ruta_id = Column(Integer, ForeignKey("rutas.id"), nullable=False)
+    ruta_id = Column(Integer, ForeignKey("rutas.id"), nullable=False, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
     orden = Column(Integer, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
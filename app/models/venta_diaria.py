@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, Date, Enum, DECIMAL
+from app.config.database import Base
+from app.models.pedido import EstadoPedido
+
+class VentaDiaria(Base):
+    """Acumulado de ventas por día y estado, mantenido al crear, cambiar de estado o eliminar pedidos"""
+    __tablename__ = "ventas_diarias"
+    
+    fecha = Column(Date, primary_key=True)
+    estado = Column(Enum(EstadoPedido), primary_key=True)
+    total_ventas = Column(DECIMAL(14, 2), nullable=False, default=0)
+    cantidad_pedidos = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Date, ForeignKey, DECIMAL
+from app.config.database import Base
+
+class VentaProducto(Base):
+    """Unidades y monto vendidos por producto (histórico), para el ranking de productos populares"""
+    __tablename__ = "ventas_productos"
+    
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    cantidad_vendida = Column(Integer, nullable=False, default=0, index=True)
+    total_ventas = Column(DECIMAL(14, 2), nullable=False, default=0)
+
+class VentaProductoDiaria(Base):
+    """Mismos contadores por día, para rankings de una ventana de tiempo (últimos N días)"""
+    __tablename__ = "ventas_productos_diarias"
+    
+    fecha = Column(Date, primary_key=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    cantidad_vendida = Column(Integer, nullable=False, default=0)
+    total_ventas = Column(DECIMAL(14, 2), nullable=False, default=0)
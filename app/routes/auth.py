@@ -3,35 +3,37 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.config.database import get_db
 from app.schemas.user import UserCreate, UserLogin, LoginResponse
-from app.auth.utils import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.auth.utils import authenticate_user_async, create_access_token, get_password_hash, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.crud.user import create_user, get_user_by_email, get_user_by_username
 from app.auth.dependencies import get_current_active_user
 from app.auth.validators import validate_password
+from app.config.executors import run_db, run_password_hash
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 @router.post("/register", response_model=LoginResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: Session = Depends(get_db)):
     """
     Registrar un nuevo usuario
     """
     validate_password(user.password)
     # Verificar si el email ya existe
-    if get_user_by_email(db, user.email):
+    if await run_db(get_user_by_email, db, user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El email ya está registrado"
         )
     
     # Verificar si el username ya existe
-    if get_user_by_username(db, user.username):
+    if await run_db(get_user_by_username, db, user.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El nombre de usuario ya existe"
         )
     
-    # Crear usuario
-    db_user = create_user(db, user)
+    # Crear usuario (el hash bcrypt se calcula en el pool de procesos)
+    hashed_password = await run_password_hash(get_password_hash, user.password)
+    db_user = await run_db(create_user, db, user, hashed_password)
     
     # Crear token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -46,11 +48,11 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=LoginResponse)
-def login(user_data: UserLogin, db: Session = Depends(get_db)):
+async def login(user_data: UserLogin, db: Session = Depends(get_db)):
     """
     Iniciar sesión y obtener token JWT
     """
-    user = authenticate_user(user_data.email, user_data.password)
+    user = await authenticate_user_async(user_data.email, user_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,27 +1,48 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.config.database import get_db
-from app.schemas.cliente import ClienteResponse, ClienteCreate, ClienteUpdate
+from app.schemas.cliente import ClienteResponse, ClienteCreate, ClienteUpdate, ClienteCercano
 from app.auth.dependencies import get_current_active_user, can_manage_products
 from app.crud import cliente as cliente_crud
 from app.models.user import User
+from app.routes.pagination import cursor_after, set_next_cursor
+from app.routes.serializacion import respuesta_lista
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"])
 
 @router.get("/", response_model=List[ClienteResponse])
 def get_clientes(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[int] = Depends(cursor_after),
     token: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de clientes
+    Obtener lista de clientes (por offset con skip o por cursor con after)
     """
-    clientes = cliente_crud.get_clientes(db, skip=skip, limit=limit)
-    return clientes
+    clientes = cliente_crud.get_clientes(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(response, clientes, limit)
+    return respuesta_lista(response, ClienteResponse, clientes)
+
+@router.get("/cercanos", response_model=List[ClienteCercano])
+def get_clientes_cercanos(
+    response: Response,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radio_km: float = Query(5, gt=0, le=500),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Obtener clientes activos a menos de radio_km del punto, del más cercano al más lejano
+    """
+    clientes = cliente_crud.get_clientes_cercanos(db, lat, lon, radio_km, limit)
+    return respuesta_lista(response, ClienteCercano, clientes)
 
 @router.get("/{cliente_id}", response_model=ClienteResponse)
 def get_cliente(
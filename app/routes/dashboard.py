@@ -1,109 +1,200 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List
-from app.config.database import get_db
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.config.database import get_session
 from app.schemas.dashboard import (
     DashboardResponse, ResumenGeneral, MetricasVentas, 
     ProductoPopular, PedidoPendiente, RutaActiva, EstadisticasVentasMensuales
 )
 from app.auth.dependencies import get_current_active_user
-from app.crud import dashboard as dashboard_crud
+from app.crud.aio import dashboard as dashboard_crud
+from app.crud import dashboard as dashboard_queries
+from app.config.config import settings
+from app.config.executors import run_crud_isolated
 from app.models.user import User
+from app.services.dashboard_cache import dashboard_cache
+from app.services.dashboard_events import crear_dashboard_hub
+from app.routes.serializacion import respuesta_modelo
 
 router = APIRouter(prefix="/dashboard", tags=["Dashboard"])
 
+async def _seccion(nombre: str, db, funcion, *params):
+    """Obtener una sección del dashboard desde la caché o calcularla una sola vez"""
+    return await dashboard_cache.get_or_compute(nombre, lambda: funcion(db, *params), *params)
+
+# Secciones de GET /dashboard/: (campo de la respuesta, sección de caché, consulta, parámetros)
+SECCIONES_DASHBOARD = [
+    ("resumen_general", "resumen", dashboard_queries.get_resumen_general, ()),
+    ("metricas_ventas", "metricas", dashboard_queries.get_metricas_ventas, ()),
+    ("productos_populares", "populares", dashboard_queries.get_productos_populares, (5, None)),
+    ("pedidos_pendientes", "pendientes", dashboard_queries.get_pedidos_pendientes, (5,)),
+    ("rutas_activas", "rutas", dashboard_queries.get_rutas_activas, ()),
+    ("ventas_mensuales", "mensuales", dashboard_queries.get_ventas_mensuales, (6,)),
+]
+
+async def _seccion_con_timeout(nombre: str, funcion, params: tuple):
+    """
+    Calcular una sección en su propia sesión con límite de tiempo.
+    Si tarda o falla se devuelve el último valor conocido (o None) en lugar de fallar.
+    """
+    try:
+        valor = await asyncio.wait_for(
+            dashboard_cache.get_or_compute(nombre, lambda: run_crud_isolated(funcion, *params), *params),
+            timeout=settings.DASHBOARD_SECTION_TIMEOUT_SECONDS
+        )
+        return valor, False
+    except Exception as e:
+        print(f"❌ Sección '{nombre}' del dashboard degradada: {e!r}")
+        return dashboard_cache.ultimo_valor(nombre, *params), True
+
+# Un solo recálculo por cambio alimenta a todos los clientes de /dashboard/stream
+dashboard_hub = crear_dashboard_hub(SECCIONES_DASHBOARD, DashboardResponse)
+
+async def _dashboard_en_paralelo():
+    resultados = await asyncio.gather(*(
+        _seccion_con_timeout(nombre, funcion, params)
+        for _, nombre, funcion, params in SECCIONES_DASHBOARD
+    ))
+    
+    datos = {}
+    degradadas = []
+    for (campo, _, _, _), (valor, degradada) in zip(SECCIONES_DASHBOARD, resultados):
+        datos[campo] = valor
+        if degradada:
+            degradadas.append(campo)
+    
+    return DashboardResponse(**datos, secciones_degradadas=degradadas)
+
 @router.get("/", response_model=DashboardResponse)
-def get_dashboard(
-    db: Session = Depends(get_db),
+async def get_dashboard(
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener dashboard completo con todas las métricas
     """
+    if settings.DASHBOARD_PARALLEL:
+        # Cada sección en su conexión; una sección lenta no tumba la respuesta completa
+        return respuesta_modelo(await _dashboard_en_paralelo())
+    
     try:
         # Obtener todos los datos del dashboard
-        resumen_general = dashboard_crud.get_resumen_general(db)
-        metricas_ventas = dashboard_crud.get_metricas_ventas(db)
-        productos_populares = dashboard_crud.get_productos_populares(db)
-        pedidos_pendientes = dashboard_crud.get_pedidos_pendientes(db)
-        rutas_activas = dashboard_crud.get_rutas_activas(db)
-        ventas_mensuales = dashboard_crud.get_ventas_mensuales(db)
+        resumen_general = await _seccion("resumen", db, dashboard_crud.get_resumen_general)
+        metricas_ventas = await _seccion("metricas", db, dashboard_crud.get_metricas_ventas)
+        productos_populares = await _seccion("populares", db, dashboard_crud.get_productos_populares, 5, None)
+        pedidos_pendientes = await _seccion("pendientes", db, dashboard_crud.get_pedidos_pendientes, 5)
+        rutas_activas = await _seccion("rutas", db, dashboard_crud.get_rutas_activas)
+        ventas_mensuales = await _seccion("mensuales", db, dashboard_crud.get_ventas_mensuales, 6)
         
-        return DashboardResponse(
+        return respuesta_modelo(DashboardResponse(
             resumen_general=ResumenGeneral(**resumen_general),
             metricas_ventas=MetricasVentas(**metricas_ventas),
             productos_populares=productos_populares,
             pedidos_pendientes=pedidos_pendientes,
             rutas_activas=rutas_activas,
             ventas_mensuales=ventas_mensuales
-        )
+        ))
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error al generar dashboard: {str(e)}"
         )
 
+@router.get("/stream")
+async def stream_dashboard(current_user: User = Depends(get_current_active_user)):
+    """
+    Canal SSE con el dashboard en vivo: un evento 'snapshot' al conectar y
+    eventos 'delta' con las secciones que cambian al crear pedidos, cambiar
+    su estado o asignar rutas
+    """
+    suscriptor = dashboard_hub.suscribir()
+    
+    async def eventos():
+        try:
+            yield await dashboard_hub.snapshot()
+            while True:
+                try:
+                    mensaje = await asyncio.wait_for(
+                        suscriptor.cola.get(), timeout=settings.DASHBOARD_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    # Comentario SSE para mantener viva la conexión a través de proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                # None: el cliente se quedó atrás y se le reenvía el estado completo
+                yield mensaje if mensaje is not None else await dashboard_hub.snapshot()
+        finally:
+            dashboard_hub.desuscribir(suscriptor)
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/resumen", response_model=ResumenGeneral)
-def get_resumen(
-    db: Session = Depends(get_db),
+async def get_resumen(
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener solo el resumen general
     """
-    resumen = dashboard_crud.get_resumen_general(db)
+    resumen = await _seccion("resumen", db, dashboard_crud.get_resumen_general)
     return ResumenGeneral(**resumen)
 
 @router.get("/metricas-ventas", response_model=MetricasVentas)
-def get_metricas_ventas(
-    db: Session = Depends(get_db),
+async def get_metricas_ventas(
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener métricas de ventas
     """
-    metricas = dashboard_crud.get_metricas_ventas(db)
+    metricas = await _seccion("metricas", db, dashboard_crud.get_metricas_ventas)
     return MetricasVentas(**metricas)
 
 @router.get("/productos-populares", response_model=List[ProductoPopular])
-def get_productos_populares(
+async def get_productos_populares(
     limit: int = Query(5, description="Número de productos a mostrar"),
-    db: Session = Depends(get_db),
+    dias: Optional[int] = Query(None, ge=1, le=365, description="Solo ventas de los últimos N días"),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener productos más populares
     """
-    return dashboard_crud.get_productos_populares(db, limit)
+    return await _seccion("populares", db, dashboard_crud.get_productos_populares, limit, dias)
 
 @router.get("/pedidos-pendientes", response_model=List[PedidoPendiente])
-def get_pedidos_pendientes(
+async def get_pedidos_pendientes(
     limit: int = Query(5, description="Número de pedidos a mostrar"),
-    db: Session = Depends(get_db),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener pedidos pendientes de entrega
     """
-    return dashboard_crud.get_pedidos_pendientes(db, limit)
+    return await _seccion("pendientes", db, dashboard_crud.get_pedidos_pendientes, limit)
 
 @router.get("/rutas-activas", response_model=List[RutaActiva])
-def get_rutas_activas(
-    db: Session = Depends(get_db),
+async def get_rutas_activas(
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener rutas activas
     """
-    return dashboard_crud.get_rutas_activas(db)
+    return await _seccion("rutas", db, dashboard_crud.get_rutas_activas)
 
 @router.get("/ventas-mensuales", response_model=List[EstadisticasVentasMensuales])
-def get_ventas_mensuales(
+async def get_ventas_mensuales(
     meses: int = Query(6, description="Número de meses a mostrar"),
-    db: Session = Depends(get_db),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener estadísticas de ventas mensuales
     """
-    return dashboard_crud.get_ventas_mensuales(db, meses)
\ No newline at end of file
+    return await _seccion("mensuales", db, dashboard_crud.get_ventas_mensuales, meses)
\ No newline at end of file
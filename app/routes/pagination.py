@@ -0,0 +1,36 @@
+from typing import Optional
+from fastapi import HTTPException, Query, Response, status
+from app.crud.pagination import encode_cursor, decode_cursor, encode_keyset_cursor, decode_keyset_cursor
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def cursor_after(
+    after: Optional[str] = Query(None, description=f"Cursor opaco recibido en {NEXT_CURSOR_HEADER}; reemplaza a skip")
+) -> Optional[int]:
+    """Dependencia que traduce el cursor de la query a un id"""
+    if after is None:
+        return None
+    try:
+        return decode_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def set_next_cursor(response: Response, items, limit: int):
+    """Publicar el cursor de la página siguiente si la actual vino completa"""
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+
+def keyset_after(
+    after: Optional[str] = Query(None, description=f"Cursor opaco recibido en {NEXT_CURSOR_HEADER}")
+):
+    """Dependencia para listados ordenados por fecha: devuelve (fecha, id) o None"""
+    if after is None:
+        return None
+    try:
+        return decode_keyset_cursor(after)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+def set_next_keyset_cursor(response: Response, items, limit: int):
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_keyset_cursor(items[-1].created_at, items[-1].id)
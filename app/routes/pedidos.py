@@ -1,37 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Optional
-from app.config.database import get_db
-from app.schemas.pedidos import PedidoResponse, PedidoCreate, PedidoUpdate
-from app.auth.dependencies import get_current_active_user, can_manage_orders
-from app.crud import pedido as pedido_crud
+from datetime import datetime
+from app.config.database import get_session
+from app.schemas.pedidos import PedidoResponse, PedidoCreate, PedidoUpdate, PedidoLoteResponse, EstadoPedido
+from app.config.config import settings
+from app.auth.dependencies import get_current_active_user, can_manage_orders, can_view_reports
+from app.crud.aio import pedido as pedido_crud
+from app.crud.aio import idempotency as idempotency_crud
+from app.crud.pedido import StockInsuficienteError, PEDIDO_INCLUDES, consulta_exportacion
+from app.crud.idempotency import ClaveEnProcesoError, ClaveReutilizadaError, huella_peticion
 from app.models.user import User
+from app.services.exportacion import exportar
+from app.routes.pagination import cursor_after, set_next_cursor, keyset_after, set_next_keyset_cursor
+from app.routes.serializacion import respuesta_lista
 
 router = APIRouter(prefix="/pedidos", tags=["Pedidos"])
 
+def parse_include(
+    include: Optional[str] = Query(None, description="Relaciones a incluir, separadas por coma: detalles,cliente")
+):
+    """Dependencia que valida ?include= y devuelve las relaciones a cargar"""
+    if not include:
+        return ()
+    nombres = {nombre.strip() for nombre in include.split(",") if nombre.strip()}
+    desconocidos = nombres - set(PEDIDO_INCLUDES)
+    if desconocidos:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"include no válido: {', '.join(sorted(desconocidos))}"
+        )
+    return tuple(sorted(nombres))
+
 @router.get("/", response_model=List[PedidoResponse])
-def get_pedidos(
+async def get_pedidos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    after: Optional[int] = Depends(cursor_after),
+    include = Depends(parse_include),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de pedidos
+    Obtener lista de pedidos (por offset con skip o por cursor con after)
+    """
+    pedidos = await pedido_crud.get_pedidos(db, skip=skip, limit=limit, after=after, include=include)
+    set_next_cursor(response, pedidos, limit)
+    return respuesta_lista(response, PedidoResponse, pedidos)
+
+@router.get("/export")
+async def exportar_pedidos(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    desde: Optional[datetime] = Query(None, description="Creados desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Creados hasta (exclusive)"),
+    estado: Optional[EstadoPedido] = None,
+    detalles: bool = Query(True, description="Una fila por línea de pedido"),
+    current_user: User = Depends(can_view_reports)
+):
+    """
+    Exportar pedidos (y sus líneas) en CSV o NDJSON.
+    Se envía mientras se lee la base de datos, sin cargar todo en memoria.
     """
-    pedidos = pedido_crud.get_pedidos(db, skip=skip, limit=limit)
-    return pedidos
+    stmt = consulta_exportacion(desde, hasta, estado.value if estado else None, detalles)
+    contenido, media_type = exportar(stmt, formato)
+    nombre = f"pedidos_{datetime.now():%Y%m%d_%H%M%S}.{formato}"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{nombre}"'}
+    )
 
 @router.get("/{pedido_id}", response_model=PedidoResponse)
-def get_pedido(
+async def get_pedido(
     pedido_id: int,
-    db: Session = Depends(get_db),
+    include = Depends(parse_include),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener un pedido por ID
     """
-    pedido = pedido_crud.get_pedido(db, pedido_id)
+    pedido = await pedido_crud.get_pedido(db, pedido_id, include)
     if not pedido:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -40,45 +90,160 @@ def get_pedido(
     return pedido
 
 @router.get("/cliente/{cliente_id}", response_model=List[PedidoResponse])
-def get_pedidos_by_cliente(
+async def get_pedidos_by_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    desde: Optional[datetime] = Query(None, description="Creados desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Creados hasta (exclusive)"),
+    limit: int = Query(100, ge=1, le=500),
+    after = Depends(keyset_after),
+    include = Depends(parse_include),
+    db = Depends(get_session),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Obtener pedidos por cliente, del más reciente al más antiguo
+    """
+    pedidos = await pedido_crud.get_pedidos_by_cliente(db, cliente_id, desde, hasta, limit, after, include)
+    set_next_keyset_cursor(response, pedidos, limit)
+    return respuesta_lista(response, PedidoResponse, pedidos)
+
+@router.get("/vendedor/{vendedor_id}", response_model=List[PedidoResponse])
+async def get_pedidos_by_vendedor(
+    vendedor_id: int,
+    response: Response,
+    desde: Optional[datetime] = Query(None, description="Creados desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Creados hasta (exclusive)"),
+    limit: int = Query(100, ge=1, le=500),
+    after = Depends(keyset_after),
+    include = Depends(parse_include),
+    db = Depends(get_session),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Obtener pedidos por vendedor, del más reciente al más antiguo
+    """
+    pedidos = await pedido_crud.get_pedidos_by_vendedor(db, vendedor_id, desde, hasta, limit, after, include)
+    set_next_keyset_cursor(response, pedidos, limit)
+    return respuesta_lista(response, PedidoResponse, pedidos)
+
+@router.get("/estado/{estado}", response_model=List[PedidoResponse])
+async def get_pedidos_by_estado(
+    estado: EstadoPedido,
+    response: Response,
+    desde: Optional[datetime] = Query(None, description="Creados desde (inclusive)"),
+    hasta: Optional[datetime] = Query(None, description="Creados hasta (exclusive)"),
+    limit: int = Query(100, ge=1, le=500),
+    after = Depends(keyset_after),
+    include = Depends(parse_include),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener pedidos por cliente
+    Obtener pedidos por estado, del más reciente al más antiguo
     """
-    pedidos = pedido_crud.get_pedidos_by_cliente(db, cliente_id)
-    return pedidos
+    pedidos = await pedido_crud.get_pedidos_by_estado(db, estado.value, desde, hasta, limit, after, include)
+    set_next_keyset_cursor(response, pedidos, limit)
+    return respuesta_lista(response, PedidoResponse, pedidos)
+
+IDEMPOTENCY_ENDPOINT = "POST /pedidos"
+
+async def _liberar_clave(db, current_user: User, idempotency_key: Optional[str]):
+    if idempotency_key:
+        await idempotency_crud.liberar_clave(db, current_user.id, IDEMPOTENCY_ENDPOINT, idempotency_key)
 
 @router.post("/", response_model=PedidoResponse)
-def create_pedido(
+async def create_pedido(
     pedido: PedidoCreate,
-    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=100),
+    db = Depends(get_session),
     current_user: User = Depends(get_current_active_user)  # Vendedores pueden crear pedidos
 ):
     """
-    Crear un nuevo pedido
+    Crear un nuevo pedido.
+    Con el header Idempotency-Key los reintentos devuelven la respuesta original sin crear otro pedido.
     """
+    huella = huella_peticion(pedido) if idempotency_key else None
+    if idempotency_key:
+        try:
+            guardada = await idempotency_crud.reclamar_clave(
+                db, current_user.id, IDEMPOTENCY_ENDPOINT, idempotency_key, huella
+            )
+        except ClaveEnProcesoError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Ya hay una solicitud en proceso con esta Idempotency-Key"
+            )
+        except ClaveReutilizadaError:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="La Idempotency-Key ya se usó con un pedido distinto"
+            )
+        if guardada is not None:
+            status_code, body = guardada
+            return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+    
     try:
-        return pedido_crud.create_pedido(db, pedido)
+        db_pedido = await pedido_crud.create_pedido(db, pedido)
+    except StockInsuficienteError as e:
+        await _liberar_clave(db, current_user, idempotency_key)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": str(e), "lineas_fallidas": e.lineas_fallidas}
+        )
     except ValueError as e:
+        await _liberar_clave(db, current_user, idempotency_key)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except Exception:
+        await _liberar_clave(db, current_user, idempotency_key)
+        raise
+    
+    if not idempotency_key:
+        return db_pedido
+    
+    respuesta = PedidoResponse.model_validate(db_pedido).model_dump(mode="json")
+    await idempotency_crud.guardar_respuesta(
+        db, current_user.id, IDEMPOTENCY_ENDPOINT, idempotency_key, status.HTTP_200_OK, respuesta, huella
+    )
+    return respuesta
+
+@router.post("/lote", response_model=PedidoLoteResponse)
+async def create_pedidos_lote(
+    pedidos: List[PedidoCreate],
+    db = Depends(get_session),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Crear varios pedidos en una sola petición (sincronización de vendedores sin conexión)
+    """
+    if len(pedidos) > settings.PEDIDOS_LOTE_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote no puede tener más de {settings.PEDIDOS_LOTE_MAX} pedidos"
+        )
+    
+    resultados = await pedido_crud.create_pedidos_lote(db, pedidos)
+    creados = sum(1 for resultado in resultados if resultado["ok"])
+    return PedidoLoteResponse(
+        creados=creados,
+        fallidos=len(resultados) - creados,
+        resultados=resultados
+    )
 
 @router.put("/{pedido_id}", response_model=PedidoResponse)
-def update_pedido(
+async def update_pedido(
     pedido_id: int,
     pedido_update: PedidoUpdate,
-    db: Session = Depends(get_db),
+    db = Depends(get_session),
     current_user: User = Depends(can_manage_orders)  # Solo administradores pueden cambiar estado
 ):
     """
     Actualizar estado de un pedido
     """
-    pedido = pedido_crud.update_pedido_estado(db, pedido_id, pedido_update)
+    pedido = await pedido_crud.update_pedido_estado(db, pedido_id, pedido_update)
     if not pedido:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -87,15 +252,15 @@ def update_pedido(
     return pedido
 
 @router.delete("/{pedido_id}")
-def delete_pedido(
+async def delete_pedido(
     pedido_id: int,
-    db: Session = Depends(get_db),
+    db = Depends(get_session),
     current_user: User = Depends(can_manage_orders)  # Solo administradores
 ):
     """
     Eliminar un pedido
     """
-    success = pedido_crud.delete_pedido(db, pedido_id)
+    success = await pedido_crud.delete_pedido(db, pedido_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
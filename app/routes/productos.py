@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.config.database import get_db
@@ -6,22 +6,27 @@ from app.schemas.producto import ProductoResponse, ProductoCreate, ProductoUpdat
 from app.auth.dependencies import get_current_active_user, can_manage_products
 from app.crud import producto as producto_crud
 from app.models.user import User
+from app.routes.pagination import cursor_after, set_next_cursor
+from app.routes.serializacion import respuesta_lista
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
 @router.get("/", response_model=List[ProductoResponse])
 def get_productos(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[int] = Depends(cursor_after),
     token: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de productos
+    Obtener lista de productos (por offset con skip o por cursor con after)
     """
-    productos = producto_crud.get_productos(db, skip=skip, limit=limit)
-    return productos
+    productos = producto_crud.get_productos(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(response, productos, limit)
+    return respuesta_lista(response, ProductoResponse, productos)
 
 @router.get("/{producto_id}", response_model=ProductoResponse)
 def get_producto(
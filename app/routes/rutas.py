@@ -1,32 +1,46 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from app.config.database import get_db
-from app.schemas.ruta import RutaResponse, RutaCreate, RutaUpdate
+from app.config.config import settings
+from app.schemas.ruta import (
+    RutaResponse, RutaCreate, RutaUpdate,
+    RutaGeneracionRequest, RutaGeneracionResponse, RutaGenerada,
+    PlanEntregasRequest, PlanEntregasResponse, RutaEntregaPlanificada, ParadaEntrega,
+    UnidadCapacidad, MAX_RUTAS_GENERADAS
+)
 from app.auth.dependencies import get_current_active_user, can_manage_products
 from app.crud import ruta as ruta_crud
+from app.crud import pedido as pedido_crud
+from app.crud import user as user_crud
 from app.models.user import User
 from app.schemas.cliente import ClienteResponse
+from app.routes.pagination import cursor_after, set_next_cursor
+from app.services.optimizacion_rutas import longitud_recorrido, optimizar_puntos
+from app.services.distancias import cache_distancias
+from app.services.agrupacion import generar_rutas
+from app.services.planificacion_entregas import planificar_entregas
 
 
 router = APIRouter(prefix="/rutas", tags=["Rutas"])
 
 @router.get("/", response_model=List[RutaResponse])
 def get_rutas(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[int] = Depends(cursor_after),
     tipo: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener lista de rutas
+    Obtener lista de rutas, opcionalmente de un tipo (por offset con skip o por cursor con after)
     """
-    if tipo:
-        rutas = ruta_crud.get_rutas_by_tipo(db, tipo)
-    else:
-        rutas = ruta_crud.get_rutas(db, skip=skip, limit=limit)
+    rutas = ruta_crud.get_rutas(db, skip=skip, limit=limit, after=after, tipo=tipo)
+    set_next_cursor(response, rutas, limit)
     return rutas
 
 @router.get("/activas", response_model=List[RutaResponse])
@@ -40,6 +54,183 @@ def get_rutas_activas(
     rutas = ruta_crud.get_rutas_activas(db)
     return rutas
 
+@router.post("/generar", response_model=RutaGeneracionResponse)
+def generar_rutas_automaticas(
+    solicitud: RutaGeneracionRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(can_manage_products)  # Solo administradores
+):
+    """
+    Generar rutas agrupando clientes cercanos en grupos equilibrados
+    (num_rutas rutas o rutas de como mucho max_paradas clientes), con
+    los clientes de cada ruta ya ordenados para recorrerla
+    """
+    if solicitud.num_rutas is None and solicitud.max_paradas is None:
+        raise HTTPException(status_code=400, detail="Indique num_rutas o max_paradas")
+    if (solicitud.deposito_lat is None) != (solicitud.deposito_lon is None):
+        raise HTTPException(status_code=400, detail="Indique deposito_lat y deposito_lon juntos")
+    
+    filas = ruta_crud.get_clientes_para_rutas(db, solicitud.cliente_ids)
+    clientes = [fila for fila in filas if fila.latitud is not None and fila.longitud is not None]
+    sin_coordenadas = [fila.id for fila in filas if fila.latitud is None or fila.longitud is None]
+    if not clientes:
+        raise HTTPException(status_code=400, detail="No hay clientes con coordenadas para generar rutas")
+    
+    total = len(clientes)
+    num_rutas = min(solicitud.num_rutas or math.ceil(total / solicitud.max_paradas), total)
+    if num_rutas > MAX_RUTAS_GENERADAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Con {total} clientes max_paradas debe ser al menos {math.ceil(total / MAX_RUTAS_GENERADAS)} "
+                   f"(como mucho {MAX_RUTAS_GENERADAS} rutas)"
+        )
+    capacidad = math.ceil(total / num_rutas)
+    if solicitud.max_paradas is not None and capacidad > solicitud.max_paradas:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{num_rutas} rutas de {solicitud.max_paradas} paradas no alcanzan para {total} clientes"
+        )
+    
+    deposito = None
+    if solicitud.deposito_lat is not None:
+        deposito = {"latitud": solicitud.deposito_lat, "longitud": solicitud.deposito_lon}
+    rutas = generar_rutas(
+        [cliente.id for cliente in clientes],
+        [float(cliente.latitud) for cliente in clientes],
+        [float(cliente.longitud) for cliente in clientes],
+        num_rutas, capacidad, deposito,
+        settings.RUTA_GENERACION_SEGUNDOS, settings.RUTA_OPTIMIZACION_SEGUNDOS
+    )
+    db_rutas, _ = ruta_crud.crear_rutas_generadas(
+        db, solicitud.tipo, current_user.id,
+        [(f"{solicitud.prefijo_nombre} {numero}", cliente_ids) for numero, (cliente_ids, _) in enumerate(rutas, start=1)]
+    )
+    
+    return RutaGeneracionResponse(
+        rutas=[
+            RutaGenerada(id=db_ruta.id, nombre=db_ruta.nombre, total_clientes=len(cliente_ids), distancia_km=round(distancia, 3))
+            for db_ruta, (cliente_ids, distancia) in zip(db_rutas, rutas)
+        ],
+        clientes_asignados=total,
+        sin_coordenadas=sin_coordenadas
+    )
+
+@router.post("/entregas/planificar", response_model=PlanEntregasResponse)
+def planificar_rutas_entrega(
+    solicitud: PlanEntregasRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(can_manage_products)  # Solo administradores
+):
+    """
+    Planificar las entregas de un día: repartir los pedidos pendientes de
+    entrega entre los repartidores sin pasar la capacidad de cada vehículo
+    (en pedidos o unidades) y ordenar las paradas de cada uno. Salvo con
+    simular=true, crea una ruta de entrega por repartidor y se la asigna.
+    Si esos repartidores ya tienen entregas para la fecha responde 409; con
+    reemplazar=true las anteriores se cancelan en la misma transacción. Los
+    clientes que ya están en la ruta de entrega de otro repartidor para la
+    fecha no se vuelven a planificar.
+    """
+    if (solicitud.deposito_lat is None) != (solicitud.deposito_lon is None):
+        raise HTTPException(status_code=400, detail="Indique deposito_lat y deposito_lon juntos")
+    if not solicitud.simular:
+        # Desde aquí hasta el commit solo se planifica esta fecha una vez a la vez
+        ruta_crud.bloquear_plan_entregas(db, solicitud.fecha)
+    
+    repartidores = user_crud.get_repartidores(db, solicitud.repartidor_ids)
+    if solicitud.repartidor_ids is not None:
+        invalidos = sorted(set(solicitud.repartidor_ids) - {repartidor.id for repartidor in repartidores})
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"No son repartidores activos: {invalidos}")
+    if not repartidores:
+        raise HTTPException(status_code=400, detail="No hay repartidores activos")
+    repartidor_ids = [repartidor.id for repartidor in repartidores]
+    # Un reintento o un segundo clic no debe planificar dos veces las mismas entregas
+    if not solicitud.simular and not solicitud.reemplazar:
+        existentes = ruta_crud.get_asignaciones_entrega(db, solicitud.fecha, repartidor_ids)
+        if existentes:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={
+                    "message": f"Ya hay rutas de entrega asignadas para esos repartidores el {solicitud.fecha}; use reemplazar=true",
+                    "asignacion_ids": [asignacion.id for asignacion in existentes]
+                }
+            )
+    
+    desde = None if solicitud.incluir_atrasados else datetime.combine(solicitud.fecha, time.min)
+    hasta = datetime.combine(solicitud.fecha + timedelta(days=1), time.min)
+    filas = pedido_crud.get_demanda_entregas(db, desde, hasta)
+    # Los pedidos no guardan la ruta que los lleva: se excluyen por cliente
+    # (salvo los de las rutas que este plan reemplaza)
+    ya_planificados = ruta_crud.get_clientes_en_entregas(
+        db, solicitud.fecha, repartidor_ids if solicitud.reemplazar else []
+    )
+    filas = [fila for fila in filas if fila.cliente_id not in ya_planificados]
+    paradas = {fila.cliente_id: fila for fila in filas if fila.latitud is not None and fila.longitud is not None}
+    sin_coordenadas = [fila.cliente_id for fila in filas if fila.latitud is None or fila.longitud is None]
+    
+    deposito = None
+    if solicitud.deposito_lat is not None:
+        deposito = {"latitud": solicitud.deposito_lat, "longitud": solicitud.deposito_lon}
+    por_unidades = solicitud.unidad_capacidad == UnidadCapacidad.UNIDADES
+    rutas, sin_asignar = planificar_entregas(
+        list(paradas),
+        [float(fila.latitud) for fila in paradas.values()],
+        [float(fila.longitud) for fila in paradas.values()],
+        [fila.unidades if por_unidades else fila.pedidos for fila in paradas.values()],
+        len(repartidores), solicitud.capacidad, deposito, solicitud.regresar,
+        settings.RUTA_GENERACION_SEGUNDOS, settings.RUTA_OPTIMIZACION_SEGUNDOS
+    )
+    
+    # La ruta i va al repartidor i
+    asignados = repartidores[:len(rutas)]
+    db_rutas, asignaciones = [None] * len(rutas), [None] * len(rutas)
+    reemplazadas = []
+    if not solicitud.simular:
+        try:
+            db_rutas, asignaciones, reemplazadas = ruta_crud.crear_plan_entregas(
+                db, solicitud.fecha, current_user.id,
+                [(f"Entrega {solicitud.fecha:%Y-%m-%d} - {repartidor.username}", cliente_ids)
+                 for repartidor, (cliente_ids, _, _) in zip(asignados, rutas)],
+                [repartidor.id for repartidor in asignados],
+                repartidor_ids,
+                reemplazar=solicitud.reemplazar
+            )
+        except ruta_crud.PlanEntregasExistenteError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail={"message": str(e), "asignacion_ids": e.asignacion_ids}
+            )
+    
+    return PlanEntregasResponse(
+        fecha=solicitud.fecha,
+        rutas=[
+            RutaEntregaPlanificada(
+                ruta_id=db_ruta.id if db_ruta else None,
+                ruta_asignada_id=asignacion.id if asignacion else None,
+                repartidor_id=repartidor.id,
+                repartidor=repartidor.username,
+                carga=int(carga),
+                distancia_km=round(distancia, 3),
+                paradas=[
+                    ParadaEntrega(
+                        cliente_id=cliente_id, orden=orden,
+                        pedidos=paradas[cliente_id].pedidos, unidades=paradas[cliente_id].unidades
+                    )
+                    for orden, cliente_id in enumerate(cliente_ids, start=1)
+                ]
+            )
+            for repartidor, db_ruta, asignacion, (cliente_ids, distancia, carga)
+            in zip(asignados, db_rutas, asignaciones, rutas)
+        ],
+        pedidos_planificados=sum(paradas[cliente_id].pedidos for cliente_ids, _, _ in rutas for cliente_id in cliente_ids),
+        clientes_sin_asignar=sin_asignar,
+        sin_coordenadas=sin_coordenadas,
+        repartidores_sin_ruta=[repartidor.id for repartidor in repartidores[len(rutas):]],
+        asignaciones_reemplazadas=[asignacion.id for asignacion in reemplazadas],
+        clientes_ya_planificados=sorted(ya_planificados)
+    )
+
 @router.get("/{ruta_id}", response_model=RutaResponse)
 def get_ruta(
     ruta_id: int,
@@ -151,37 +342,79 @@ def asignar_ruta_usuario(
 @router.get("/{ruta_id}/optimizada")
 def get_ruta_optimizada(
     ruta_id: int,
+    inicio_cliente_id: Optional[int] = Query(None, description="Cliente de la ruta desde el que se sale"),
+    deposito_lat: Optional[float] = Query(None, ge=-90, le=90, description="Latitud del punto de salida (bodega)"),
+    deposito_lon: Optional[float] = Query(None, ge=-180, le=180, description="Longitud del punto de salida (bodega)"),
+    regresar: bool = Query(False, description="Volver al punto de salida al terminar"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtener ruta optimizada con coordenadas de clientes
+    Obtener la ruta con sus clientes en el orden de menor distancia recorrida.
+    Se sale del depósito indicado, del cliente inicio_cliente_id o, por defecto,
+    del primer cliente según el orden manual de la ruta.
     """
     ruta = ruta_crud.get_ruta(db, ruta_id)
     if not ruta:
         raise HTTPException(status_code=404, detail="Ruta no encontrada")
+    if (deposito_lat is None) != (deposito_lon is None):
+        raise HTTPException(status_code=400, detail="Indique deposito_lat y deposito_lon juntos")
+    if deposito_lat is not None and inicio_cliente_id is not None:
+        raise HTTPException(status_code=400, detail="Indique un depósito o un cliente de inicio, no ambos")
     
     # Obtener clientes con coordenadas
     clientes_con_coordenadas = []
-    for ruta_cliente in ruta.rutas_clientes:
-        cliente = ruta_cliente.cliente
-        if cliente.latitud and cliente.longitud:
-            clientes_con_coordenadas.append({
-                "id": cliente.id,
-                "nombre": cliente.nombre,
-                "orden": ruta_cliente.orden,
-                "latitud": float(cliente.latitud),
-                "longitud": float(cliente.longitud),
-                "direccion": cliente.direccion,
-                "contacto": cliente.contacto
-            })
+    sin_coordenadas = []
+    for orden, cliente in ruta_crud.get_clientes_de_ruta(db, ruta_id):
+        if cliente.latitud is None or cliente.longitud is None:
+            sin_coordenadas.append(cliente.id)
+            continue
+        clientes_con_coordenadas.append({
+            "id": cliente.id,
+            "nombre": cliente.nombre,
+            "orden": orden,
+            "latitud": float(cliente.latitud),
+            "longitud": float(cliente.longitud),
+            "direccion": cliente.direccion,
+            "contacto": cliente.contacto
+        })
+    
+    # Las distancias entre clientes de la ruta se reutilizan entre llamadas
+    matriz = cache_distancias.matriz(
+        f"ruta:{ruta_id}",
+        [punto["id"] for punto in clientes_con_coordenadas],
+        [punto["latitud"] for punto in clientes_con_coordenadas],
+        [punto["longitud"] for punto in clientes_con_coordenadas]
+    )
+    
+    deposito = None
+    distancia_manual = None
+    if deposito_lat is not None:
+        deposito = {"latitud": deposito_lat, "longitud": deposito_lon}
+    elif inicio_cliente_id is not None:
+        indice = next((i for i, punto in enumerate(clientes_con_coordenadas) if punto["id"] == inicio_cliente_id), None)
+        if indice is None:
+            raise HTTPException(status_code=400, detail="El cliente de inicio no está en la ruta o no tiene coordenadas")
+        # El orden manual se mide con el orden guardado, antes de mover el cliente de inicio
+        distancia_manual = longitud_recorrido(matriz, range(len(clientes_con_coordenadas)), regresar)
+        posiciones = [indice] + [i for i in range(len(clientes_con_coordenadas)) if i != indice]
+        clientes_con_coordenadas = [clientes_con_coordenadas[i] for i in posiciones]
+        matriz = matriz[posiciones][:, posiciones]
     
-    # Ordenar por orden de la ruta
-    clientes_con_coordenadas.sort(key=lambda x: x["orden"])
+    puntos, distancia_total, distancia_original = optimizar_puntos(
+        clientes_con_coordenadas, deposito, regresar, settings.RUTA_OPTIMIZACION_SEGUNDOS, matriz
+    )
+    if distancia_manual is None:
+        distancia_manual = distancia_original
     
     return {
         "ruta_id": ruta.id,
         "nombre": ruta.nombre,
         "tipo": ruta.tipo,
-        "puntos": clientes_con_coordenadas
-    }
\ No newline at end of file
+        "inicio": deposito or (puntos[0] if puntos else None),
+        "regresar": regresar,
+        "distancia_total_km": round(distancia_total, 3),
+        "distancia_orden_manual_km": round(distancia_manual, 3),
+        "puntos": puntos,
+        "sin_coordenadas": sin_coordenadas
+    }
@@ -0,0 +1,97 @@
+import typing
+from decimal import Decimal
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import AliasChoices, BaseModel
+from pydantic_core import PydanticUndefined
+from app.config.config import settings
+
+def _por_defecto(valor):
+    # Mismo formato que Pydantic en modo JSON: los Decimal viajan como texto
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+class FastJSONResponse(ORJSONResponse):
+    """Respuesta JSON con orjson (acepta Decimal)"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_por_defecto, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+
+def default_response_class():
+    """Clase de respuesta por defecto de la app según FAST_JSON_RESPONSES"""
+    return FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse
+
+def _modelo_anidado(anotacion):
+    """Esquema anidado de un campo (List[Modelo] u Optional[Modelo]) o None"""
+    if isinstance(anotacion, type) and issubclass(anotacion, BaseModel):
+        return anotacion
+    for argumento in typing.get_args(anotacion):
+        modelo = _modelo_anidado(argumento)
+        if modelo is not None:
+            return modelo
+    return None
+
+_planes = {}  # (esquema, clase ORM) -> [(campo, atributo, esquema anidado, default)]
+
+def _plan(esquema, clase):
+    plan = _planes.get((esquema, clase))
+    if plan is None:
+        plan = []
+        for nombre, campo in esquema.model_fields.items():
+            candidatos = [nombre]
+            if isinstance(campo.validation_alias, AliasChoices):
+                candidatos += [c for c in campo.validation_alias.choices if isinstance(c, str)]
+            # Sin atributo en la clase se usa el nombre del campo (p. ej. un atributo puesto en la instancia)
+            atributo = next((c for c in candidatos if hasattr(clase, c)), nombre)
+            plan.append((nombre, atributo, _modelo_anidado(campo.annotation), campo.get_default(call_default_factory=True)))
+        _planes[(esquema, clase)] = plan
+    return plan
+
+def volcar(esquema, objeto):
+    """
+    Convertir un objeto ORM en dict con los campos del esquema, sin validarlo.
+    Solo para datos recién leídos de la base de datos, que ya cumplen el esquema.
+    """
+    if objeto is None:
+        return None
+    cargados = objeto.__dict__
+    datos = {}
+    for nombre, atributo, anidado, default in _plan(esquema, type(objeto)):
+        # Leer del __dict__ evita el descriptor de SQLAlchemy en atributos ya cargados
+        if atributo in cargados:
+            valor = cargados[atributo]
+        elif default is PydanticUndefined:
+            # Campo obligatorio: si el objeto no lo tiene debe fallar, no emitir un valor vacío
+            valor = getattr(objeto, atributo)
+        else:
+            valor = getattr(objeto, atributo, default)
+        if anidado is not None and valor is not None:
+            if isinstance(valor, (list, tuple, set)):
+                valor = [volcar(anidado, item) for item in valor]
+            else:
+                valor = volcar(anidado, valor)
+        datos[nombre] = valor
+    return datos
+
+def _copiar_cabeceras(response: Response, destino: Response):
+    for nombre, valor in response.headers.items():
+        if nombre not in ("content-length", "content-type"):
+            destino.headers[nombre] = valor
+    return destino
+
+def respuesta_lista(response: Response, esquema, objetos):
+    """
+    Listado rápido: con FAST_JSON_RESPONSES se serializa con orjson sin pasar
+    por la validación del response_model; si no, se devuelven los objetos tal cual.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return objetos
+    return _copiar_cabeceras(response, FastJSONResponse([volcar(esquema, objeto) for objeto in objetos]))
+
+def respuesta_modelo(modelo: BaseModel):
+    """Devolver un modelo ya construido sin que FastAPI lo vuelva a validar"""
+    if not settings.FAST_JSON_RESPONSES:
+        return modelo
+    return Response(modelo.model_dump_json(), media_type="application/json")
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.config.database import get_db
 from app.schemas.user import UserResponse, UserUpdate, UserRoleUpdate
 from app.auth.dependencies import get_current_active_user
 from app.crud.user import get_users, get_user, update_user, delete_user, get_user_by_email, get_user_by_username, update_user_role
 from app.models.user import User
 from app.models.role import Role
+from app.routes.pagination import cursor_after, set_next_cursor
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -70,11 +71,18 @@ def read_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.get("/", response_model=List[UserResponse])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_after),
+    db: Session = Depends(get_db)
+):
     """
-    Obtener lista de usuarios
+    Obtener lista de usuarios (por offset con skip o por cursor con after)
     """
-    users = get_users(db, skip=skip, limit=limit)
+    users = get_users(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(response, users, limit)
     return users
 
 @router.get("/me/permissions")
@@ -47,4 +47,7 @@ class ClienteResponse(ClienteBase):
     updated_at: Optional[datetime] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ClienteCercano(ClienteResponse):
+    distancia_km: float
@@ -44,9 +44,11 @@ class EstadisticasVentasMensuales(BaseModel):
     cantidad_pedidos: int
 
 class DashboardResponse(BaseModel):
-    resumen_general: ResumenGeneral
-    metricas_ventas: MetricasVentas
-    productos_populares: List[ProductoPopular]
-    pedidos_pendientes: List[PedidoPendiente]
-    rutas_activas: List[RutaActiva]
-    ventas_mensuales: List[EstadisticasVentasMensuales]
\ No newline at end of file
+    # En modo paralelo una sección lenta o con error llega obsoleta o en null
+    resumen_general: Optional[ResumenGeneral] = None
+    metricas_ventas: Optional[MetricasVentas] = None
+    productos_populares: Optional[List[ProductoPopular]] = None
+    pedidos_pendientes: Optional[List[PedidoPendiente]] = None
+    rutas_activas: Optional[List[RutaActiva]] = None
+    ventas_mensuales: Optional[List[EstadisticasVentasMensuales]] = None
+    secciones_degradadas: List[str] = []
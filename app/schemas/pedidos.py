@@ -1,8 +1,9 @@
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, AliasChoices, validator
 from typing import List, Optional
 from datetime import datetime, date
 from decimal import Decimal
 from enum import Enum
+from app.schemas.cliente import ClienteResponse
 
 class EstadoPedido(str, Enum):
     PENDIENTE_ENTREGA = "pendiente_entrega"
@@ -51,7 +52,25 @@ class PedidoResponse(PedidoBase):
     estado: EstadoPedido
     created_at: datetime
     updated_at: Optional[datetime] = None
-    detalles: List[DetallePedidoResponse] = []
+    # En el modelo la relación se llama detalle_pedidos; solo llega si se pidió con ?include=detalles
+    detalles: List[DetallePedidoResponse] = Field(
+        default=[], validation_alias=AliasChoices("detalles", "detalle_pedidos")
+    )
+    cliente: Optional[ClienteResponse] = None
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# SCHEMAS PARA CARGA DE PEDIDOS EN LOTE
+class PedidoLoteResultado(BaseModel):
+    indice: int
+    ok: bool
+    pedido_id: Optional[int] = None
+    total: Optional[Decimal] = None
+    error: Optional[str] = None
+    lineas_fallidas: List[dict] = []
+
+class PedidoLoteResponse(BaseModel):
+    creados: int
+    fallidos: int
+    resultados: List[PedidoLoteResultado]
\ No newline at end of file
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from enum import Enum
 
 class TipoRuta(str, Enum):
@@ -61,4 +61,71 @@ class RutaResponse(RutaBase):
     rutas_asignadas: List[RutaAsignadaResponse] = []
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# SCHEMAS PARA GENERACIÓN AUTOMÁTICA DE RUTAS
+MAX_RUTAS_GENERADAS = 1000  # el agrupamiento usa matrices (clientes x rutas) en memoria
+
+class RutaGeneracionRequest(BaseModel):
+    tipo: TipoRuta = TipoRuta.VENTA
+    prefijo_nombre: str = "Ruta"
+    # Sin cliente_ids se usan todos los clientes activos que no están en una ruta activa
+    cliente_ids: Optional[List[int]] = None
+    num_rutas: Optional[int] = Field(None, ge=1, le=MAX_RUTAS_GENERADAS)
+    max_paradas: Optional[int] = Field(None, ge=1)
+    deposito_lat: Optional[float] = Field(None, ge=-90, le=90)
+    deposito_lon: Optional[float] = Field(None, ge=-180, le=180)
+
+class RutaGenerada(BaseModel):
+    id: int
+    nombre: str
+    total_clientes: int
+    distancia_km: float
+
+class RutaGeneracionResponse(BaseModel):
+    rutas: List[RutaGenerada]
+    clientes_asignados: int
+    sin_coordenadas: List[int] = []
+
+# SCHEMAS PARA PLANIFICACIÓN DE ENTREGAS
+class UnidadCapacidad(str, Enum):
+    PEDIDOS = "pedidos"
+    UNIDADES = "unidades"
+
+class PlanEntregasRequest(BaseModel):
+    fecha: date
+    capacidad: int = Field(..., ge=1)   # por vehículo, en pedidos o en unidades
+    unidad_capacidad: UnidadCapacidad = UnidadCapacidad.PEDIDOS
+    # Sin repartidor_ids se usan todos los repartidores activos
+    repartidor_ids: Optional[List[int]] = None
+    incluir_atrasados: bool = False     # sumar pendientes de fechas anteriores
+    deposito_lat: Optional[float] = Field(None, ge=-90, le=90)
+    deposito_lon: Optional[float] = Field(None, ge=-180, le=180)
+    regresar: bool = True               # volver al depósito al terminar
+    simular: bool = False               # devolver el plan sin crear rutas
+    reemplazar: bool = False            # cancelar las entregas ya planificadas para la fecha
+
+class ParadaEntrega(BaseModel):
+    cliente_id: int
+    orden: int
+    pedidos: int
+    unidades: int
+
+class RutaEntregaPlanificada(BaseModel):
+    ruta_id: Optional[int] = None
+    ruta_asignada_id: Optional[int] = None
+    repartidor_id: int
+    repartidor: str
+    carga: int
+    distancia_km: float
+    paradas: List[ParadaEntrega]
+
+class PlanEntregasResponse(BaseModel):
+    fecha: date
+    rutas: List[RutaEntregaPlanificada]
+    pedidos_planificados: int
+    clientes_sin_asignar: List[int] = []
+    sin_coordenadas: List[int] = []
+    repartidores_sin_ruta: List[int] = []
+    asignaciones_reemplazadas: List[int] = []
+    clientes_ya_planificados: List[int] = []  # en la ruta de entrega de otro repartidor para la fecha
@@ -0,0 +1,22 @@
+# app/scripts/backfill_ventas_diarias.py
+from app.config.database import SessionLocal
+from app.crud.venta_diaria import backfill_ventas_diarias
+from app.crud.venta_producto import backfill_ventas_productos
+
+def backfill():
+    db = SessionLocal()
+    try:
+        print("📦 Reconstruyendo ventas_diarias desde pedidos...")
+        dias = backfill_ventas_diarias(db)
+        print(f"🎉 Acumulado reconstruido ({dias} filas)")
+        print("📦 Reconstruyendo contadores de ventas por producto...")
+        productos = backfill_ventas_productos(db)
+        print(f"🎉 Contadores reconstruidos ({productos} productos)")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error reconstruyendo acumulados: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill()
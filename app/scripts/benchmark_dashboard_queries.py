@@ -0,0 +1,151 @@
+# app/scripts/benchmark_dashboard_queries.py
+"""
+Benchmark de las consultas del dashboard sobre una tabla pedidos sintética.
+
+Compara las consultas anteriores (cuatro SUM con CAST y seis count/sum por
+separado) con las consultas combinadas de app/crud/dashboard, leyendo siempre
+de pedidos (DASHBOARD_VENTAS_DESDE_ROLLUP=False).
+
+Usar una base de datos de pruebas: el script inserta pedidos sintéticos.
+
+    python -m app.scripts.benchmark_dashboard_queries --rows 5000000 --repeat 5
+    python -m app.scripts.benchmark_dashboard_queries --skip-seed --repeat 5
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, and_, cast, Date, insert
+from app.config.config import settings
+from app.config.database import SessionLocal, Base, engine
+from app.crud import dashboard as dashboard_crud
+from app.models.cliente import Cliente
+from app.models.producto import Producto
+from app.models.pedido import Pedido, EstadoPedido
+from app.models.ruta import Ruta
+from app.models.user import User
+
+NIT_BENCHMARK = "BENCH-DASHBOARD"
+ESTADOS = list(EstadoPedido)
+
+def preparar_cliente(db):
+    cliente = db.query(Cliente).filter(Cliente.nit == NIT_BENCHMARK).first()
+    if cliente is None:
+        cliente = Cliente(nombre="Cliente benchmark dashboard", nit=NIT_BENCHMARK)
+        db.add(cliente)
+        db.commit()
+    return cliente.id
+
+def sembrar_pedidos(db, filas: int, dias: int, chunk: int):
+    """Insertar pedidos repartidos en los últimos N días con executemany por bloques"""
+    vendedor = db.query(User.id).order_by(User.id).first()
+    if vendedor is None:
+        raise RuntimeError("Se necesita al menos un usuario para usar como vendedor")
+    cliente_id = preparar_cliente(db)
+
+    ahora = datetime.now()
+    segundos = dias * 24 * 3600
+    insertadas = 0
+    inicio = time.perf_counter()
+    while insertadas < filas:
+        bloque = min(chunk, filas - insertadas)
+        rows = []
+        for _ in range(bloque):
+            fecha = ahora - timedelta(seconds=random.randint(0, segundos))
+            rows.append({
+                "cliente_id": cliente_id,
+                "vendedor_id": vendedor.id,
+                "fecha_pedido": fecha,
+                "created_at": fecha,
+                "total": Decimal(random.randint(100, 500000)) / 100,
+                "estado": random.choice(ESTADOS)
+            })
+        db.execute(insert(Pedido), rows)
+        db.commit()
+        insertadas += bloque
+        print(f"   📦 {insertadas}/{filas} pedidos ({time.perf_counter() - inicio:.1f}s)")
+
+def metricas_ventas_anterior(db):
+    """Versión anterior: una consulta por periodo y CAST sobre created_at"""
+    hoy = datetime.now().date()
+    inicio_semana = hoy - timedelta(days=hoy.weekday())
+    inicio_mes = hoy.replace(day=1)
+    if inicio_mes.month == 1:
+        mes_anterior_inicio = inicio_mes.replace(year=inicio_mes.year-1, month=12)
+    else:
+        mes_anterior_inicio = inicio_mes.replace(month=inicio_mes.month-1)
+    mes_anterior_fin = inicio_mes - timedelta(days=1)
+
+    fecha = cast(Pedido.created_at, Date)
+    return [
+        db.query(func.sum(Pedido.total)).filter(fecha == hoy).scalar(),
+        db.query(func.sum(Pedido.total)).filter(fecha >= inicio_semana).scalar(),
+        db.query(func.sum(Pedido.total)).filter(fecha >= inicio_mes).scalar(),
+        db.query(func.sum(Pedido.total)).filter(
+            and_(fecha >= mes_anterior_inicio, fecha <= mes_anterior_fin)
+        ).scalar()
+    ]
+
+def resumen_general_anterior(db):
+    """Versión anterior: seis count/sum independientes"""
+    return [
+        db.query(Cliente).filter(Cliente.estado == True).count(),
+        db.query(Producto).filter(Producto.estado == True).count(),
+        db.query(Pedido).count(),
+        db.query(func.sum(Pedido.total)).scalar(),
+        db.query(Pedido).filter(Pedido.estado == EstadoPedido.PENDIENTE_ENTREGA).count(),
+        db.query(Ruta).filter(Ruta.estado == True).count()
+    ]
+
+def medir(nombre: str, func_consulta, repeat: int):
+    db = SessionLocal()
+    try:
+        # Una ejecución previa para calentar caché de planes y páginas
+        func_consulta(db)
+        tiempos = []
+        for _ in range(repeat):
+            inicio = time.perf_counter()
+            func_consulta(db)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            db.rollback()
+    finally:
+        db.close()
+    print(f"   {nombre:<32} mediana {statistics.median(tiempos):>10.1f} ms   min {min(tiempos):>10.1f} ms")
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar las consultas del dashboard antes y después de combinarlas")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--days", type=int, default=120, help="Días hacia atrás en los que se reparten los pedidos")
+    parser.add_argument("--chunk", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true", help="Usar los pedidos ya existentes")
+    args = parser.parse_args()
+
+    # Medir siempre contra pedidos, no contra el acumulado diario
+    settings.DASHBOARD_VENTAS_DESDE_ROLLUP = False
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        if not args.skip_seed:
+            print(f"🌱 Insertando {args.rows} pedidos sintéticos...")
+            sembrar_pedidos(db, args.rows, args.days, args.chunk)
+        print(f"🔍 Pedidos en la tabla: {db.query(func.count(Pedido.id)).scalar()}")
+    finally:
+        db.close()
+
+    print("📊 Métricas de ventas")
+    antes = medir("4 consultas con CAST", metricas_ventas_anterior, args.repeat)
+    despues = medir("1 consulta SUM(CASE)", dashboard_crud.get_metricas_ventas, args.repeat)
+    print(f"   ✅ x{antes / despues:.1f}")
+
+    print("📊 Resumen general")
+    antes = medir("6 count/sum", resumen_general_anterior, args.repeat)
+    despues = medir("1 consulta combinada", dashboard_crud.get_resumen_general, args.repeat)
+    print(f"   ✅ x{antes / despues:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# app/scripts/benchmark_db_modes.py
+"""
+Benchmark de /pedidos y /dashboard contra una API en ejecución.
+
+Levantar la API una vez con DB_ASYNC_MODE=false y otra con DB_ASYNC_MODE=true
+y ejecutar en cada caso:
+
+    python -m app.scripts.benchmark_db_modes --url http://localhost:8000 \
+        --email admin@empresa.com --password "Secreta1!" --concurrency 50 --requests 2000
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = ["/pedidos/?limit=100", "/dashboard/"]
+
+def login(base_url: str, email: str, password: str) -> str:
+    request = urllib.request.Request(
+        f"{base_url}/auth/login",
+        data=json.dumps({"email": email, "password": password}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())["access_token"]
+
+def timed_get(url: str, token: str):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            ok = response.status == 200
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+def run_endpoint(base_url: str, path: str, token: str, concurrency: int, total: int):
+    url = f"{base_url}{path}"
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: timed_get(url, token), range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency * 1000 for latency, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        return {"endpoint": path, "errors": errors}
+    return {
+        "endpoint": path,
+        "requests": total,
+        "errors": errors,
+        "req_per_sec": round(total / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+        "max_ms": round(latencies[-1], 1)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparar modo síncrono y asíncrono de la base de datos")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    base_url = args.url.rstrip("/")
+    token = login(base_url, args.email, args.password)
+
+    with urllib.request.urlopen(f"{base_url}/health") as response:
+        print(f"🔍 Health: {response.read().decode()}")
+
+    for path in ENDPOINTS:
+        # Calentar conexiones y cachés antes de medir
+        run_endpoint(base_url, path, token, args.concurrency, args.concurrency)
+        print(json.dumps(run_endpoint(base_url, path, token, args.concurrency, args.requests)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# app/scripts/benchmark_serializacion.py
+"""
+Microbenchmark de serialización de listados de pedidos (sin base de datos).
+
+Compara, por cada 1.000 pedidos con sus líneas y su cliente:
+  - antes:   validación del response_model + json de la librería estándar (ruta de FastAPI)
+  - después: volcado sin validar + orjson (FAST_JSON_RESPONSES=true)
+
+    python -m app.scripts.benchmark_serializacion --pedidos 1000 --lineas 5 --repeat 20
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.models.cliente import Cliente
+from app.models.detalle_pedido import DetallePedido
+from app.models.pedido import Pedido, EstadoPedido
+from app.schemas.pedidos import PedidoResponse
+from app.routes.serializacion import FastJSONResponse, volcar
+
+def construir_pedidos(cantidad: int, lineas: int):
+    """Pedidos en memoria con la misma forma que devuelve la base de datos"""
+    ahora = datetime.now()
+    estados = list(EstadoPedido)
+    pedidos = []
+    for i in range(cantidad):
+        fecha = ahora - timedelta(minutes=i)
+        cliente = Cliente(
+            id=i % 50 + 1, nombre=f"Cliente {i % 50}", nit=f"NIT-{i % 50}", direccion="Zona 1",
+            telefono="5555-5555", contacto=None, latitud=Decimal("14.634915"),
+            longitud=Decimal("-90.506882"), direccion_geocodificada=None, estado=True,
+            created_at=fecha, updated_at=None
+        )
+        detalles = [
+            DetallePedido(
+                id=i * lineas + j, pedido_id=i + 1, producto_id=j + 1, cantidad=j + 1,
+                precio_unitario=Decimal("12.50"), subtotal=Decimal("12.50") * (j + 1), created_at=fecha
+            )
+            for j in range(lineas)
+        ]
+        pedido = Pedido(
+            id=i + 1, cliente_id=cliente.id, vendedor_id=1, fecha_pedido=fecha,
+            total=sum(detalle.subtotal for detalle in detalles), estado=estados[i % len(estados)],
+            created_at=fecha, updated_at=None
+        )
+        pedido.detalle_pedidos = detalles
+        pedido.cliente = cliente
+        pedidos.append(pedido)
+    return pedidos
+
+def antes(adapter, pedidos) -> bytes:
+    # Lo que hace FastAPI con response_model y JSONResponse
+    validados = adapter.validate_python(pedidos, from_attributes=True)
+    return JSONResponse(adapter.dump_python(validados, mode="json")).body
+
+def despues(pedidos) -> bytes:
+    return FastJSONResponse([volcar(PedidoResponse, pedido) for pedido in pedidos]).body
+
+def medir(funcion, repeat: int):
+    funcion()
+    tiempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización de pedidos")
+    parser.add_argument("--pedidos", type=int, default=1000)
+    parser.add_argument("--lineas", type=int, default=5, help="Líneas por pedido")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pedidos = construir_pedidos(args.pedidos, args.lineas)
+    adapter = TypeAdapter(List[PedidoResponse])
+
+    # Ambas rutas deben producir el mismo documento
+    if json.loads(antes(adapter, pedidos)) != json.loads(despues(pedidos)):
+        raise SystemExit("❌ Las dos serializaciones no coinciden")
+
+    por_mil = 1000 / args.pedidos
+    t_antes = medir(lambda: antes(adapter, pedidos), args.repeat) * por_mil
+    t_despues = medir(lambda: despues(pedidos), args.repeat) * por_mil
+    print(f"📦 {args.pedidos} pedidos x {args.lineas} líneas, mediana de {args.repeat} repeticiones")
+    print(f"🔍 Antes   (validación + json): {t_antes * 1000:8.2f} ms / 1.000 pedidos")
+    print(f"🔍 Después (volcado + orjson):  {t_despues * 1000:8.2f} ms / 1.000 pedidos")
+    print(f"🎉 {t_antes / t_despues:.1f}x más rápido")
+
+if __name__ == "__main__":
+    main()
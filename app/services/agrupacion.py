@@ -0,0 +1,247 @@
+# app/services/agrupacion.py
+import time
+import numpy as np
+from app.services.optimizacion_rutas import KM_POR_GRADO, optimizar_puntos
+
+def proyectar_km(latitudes, longitudes):
+    """Coordenadas planas aproximadas en km (equirectangular alrededor del centro)"""
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    coseno = np.cos(np.radians(latitudes.mean()))
+    return np.column_stack((latitudes * KM_POR_GRADO, longitudes * KM_POR_GRADO * coseno))
+
+def _distancias_cuadradas(puntos, centros):
+    # Operaciones en el mismo arreglo para no crear temporales de (n, k)
+    dx = np.subtract.outer(puntos[:, 0], centros[:, 0])
+    dx *= dx
+    dy = np.subtract.outer(puntos[:, 1], centros[:, 1])
+    dy *= dy
+    dx += dy
+    return dx
+
+def _centros_iniciales(puntos, k: int, generador):
+    """k-means++: cada centro nuevo se elige con probabilidad proporcional a d²"""
+    centros = np.empty((k, 2))
+    centros[0] = puntos[generador.integers(len(puntos))]
+    minimas = ((puntos - centros[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        acumuladas = np.cumsum(minimas)
+        if acumuladas[-1] > 0:
+            indice = min(int(np.searchsorted(acumuladas, generador.random() * acumuladas[-1], side="right")), len(puntos) - 1)
+        else:
+            indice = generador.integers(len(puntos))
+        centros[i] = puntos[indice]
+        diferencia = puntos - centros[i]
+        np.minimum(minimas, np.einsum("ij,ij->i", diferencia, diferencia), out=minimas)
+    return centros
+
+CENTROS_CANDIDATOS = 8   # centros más cercanos que se guardan por punto
+CENTROS_VECINOS = 24     # centros vecinos entre los que se actualizan los candidatos
+CENTROS_AMPLIADOS = 64   # candidatos de los puntos que no cupieron en los primeros
+LOTE_PUNTOS = 4096       # filas por bloque al calcular distancias a los centros
+
+def _ordenar_filas(indices, costos):
+    orden = np.argsort(costos, axis=1, kind="stable")
+    return np.take_along_axis(indices, orden, axis=1), np.take_along_axis(costos, orden, axis=1)
+
+def centros_cercanos(puntos, centros, m: int = CENTROS_CANDIDATOS):
+    """
+    (índices, distancias²) de los m centros más cercanos a cada punto, del más
+    cercano al más lejano. Se calcula por bloques para no crear la matriz (n, k).
+    """
+    n, k = len(puntos), len(centros)
+    m = min(m, k)
+    indices = np.empty((n, m), dtype=np.int64)
+    costos = np.empty((n, m))
+    for inicio in range(0, n, LOTE_PUNTOS):
+        bloque = _distancias_cuadradas(puntos[inicio:inicio + LOTE_PUNTOS], centros)
+        if m < k:
+            parte = np.argpartition(bloque, m - 1, axis=1)[:, :m]
+            bloque = np.take_along_axis(bloque, parte, axis=1)
+        else:
+            parte = np.broadcast_to(np.arange(k), bloque.shape)
+        indices[inicio:inicio + LOTE_PUNTOS], costos[inicio:inicio + LOTE_PUNTOS] = _ordenar_filas(parte, bloque)
+    return indices, costos
+
+def actualizar_candidatos(puntos, centros, referencia, m: int = CENTROS_CANDIDATOS, v: int = CENTROS_VECINOS):
+    """
+    Candidatos tras mover los centros sin recalcular la matriz (n, k): cada punto
+    mide solo los v centros más cercanos a su centro de referencia (el asignado).
+    """
+    k = len(centros)
+    v = min(v, k)
+    vecinos, _ = centros_cercanos(centros, centros, v)   # (k, v), el propio centro incluido
+    grupo = vecinos[referencia]                          # (n, v)
+    diferencia = puntos[:, None, :] - centros[grupo]
+    costos = np.einsum("ijk,ijk->ij", diferencia, diferencia)
+    m = min(m, v)
+    if m < v:
+        parte = np.argpartition(costos, m - 1, axis=1)[:, :m]
+        grupo, costos = np.take_along_axis(grupo, parte, axis=1), np.take_along_axis(costos, parte, axis=1)
+    return _ordenar_filas(grupo, costos)
+
+def _asignar_candidatos(candidatos, costos, libres, demandas):
+    """
+    Rondas de asignación de cada fila (punto) entre sus centros candidatos.
+    libres se actualiza en el lugar; las filas que no caben en ninguno de sus
+    candidatos quedan con -1.
+    """
+    asignacion = np.full(len(candidatos), -1, dtype=np.int64)
+    pendientes = np.arange(len(candidatos))
+    while len(pendientes):
+        # Primer candidato (el más cercano) que aún tiene espacio para el punto
+        posibles = libres[candidatos[pendientes]] >= demandas[pendientes, None]
+        con_espacio = posibles.any(axis=1)
+        pendientes, posibles = pendientes[con_espacio], posibles[con_espacio]
+        if not len(pendientes):
+            break
+        columna = posibles.argmax(axis=1)
+        elegidos = candidatos[pendientes, columna]
+        elegidos_costo = costos[pendientes, columna]
+
+        orden = np.lexsort((elegidos_costo, elegidos))
+        puntos_ordenados, centros_ordenados = pendientes[orden], elegidos[orden]
+        # Carga acumulada de cada punto dentro de la fila de su centro
+        acumulada = np.cumsum(demandas[puntos_ordenados])
+        inicio_grupo = np.searchsorted(centros_ordenados, centros_ordenados, side="left")
+        acumulada -= acumulada[inicio_grupo] - demandas[puntos_ordenados[inicio_grupo]]
+        aceptados = acumulada <= libres[centros_ordenados]
+        asignacion[puntos_ordenados[aceptados]] = centros_ordenados[aceptados]
+        libres -= np.bincount(centros_ordenados[aceptados], weights=demandas[puntos_ordenados[aceptados]], minlength=len(libres))
+        pendientes = puntos_ordenados[~aceptados]
+    return asignacion
+
+def _asignar(candidatos, costos, capacidades, demandas, n: int, completar=None):
+    libres = np.array(capacidades, dtype=np.float64)
+    if demandas is None:
+        if libres.sum() < n:
+            raise ValueError("La capacidad total no alcanza para todos los puntos")
+        demandas = np.ones(n)
+    demandas = np.asarray(demandas, dtype=np.float64)
+    asignacion = _asignar_candidatos(candidatos, costos, libres, demandas)
+    if completar is None:
+        return asignacion
+    # Los pocos puntos cuyos candidatos se llenaron prueban con más centros y al final con todos
+    for m in (CENTROS_AMPLIADOS, None):
+        restantes = np.flatnonzero(asignacion < 0)
+        if not len(restantes) or (m is not None and m <= candidatos.shape[1]):
+            continue
+        indices, costos_restantes = completar(restantes, m)
+        asignacion[restantes] = _asignar_candidatos(indices, costos_restantes, libres, demandas[restantes])
+    return asignacion
+
+def asignar_con_capacidad(distancias, capacidades, demandas=None):
+    """
+    Asignar cada punto a un centro sin pasar la capacidad de ninguno.
+
+    En cada ronda todos los puntos pendientes eligen su centro libre más
+    cercano; cada centro acepta a los más cercanos que le caben y rechaza al
+    resto, que en la siguiente ronda prueba con otro centro. Todo vectorizado.
+    Con demandas cada punto ocupa su demanda (si no, 1) y los puntos que no
+    caben en ningún centro quedan con -1.
+    """
+    distancias = np.asarray(distancias, dtype=np.float64)
+    n, k = distancias.shape
+    candidatos, costos = _ordenar_filas(np.broadcast_to(np.arange(k), (n, k)), distancias)
+    return _asignar(candidatos, costos, capacidades, demandas, n)
+
+def agrupar_con_capacidad(latitudes, longitudes, k: int, capacidad, iteraciones: int = 20, semilla: int = 0,
+                          demandas=None, limite: float = None):
+    """
+    k-means con capacidad máxima por grupo (en puntos o, con demandas, en carga).
+    Cada punto considera solo sus CENTROS_CANDIDATOS centros más cercanos
+    (buscados entre los vecinos de su centro más cercano anterior) y, si
+    todos se llenan, más centros. Con limite (time.perf_counter) deja de
+    iterar al pasarlo, siempre tras al menos una asignación completa.
+    Devuelve la etiqueta de grupo (0..k-1) de cada punto; -1 si no cupo en ninguno.
+    """
+    puntos = proyectar_km(latitudes, longitudes)
+    n = len(puntos)
+    if k <= 1 and demandas is None:
+        return np.zeros(n, dtype=np.int64)
+    generador = np.random.default_rng(semilla)
+    centros = _centros_iniciales(puntos, k, generador)
+    capacidades = np.full(k, capacidad)
+
+    def completar(indices, m):
+        return centros_cercanos(puntos[indices], centros, m or k)
+
+    # Con pocos centros cada punto los considera todos
+    todos = k <= CENTROS_VECINOS
+    etiquetas = None
+    candidatos, costos = centros_cercanos(puntos, centros, k if todos else CENTROS_CANDIDATOS)
+    for _ in range(iteraciones):
+        if etiquetas is not None and todos:
+            candidatos, costos = centros_cercanos(puntos, centros, k)
+        elif etiquetas is not None:
+            # Los centros se mueven poco entre iteraciones: buscar alrededor del más cercano anterior
+            candidatos, costos = actualizar_candidatos(puntos, centros, candidatos[:, 0])
+        nuevas = _asignar(candidatos, costos, capacidades, demandas, n, completar)
+        if etiquetas is not None and np.array_equal(nuevas, etiquetas):
+            break
+        etiquetas = nuevas
+        if limite is not None and time.perf_counter() > limite:
+            break
+        asignados = etiquetas >= 0
+        conteos = np.bincount(etiquetas[asignados], minlength=k)
+        sumas = np.column_stack((
+            np.bincount(etiquetas[asignados], weights=puntos[asignados, 0], minlength=k),
+            np.bincount(etiquetas[asignados], weights=puntos[asignados, 1], minlength=k)
+        ))
+        ocupados = conteos > 0
+        centros[ocupados] = sumas[ocupados] / conteos[ocupados, None]
+    return etiquetas
+
+def ordenar_grupos(ids, latitudes, longitudes, etiquetas, k: int, deposito: dict = None,
+                   cerrado: bool = False, tiempo_ruta: float = 0.3, limite: float = None):
+    """
+    Ordenar las paradas de cada grupo (etiquetas 0..k-1; las -1 se ignoran).
+    Sin depósito cada ruta empieza en su parada más alejada del centro del grupo.
+    Con limite (time.perf_counter) el tiempo que queda se reparte entre los
+    grupos pendientes; pasado el límite solo se usa el vecino más cercano.
+    Devuelve por grupo (ids en orden de visita, distancia_km); None si quedó vacío.
+    """
+    puntos = proyectar_km(latitudes, longitudes)
+    validas = np.flatnonzero(etiquetas >= 0)
+    orden = validas[np.argsort(etiquetas[validas], kind="stable")]
+    grupos = np.split(orden, np.cumsum(np.bincount(etiquetas[validas], minlength=k))[:-1])
+    rutas = []
+    pendientes = sum(1 for grupo in grupos if len(grupo))
+    for grupo in grupos:
+        if len(grupo) == 0:
+            rutas.append(None)
+            continue
+        if deposito is None:
+            centro = puntos[grupo].mean(axis=0)
+            inicio = int(((puntos[grupo] - centro) ** 2).sum(axis=1).argmax())
+            grupo = np.concatenate((grupo[inicio:inicio + 1], np.delete(grupo, inicio)))
+        paradas = [
+            {"id": int(ids[i]), "latitud": latitudes[i], "longitud": longitudes[i]}
+            for i in grupo
+        ]
+        tiempo = tiempo_ruta
+        if limite is not None:
+            tiempo = min(tiempo, max(0.0, limite - time.perf_counter()) / pendientes)
+        pendientes -= 1
+        ordenadas, distancia, _ = optimizar_puntos(paradas, deposito, cerrado, tiempo)
+        rutas.append(([parada["id"] for parada in ordenadas], distancia))
+    return rutas
+
+def generar_rutas(ids, latitudes, longitudes, k: int, capacidad: int, deposito: dict = None,
+                  tiempo_total: float = 3.0, tiempo_max_ruta: float = 0.3):
+    """
+    Repartir los clientes en k grupos de como mucho `capacidad` y ordenar cada uno.
+    tiempo_total (segundos) cubre las dos fases: el agrupamiento deja de
+    iterar a la mitad y el resto se reparte entre las rutas.
+    Devuelve [(ids en orden de visita, distancia_km)].
+    """
+    inicio = time.perf_counter()
+    ids = np.asarray(ids)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    etiquetas = agrupar_con_capacidad(latitudes, longitudes, k, capacidad, limite=inicio + tiempo_total / 2)
+    tiempo_ruta = min(tiempo_max_ruta, tiempo_total / max(k, 1))
+    rutas = ordenar_grupos(
+        ids, latitudes, longitudes, etiquetas, k, deposito, False, tiempo_ruta, limite=inicio + tiempo_total
+    )
+    return [ruta for ruta in rutas if ruta is not None]
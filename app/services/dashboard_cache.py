@@ -0,0 +1,128 @@
+# app/services/dashboard_cache.py
+import asyncio
+import threading
+import time
+from app.config.config import settings
+
+SECCIONES_PEDIDOS = ("resumen", "metricas", "populares", "pendientes", "mensuales")
+SECCIONES_RUTAS = ("resumen", "rutas")
+
+class DashboardCache:
+    """
+    Caché con TTL por sección del dashboard y coalescencia de peticiones.
+
+    Si varias peticiones fallan a la vez en la misma sección (mismos parámetros)
+    solo la primera consulta la base de datos; las demás esperan ese mismo resultado.
+    Las escrituras de pedidos y rutas invalidan sus secciones subiendo la generación,
+    así un cálculo que empezó antes de la escritura no se guarda en la caché.
+    """
+
+    MAX_VARIANTES = 1000
+
+    def __init__(self, ttls: dict):
+        self.ttls = ttls
+        self._entries = {}       # (seccion, params) -> (expira_en, valor)
+        self._last = {}          # (seccion, params) -> último valor calculado, aunque haya expirado
+        self._generations = {}   # seccion -> int
+        self._inflight = {}      # (seccion, params, generacion) -> asyncio.Task
+        self._lock = threading.Lock()
+        self._listeners = []     # funciones llamadas con las secciones invalidadas
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, seccion: str, *params):
+        """Valor vigente de la sección o None"""
+        with self._lock:
+            entry = self._entries.get((seccion, params))
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    async def get_or_compute(self, seccion: str, compute, *params):
+        """Devolver la sección desde caché o calcularla una sola vez con compute()"""
+        ttl = self.ttls.get(seccion, 0)
+        if ttl <= 0:
+            valor = await compute()
+            self._recordar(seccion, params, valor)
+            return valor
+
+        valor = self.get(seccion, *params)
+        if valor is not None:
+            self.hits += 1
+            return valor
+
+        generacion = self._generations.get(seccion, 0)
+        clave = (seccion, params, generacion)
+        task = self._inflight.get(clave)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(seccion, params, generacion, ttl, compute))
+            self._inflight[clave] = task
+            task.add_done_callback(lambda _: self._inflight.pop(clave, None))
+        else:
+            self.coalesced += 1
+        # shield: si el cliente que inició el cálculo se desconecta, los demás siguen esperando
+        return await asyncio.shield(task)
+
+    async def _compute(self, seccion: str, params: tuple, generacion: int, ttl: int, compute):
+        valor = await compute()
+        self._recordar(seccion, params, valor)
+        with self._lock:
+            # Una escritura durante el cálculo deja el resultado obsoleto: no guardarlo
+            if self._generations.get(seccion, 0) == generacion:
+                self._entries[(seccion, params)] = (time.monotonic() + ttl, valor)
+                while len(self._entries) > self.MAX_VARIANTES:
+                    self._entries.pop(next(iter(self._entries)))
+        return valor
+
+    def _recordar(self, seccion: str, params: tuple, valor):
+        self._last[(seccion, params)] = valor
+        # Los parámetros (limit, meses) vienen del cliente: acotar cuántas variantes se guardan
+        while len(self._last) > self.MAX_VARIANTES:
+            self._last.pop(next(iter(self._last)))
+
+    def ultimo_valor(self, seccion: str, *params):
+        """Último valor calculado de la sección (posiblemente obsoleto) para degradar ante fallos"""
+        return self._last.get((seccion, params))
+
+    def invalidate(self, *secciones: str):
+        """Descartar las secciones indicadas (todas si no se indica ninguna)"""
+        secciones = secciones or tuple(self.ttls)
+        with self._lock:
+            for seccion in secciones:
+                self._generations[seccion] = self._generations.get(seccion, 0) + 1
+            for clave in [clave for clave in self._entries if clave[0] in secciones]:
+                del self._entries[clave]
+        for listener in self._listeners:
+            listener(secciones)
+
+    def add_listener(self, listener):
+        """Registrar una función a la que se avisa de cada invalidación (puede llamarse desde otro hilo)"""
+        self._listeners.append(listener)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+dashboard_cache = DashboardCache({
+    "resumen": settings.DASHBOARD_CACHE_TTL_RESUMEN,
+    "metricas": settings.DASHBOARD_CACHE_TTL_METRICAS,
+    "populares": settings.DASHBOARD_CACHE_TTL_POPULARES,
+    "pendientes": settings.DASHBOARD_CACHE_TTL_PENDIENTES,
+    "rutas": settings.DASHBOARD_CACHE_TTL_RUTAS,
+    "mensuales": settings.DASHBOARD_CACHE_TTL_MENSUALES
+})
+
+def invalidar_pedidos():
+    """Hook tras crear, modificar o eliminar pedidos"""
+    dashboard_cache.invalidate(*SECCIONES_PEDIDOS)
+
+def invalidar_rutas():
+    """Hook tras modificar rutas, sus clientes o sus asignaciones"""
+    dashboard_cache.invalidate(*SECCIONES_RUTAS)
@@ -0,0 +1,160 @@
+# app/services/dashboard_events.py
+import asyncio
+import json
+import time
+from app.config.config import settings
+from app.config.executors import run_crud_isolated
+from app.services.dashboard_cache import dashboard_cache
+
+class _Suscriptor:
+    """Cola acotada de un cliente SSE; si se llena, el cliente se resincroniza con un snapshot"""
+
+    def __init__(self, max_pendientes: int):
+        self.cola = asyncio.Queue(maxsize=max_pendientes)
+        self.descartados = 0
+
+    def entregar(self, mensaje: str):
+        try:
+            self.cola.put_nowait(mensaje)
+        except asyncio.QueueFull:
+            # Cliente lento: en lugar de bloquear al resto se vacía su cola
+            # y se le envía el estado completo cuando vuelva a leer
+            self.descartados += self.cola.qsize()
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(None)
+
+class DashboardHub:
+    """
+    Difusión de cambios del dashboard a los clientes conectados por SSE.
+
+    Las invalidaciones de la caché marcan secciones como sucias; un único
+    recálculo (agrupado durante unos instantes) obtiene las secciones nuevas
+    y envía a todos los suscriptores solo las que cambiaron.
+
+    Las invalidaciones solo llegan de este proceso: mientras haya suscriptores,
+    cada sección se recalcula además cada vez que vence su TTL de caché (o cada
+    resync_seconds si no tiene caché), así las escrituras hechas por otros
+    workers llegan con como mucho unos dos TTL de retraso.
+    """
+
+    def __init__(self, secciones, modelo, debounce_seconds: float = 1.0, max_pendientes: int = 16,
+                 resync_seconds: float = 30.0):
+        self.secciones = secciones  # [(campo, seccion_cache, consulta, parametros)]
+        self.modelo = modelo
+        self.debounce_seconds = debounce_seconds
+        self.max_pendientes = max_pendientes
+        # seccion_cache -> segundos entre resincronizaciones
+        self._periodos = {
+            nombre: dashboard_cache.ttls.get(nombre, 0) or resync_seconds
+            for _, nombre, _, _ in secciones
+        }
+        self._suscriptores = set()
+        self._estado = {}           # campo -> último valor enviado en un delta
+        self._sucias = set()
+        self._pendiente = None
+        self._loop = None
+        self._worker = None
+        self.difundidos = 0
+        dashboard_cache.add_listener(self._on_invalidate)
+
+    def suscribir(self) -> _Suscriptor:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._pendiente = asyncio.Event()
+        suscriptor = _Suscriptor(self.max_pendientes)
+        self._suscriptores.add(suscriptor)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.ensure_future(self._procesar())
+        return suscriptor
+
+    def desuscribir(self, suscriptor: _Suscriptor):
+        self._suscriptores.discard(suscriptor)
+        if not self._suscriptores and self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+
+    async def snapshot(self) -> str:
+        """Mensaje SSE con el dashboard completo (desde la caché compartida)"""
+        datos = {}
+        for campo, nombre, consulta, params in self.secciones:
+            datos[campo] = self._serializar(campo, await self._calcular(nombre, consulta, params))
+        return self._mensaje("snapshot", datos)
+
+    def _on_invalidate(self, secciones):
+        # Se llama desde el hilo que hizo la escritura: pasar al event loop
+        if self._loop is None or not self._suscriptores or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._marcar, secciones)
+
+    def _marcar(self, secciones):
+        self._sucias.update(secciones)
+        self._pendiente.set()
+
+    async def _procesar(self):
+        proximas = {nombre: time.monotonic() + periodo for nombre, periodo in self._periodos.items()}
+        while True:
+            try:
+                espera = max(0.0, min(proximas.values()) - time.monotonic())
+                await asyncio.wait_for(self._pendiente.wait(), timeout=espera)
+                # Una ráfaga de pedidos produce un solo recálculo
+                await asyncio.sleep(self.debounce_seconds)
+            except asyncio.TimeoutError:
+                pass
+            # Resincronización periódica: recoge las escrituras de otros workers
+            ahora = time.monotonic()
+            vencidas = {nombre for nombre, proxima in proximas.items() if proxima <= ahora}
+            for nombre in vencidas:
+                proximas[nombre] = ahora + self._periodos[nombre]
+            self._pendiente.clear()
+            sucias, self._sucias = self._sucias | vencidas, set()
+
+            delta = {}
+            for campo, nombre, consulta, params in self.secciones:
+                if nombre not in sucias:
+                    continue
+                try:
+                    valor = self._serializar(campo, await self._calcular(nombre, consulta, params))
+                except Exception as e:
+                    print(f"❌ Error recalculando sección '{nombre}' para SSE: {e!r}")
+                    continue
+                if valor != self._estado.get(campo):
+                    self._estado[campo] = valor
+                    delta[campo] = valor
+
+            if delta:
+                self._difundir(self._mensaje("delta", delta))
+
+    def _difundir(self, mensaje: str):
+        self.difundidos += 1
+        for suscriptor in list(self._suscriptores):
+            suscriptor.entregar(mensaje)
+
+    async def _calcular(self, nombre: str, consulta, params: tuple):
+        return await dashboard_cache.get_or_compute(
+            nombre, lambda: run_crud_isolated(consulta, *params), *params
+        )
+
+    def _serializar(self, campo: str, valor):
+        return self.modelo.model_validate({campo: valor}).model_dump(mode="json")[campo]
+
+    @staticmethod
+    def _mensaje(evento: str, datos) -> str:
+        return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+    def stats(self):
+        return {
+            "suscriptores": len(self._suscriptores),
+            "difundidos": self.difundidos,
+            "descartados": sum(suscriptor.descartados for suscriptor in self._suscriptores)
+        }
+
+def crear_dashboard_hub(secciones, modelo):
+    return DashboardHub(
+        secciones,
+        modelo,
+        debounce_seconds=settings.DASHBOARD_STREAM_DEBOUNCE_SECONDS,
+        max_pendientes=settings.DASHBOARD_STREAM_QUEUE_SIZE,
+        resync_seconds=settings.DASHBOARD_STREAM_RESYNC_SECONDS
+    )
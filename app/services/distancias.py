@@ -0,0 +1,197 @@
+# app/services/distancias.py
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from app.config.config import settings
+from app.services.optimizacion_rutas import matriz_haversine
+
+class _Entrada:
+    """Matriz float32 de un conjunto de clientes con las coordenadas con que se calculó"""
+
+    def __init__(self, ids, coordenadas, matriz):
+        self.ids = ids                   # np.int64 (n,)
+        self.coordenadas = coordenadas   # np.float64 (n, 2)
+        self.matriz = matriz             # np.float32 (n, n)
+        self.posiciones = {int(cliente_id): i for i, cliente_id in enumerate(ids)}
+
+class CacheDistancias:
+    """
+    Caché de matrices de distancias por ruta (u otra clave), en float32.
+
+    Al pedir la matriz de un conjunto de clientes se reutilizan las distancias
+    ya calculadas entre clientes conocidos y solo se calculan las filas de los
+    clientes nuevos o cuyas coordenadas cambiaron. Con DISTANCIAS_CACHE_DIR las
+    matrices se guardan en disco y se abren con memory-map, así los workers de
+    uvicorn comparten el trabajo; las coordenadas guardadas junto a la matriz
+    evitan usar distancias de un cliente que otro worker modificó.
+    """
+
+    INTERVALO_PODA = 3600  # segundos entre limpiezas del directorio
+
+    def __init__(self, max_entradas: int = 128, directorio: str = None, ttl_disco_horas: float = 168):
+        self.max_entradas = max_entradas
+        self.directorio = directorio
+        self.ttl_disco_horas = ttl_disco_horas
+        self._ultima_poda = 0.0
+        self._entradas = OrderedDict()  # clave -> _Entrada (LRU)
+        self._lock = threading.Lock()
+        self.reutilizadas = 0
+        self.calculadas = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def matriz(self, clave: str, ids, latitudes, longitudes) -> np.ndarray:
+        """Matriz (n, n) en km para los clientes en el orden indicado"""
+        ids = np.asarray(ids, dtype=np.int64)
+        coordenadas = np.column_stack((
+            np.asarray(latitudes, dtype=np.float64),
+            np.asarray(longitudes, dtype=np.float64)
+        ))
+        n = len(ids)
+        entrada = self._obtener(clave)
+
+        # Posición en la matriz cacheada de cada cliente que sigue igual
+        anteriores = np.full(n, -1, dtype=np.int64)
+        if entrada is not None:
+            for i, cliente_id in enumerate(ids):
+                posicion = entrada.posiciones.get(int(cliente_id))
+                if posicion is not None and np.array_equal(entrada.coordenadas[posicion], coordenadas[i]):
+                    anteriores[i] = posicion
+        conocidos = np.flatnonzero(anteriores >= 0)
+        nuevos = np.flatnonzero(anteriores < 0)
+
+        matriz = np.empty((n, n), dtype=np.float32)
+        if len(conocidos):
+            matriz[np.ix_(conocidos, conocidos)] = entrada.matriz[np.ix_(anteriores[conocidos], anteriores[conocidos])]
+        if len(nuevos):
+            filas = matriz_haversine(
+                coordenadas[nuevos, 0], coordenadas[nuevos, 1],
+                coordenadas[:, 0], coordenadas[:, 1]
+            ).astype(np.float32)
+            matriz[nuevos, :] = filas
+            matriz[:, nuevos] = filas.T
+            self._guardar(clave, _Entrada(ids, coordenadas, matriz))
+
+        self.reutilizadas += len(conocidos) ** 2
+        self.calculadas += n * n - len(conocidos) ** 2
+        return matriz
+
+    def invalidar_cliente(self, cliente_id: int):
+        """Olvidar las distancias de un cliente (p. ej. al cambiar sus coordenadas)"""
+        with self._lock:
+            for entrada in self._entradas.values():
+                entrada.posiciones.pop(int(cliente_id), None)
+
+    def invalidar(self, clave: str):
+        with self._lock:
+            self._entradas.pop(clave, None)
+        if self.directorio and os.path.exists(self._ruta_archivo(clave)):
+            os.remove(self._ruta_archivo(clave))
+
+    def _obtener(self, clave: str):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                return entrada
+        return self._leer(clave) if self.directorio else None
+
+    def _insertar(self, clave: str, entrada: _Entrada):
+        # Al salir del LRU se suelta también el memory-map de las entradas leídas de disco
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def _guardar(self, clave: str, entrada: _Entrada):
+        self._insertar(clave, entrada)
+        if self.directorio:
+            self._escribir(clave, entrada)
+            self._podar_si_toca()
+
+    def _ruta_archivo(self, clave: str):
+        return os.path.join(self.directorio, clave.replace(":", "_") + ".npy")
+
+    def _escribir(self, clave: str, entrada: _Entrada):
+        # Un solo archivo por clave (id, coordenadas y fila de distancias por cliente)
+        # para que nunca se lean coordenadas de una versión y distancias de otra
+        n = len(entrada.ids)
+        datos = np.empty(n, dtype=[
+            ("id", np.int64), ("coordenadas", np.float64, (2,)), ("distancias", np.float32, (n,))
+        ])
+        datos["id"] = entrada.ids
+        datos["coordenadas"] = entrada.coordenadas
+        datos["distancias"] = entrada.matriz
+        ruta = self._ruta_archivo(clave)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, "wb") as archivo:
+                np.save(archivo, datos)
+            # Reemplazo atómico: los otros workers nunca ven un archivo a medias
+            os.replace(temporal, ruta)
+        except OSError as e:
+            print(f"❌ Error guardando matriz de distancias '{clave}': {e}")
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+
+    def _leer(self, clave: str):
+        ruta = self._ruta_archivo(clave)
+        try:
+            datos = np.load(ruta, mmap_mode="r")
+            entrada = _Entrada(np.asarray(datos["id"]), np.asarray(datos["coordenadas"]), datos["distancias"])
+            # La fecha de modificación marca el último uso para la poda
+            os.utime(ruta)
+        except (OSError, ValueError):
+            return None
+        self._insertar(clave, entrada)
+        return entrada
+
+    def _podar_si_toca(self):
+        ahora = time.monotonic()
+        if self._ultima_poda and ahora - self._ultima_poda < self.INTERVALO_PODA:
+            return
+        self._ultima_poda = ahora
+        self.podar_disco()
+
+    def podar_disco(self) -> int:
+        """Eliminar las matrices sin usar en ttl_disco_horas y los temporales huérfanos"""
+        if not self.directorio or self.ttl_disco_horas <= 0:
+            return 0
+        limite = time.time() - self.ttl_disco_horas * 3600
+        limite_temporales = time.time() - self.INTERVALO_PODA
+        eliminados = 0
+        for nombre in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, nombre)
+            try:
+                modificado = os.path.getmtime(ruta)
+                if (nombre.endswith(".npy") and modificado < limite) or \
+                        (nombre.endswith(".tmp") and modificado < limite_temporales):
+                    os.remove(ruta)
+                    eliminados += 1
+            except OSError:
+                continue
+        if eliminados:
+            print(f"✅ {eliminados} matrices de distancias vencidas eliminadas de {self.directorio}")
+        return eliminados
+
+    def stats(self):
+        return {
+            "entradas": len(self._entradas),
+            "distancias_reutilizadas": self.reutilizadas,
+            "distancias_calculadas": self.calculadas
+        }
+
+cache_distancias = CacheDistancias(
+    max_entradas=settings.DISTANCIAS_CACHE_MAX_RUTAS,
+    directorio=settings.DISTANCIAS_CACHE_DIR,
+    ttl_disco_horas=settings.DISTANCIAS_CACHE_DISCO_TTL_HORAS
+)
+
+def invalidar_cliente(cliente_id: int):
+    """Hook tras cambiar las coordenadas de un cliente"""
+    cache_distancias.invalidar_cliente(cliente_id)
@@ -0,0 +1,77 @@
+# app/services/exportacion.py
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from app.config.config import settings
+from app.config.database import SessionLocal, AsyncSessionLocal
+
+def _valor(valor):
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    return valor
+
+def _lotes_sync(stmt):
+    """Leer con cursor del servidor en lotes de EXPORT_YIELD_PER filas, en una sesión propia"""
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        for lote in result.partitions():
+            yield lote
+    finally:
+        db.close()
+
+async def _lotes_async(stmt):
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=settings.EXPORT_YIELD_PER))
+        async for lote in result.partitions():
+            yield lote
+
+def _csv_encabezado(columnas):
+    return _csv_lote([columnas], columnas)
+
+def _csv_lote(filas, columnas):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_valor(valor) for valor in fila] for fila in filas)
+    return buffer.getvalue()
+
+def _ndjson_encabezado(columnas):
+    return ""
+
+def _ndjson_lote(filas, columnas):
+    return "".join(
+        json.dumps(dict(zip(columnas, (_valor(valor) for valor in fila))), ensure_ascii=False) + "\n"
+        for fila in filas
+    )
+
+FORMATOS = {
+    "csv": (_csv_encabezado, _csv_lote, "text/csv; charset=utf-8"),
+    "ndjson": (_ndjson_encabezado, _ndjson_lote, "application/x-ndjson"),
+}
+
+def _generar_sync(encabezado, formatear, columnas, lotes):
+    yield encabezado(columnas)
+    for lote in lotes:
+        yield formatear(lote, columnas)
+
+async def _generar_async(encabezado, formatear, columnas, lotes):
+    yield encabezado(columnas)
+    async for lote in lotes:
+        yield formatear(lote, columnas)
+
+def exportar(stmt, formato: str):
+    """
+    Devolver (iterable, media_type) que genera el archivo mientras se lee la base de datos:
+    la memoria usada depende del tamaño del lote, no del total exportado
+    """
+    encabezado, formatear, media_type = FORMATOS[formato]
+    columnas = [columna.name for columna in stmt.selected_columns]
+    if AsyncSessionLocal is not None:
+        return _generar_async(encabezado, formatear, columnas, _lotes_async(stmt)), media_type
+    return _generar_sync(encabezado, formatear, columnas, _lotes_sync(stmt)), media_type
@@ -0,0 +1,152 @@
+# app/services/indice_espacial.py
+import math
+import threading
+import time
+import numpy as np
+from app.config.config import settings
+from app.services.optimizacion_rutas import matriz_haversine, KM_POR_GRADO
+
+class IndiceClientes:
+    """
+    Índice espacial en memoria (rejilla de celdas de N grados) de los clientes
+    activos con coordenadas.
+
+    Se construye con una sola consulta la primera vez que se usa y se mantiene
+    al día con los hooks de crear/actualizar/eliminar cliente. Cada TTL se
+    reconstruye para recoger cambios hechos por otros workers.
+    """
+
+    def __init__(self, celda_grados: float = 0.05, ttl_seconds: int = 300):
+        self.celda = celda_grados
+        self.ttl_seconds = ttl_seconds
+        self._celdas = {}      # (fila, columna) -> {cliente_id: (lat, lon)}
+        self._ubicacion = {}   # cliente_id -> (fila, columna)
+        self._construido_en = None
+        self._cambios = None   # hooks recibidos durante una reconstrucción, para reaplicarlos
+        self._lock = threading.Lock()
+        self._reconstruccion = threading.Lock()
+        self.consultas = 0
+
+    def _clave(self, latitud: float, longitud: float):
+        return (math.floor(latitud / self.celda), math.floor(longitud / self.celda))
+
+    def _vigente(self) -> bool:
+        return (
+            self._construido_en is not None
+            and (self.ttl_seconds <= 0 or time.monotonic() - self._construido_en < self.ttl_seconds)
+        )
+
+    def asegurar(self, cargar):
+        """
+        Construir (o reconstruir si venció el TTL) con cargar() -> [(id, lat, lon)].
+        Solo un hilo reconstruye; mientras tanto los demás siguen usando la rejilla
+        anterior (o esperan si aún no hay ninguna).
+        """
+        if self._vigente():
+            return
+        if not self._reconstruccion.acquire(blocking=self._construido_en is None):
+            return
+        try:
+            if self._vigente():
+                return
+            with self._lock:
+                self._cambios = []
+            filas = cargar()
+            celdas, ubicacion = {}, {}
+            for cliente_id, latitud, longitud in filas:
+                self._aplicar(celdas, ubicacion, cliente_id, latitud, longitud, True)
+            with self._lock:
+                # Los cambios que llegaron durante la consulta pueden faltar en la foto
+                for cambio in self._cambios:
+                    self._aplicar(celdas, ubicacion, *cambio)
+                self._celdas, self._ubicacion = celdas, ubicacion
+                self._construido_en = time.monotonic()
+            print(f"✅ Índice espacial de clientes construido ({len(ubicacion)} clientes)")
+        finally:
+            with self._lock:
+                self._cambios = None
+            self._reconstruccion.release()
+
+    def _aplicar(self, celdas: dict, ubicacion: dict, cliente_id: int, latitud, longitud, activo: bool):
+        anterior = ubicacion.pop(cliente_id, None)
+        if anterior is not None:
+            celda = celdas.get(anterior)
+            if celda is not None:
+                celda.pop(cliente_id, None)
+                if not celda:
+                    del celdas[anterior]
+        if activo and latitud is not None and longitud is not None:
+            latitud, longitud = float(latitud), float(longitud)
+            clave = self._clave(latitud, longitud)
+            celdas.setdefault(clave, {})[cliente_id] = (latitud, longitud)
+            ubicacion[cliente_id] = clave
+
+    def actualizar(self, cliente_id: int, latitud, longitud, activo: bool = True):
+        """Hook tras crear o modificar un cliente; sin coordenadas o inactivo sale del índice"""
+        with self._lock:
+            if self._cambios is not None:
+                self._cambios.append((cliente_id, latitud, longitud, activo))
+            if self._construido_en is None:
+                return
+            self._aplicar(self._celdas, self._ubicacion, cliente_id, latitud, longitud, activo)
+
+    def eliminar(self, cliente_id: int):
+        self.actualizar(cliente_id, None, None, activo=False)
+
+    def cercanos(self, latitud: float, longitud: float, radio_km: float, limit: int = 50):
+        """[(cliente_id, distancia_km)] dentro del radio, del más cercano al más lejano"""
+        self.consultas += 1
+        delta_lat = radio_km / KM_POR_GRADO
+        # Cerca de los polos un grado de longitud mide casi nada: cubrir todas las longitudes
+        coseno = math.cos(math.radians(min(abs(latitud) + delta_lat, 90.0)))
+        delta_lon = 180.0 if coseno < 1e-6 else min(radio_km / (KM_POR_GRADO * coseno), 180.0)
+
+        fila_min, columna_min = self._clave(latitud - delta_lat, longitud - delta_lon)
+        fila_max, columna_max = self._clave(latitud + delta_lat, longitud + delta_lon)
+        ids, latitudes, longitudes = [], [], []
+        # Si el radio cruza el antimeridiano se filtra solo por latitud
+        envuelve = longitud - delta_lon < -180.0 or longitud + delta_lon > 180.0
+        with self._lock:
+            rango = (fila_max - fila_min + 1) * (columna_max - columna_min + 1)
+            if rango <= len(self._celdas) and not envuelve:
+                claves = (
+                    (fila, columna)
+                    for fila in range(fila_min, fila_max + 1)
+                    for columna in range(columna_min, columna_max + 1)
+                )
+            else:
+                # Radio grande: es más barato recorrer las celdas ocupadas
+                claves = [
+                    clave for clave in self._celdas
+                    if fila_min <= clave[0] <= fila_max
+                    and (envuelve or columna_min <= clave[1] <= columna_max)
+                ]
+            for clave in claves:
+                celda = self._celdas.get(clave)
+                if not celda:
+                    continue
+                for cliente_id, (lat, lon) in celda.items():
+                    ids.append(cliente_id)
+                    latitudes.append(lat)
+                    longitudes.append(lon)
+        if not ids:
+            return []
+
+        distancias = matriz_haversine([latitud], [longitud], latitudes, longitudes)[0]
+        dentro = np.flatnonzero(distancias <= radio_km)
+        if len(dentro) > limit:
+            dentro = dentro[np.argpartition(distancias[dentro], limit - 1)[:limit]]
+        dentro = dentro[np.argsort(distancias[dentro], kind="stable")]
+        return [(ids[i], float(distancias[i])) for i in dentro]
+
+    def stats(self):
+        return {
+            "clientes": len(self._ubicacion),
+            "celdas": len(self._celdas),
+            "consultas": self.consultas
+        }
+
+indice_clientes = IndiceClientes(
+    celda_grados=settings.CLIENTES_INDICE_CELDA_GRADOS,
+    ttl_seconds=settings.CLIENTES_INDICE_TTL_SECONDS
+)
@@ -0,0 +1,198 @@
+# app/services/optimizacion_rutas.py
+import itertools
+import time
+import numpy as np
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = 111.32
+EXACTO_MAX_NODOS = 7  # hasta aquí se prueban todos los órdenes (6! = 720, < 1 ms)
+
+def matriz_haversine(latitudes, longitudes, latitudes_destino=None, longitudes_destino=None):
+    """
+    Distancias en km entre todos los puntos (o entre dos conjuntos de puntos),
+    calculadas de una vez con NumPy
+    """
+    lat1 = np.radians(np.asarray(latitudes, dtype=np.float64))[:, None]
+    lon1 = np.radians(np.asarray(longitudes, dtype=np.float64))[:, None]
+    if latitudes_destino is None:
+        lat2, lon2 = lat1.T, lon1.T
+    else:
+        lat2 = np.radians(np.asarray(latitudes_destino, dtype=np.float64))[None, :]
+        lon2 = np.radians(np.asarray(longitudes_destino, dtype=np.float64))[None, :]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def _costos(distancias, cerrado: bool):
+    # En un recorrido abierto el regreso al inicio no cuesta: así el mismo
+    # algoritmo de ciclo sirve para caminos que terminan en cualquier parada
+    costos = np.array(distancias, dtype=np.float64, copy=True)
+    if not cerrado:
+        costos[:, 0] = 0.0
+    return costos
+
+def longitud_recorrido(distancias, orden, cerrado: bool = False) -> float:
+    """Distancia total de visitar los nodos en el orden dado"""
+    orden = np.asarray(orden)
+    if len(orden) < 2:
+        return 0.0
+    total = float(distancias[orden[:-1], orden[1:]].sum(dtype=np.float64))
+    if cerrado:
+        total += float(distancias[orden[-1], orden[0]])
+    return total
+
+def vecino_mas_cercano(costos) -> np.ndarray:
+    """Recorrido inicial desde el nodo 0 yendo siempre al nodo libre más cercano"""
+    n = len(costos)
+    orden = np.empty(n, dtype=np.int64)
+    libres = np.ones(n, dtype=bool)
+    actual = 0
+    orden[0] = 0
+    libres[0] = False
+    for paso in range(1, n):
+        fila = np.where(libres, costos[actual], np.inf)
+        actual = int(fila.argmin())
+        orden[paso] = actual
+        libres[actual] = False
+    return orden
+
+def _dos_opt(costos, orden, limite: float) -> bool:
+    """Una pasada de 2-opt (primera mejora por cada i); True si mejoró algo"""
+    n = len(orden)
+    mejoro = False
+    siguiente = np.roll(orden, -1)
+    aristas = costos[orden, siguiente]
+    for i in range(1, n - 1):
+        if time.perf_counter() > limite:
+            break
+        a, b = orden[i - 1], orden[i]
+        # Invertir orden[i..j]: (a,b) y (c,d) pasan a ser (a,c) y (b,d)
+        delta = costos[a, orden[i + 1:]] + costos[b, siguiente[i + 1:]] - aristas[i - 1] - aristas[i + 1:]
+        j = int(delta.argmin())
+        if delta[j] < -1e-9:
+            j += i + 1
+            orden[i:j + 1] = orden[i:j + 1][::-1].copy()
+            siguiente = np.roll(orden, -1)
+            aristas = costos[orden, siguiente]
+            mejoro = True
+    return mejoro
+
+def _or_opt(costos, orden, limite: float, max_segmento: int = 3) -> bool:
+    """Una pasada de Or-opt: mover tramos de 1 a 3 paradas a su mejor hueco (también invertidos)"""
+    n = len(orden)
+    mejoro = False
+    siguiente = np.roll(orden, -1)
+    aristas = costos[orden, siguiente]
+    for largo in range(1, max_segmento + 1):
+        i = 1
+        while i + largo <= n:
+            if time.perf_counter() > limite:
+                return mejoro
+            s0, s1 = orden[i], orden[i + largo - 1]
+            p = orden[i - 1]
+            q = orden[(i + largo) % n]
+            ganancia = costos[p, s0] + costos[s1, q] - costos[p, q]
+
+            # Insertar el tramo en la arista (orden[j], siguiente[j])
+            directo = costos[orden, s0] + costos[s1, siguiente] - aristas
+            invertido = costos[orden, s1] + costos[s0, siguiente] - aristas
+            directo[i - 1:i + largo] = invertido[i - 1:i + largo] = np.inf  # aristas que tocan el tramo
+            j_directo = int(directo.argmin())
+            j_invertido = int(invertido.argmin())
+            if invertido[j_invertido] < directo[j_directo]:
+                j, costo, paso = j_invertido, invertido[j_invertido], -1
+            else:
+                j, costo, paso = j_directo, directo[j_directo], 1
+
+            if costo < ganancia - 1e-9:
+                tramo = orden[i:i + largo][::paso].copy()
+                resto = np.concatenate((orden[:i], orden[i + largo:]))
+                k = j if j < i else j - largo
+                orden[:] = np.concatenate((resto[:k + 1], tramo, resto[k + 1:]))
+                siguiente = np.roll(orden, -1)
+                aristas = costos[orden, siguiente]
+                mejoro = True
+            else:
+                i += 1
+    return mejoro
+
+def _recorrido_exacto(costos) -> np.ndarray:
+    """Mejor ciclo desde el nodo 0 probando todas las permutaciones (solo para pocos nodos)"""
+    n = len(costos)
+    resto = np.array(list(itertools.permutations(range(1, n))), dtype=np.int64)
+    ciclos = np.column_stack((np.zeros(len(resto), dtype=np.int64), resto, np.zeros(len(resto), dtype=np.int64)))
+    totales = costos[ciclos[:, :-1], ciclos[:, 1:]].sum(axis=1)
+    return ciclos[int(totales.argmin()), :-1].copy()
+
+def optimizar_recorrido(distancias, cerrado: bool = False, tiempo_max: float = 0.3):
+    """
+    Ordenar los nodos de la matriz empezando por el nodo 0.
+
+    Con pocos nodos (EXACTO_MAX_NODOS) devuelve el orden óptimo; si no,
+    construye el recorrido con vecino más cercano y lo mejora con 2-opt y
+    Or-opt hasta que no haya mejoras o se agote tiempo_max (segundos).
+    Con cerrado=False el recorrido termina en la última parada sin volver.
+    Devuelve (orden, distancia_total).
+    """
+    n = len(distancias)
+    if n <= 2:
+        orden = np.arange(n)
+        return orden, longitud_recorrido(distancias, orden, cerrado)
+
+    costos = _costos(distancias, cerrado)
+    if n <= EXACTO_MAX_NODOS:
+        orden = _recorrido_exacto(costos)
+        return orden, longitud_recorrido(distancias, orden, cerrado)
+
+    limite = time.perf_counter() + tiempo_max
+    orden = vecino_mas_cercano(costos)
+    while time.perf_counter() < limite:
+        mejoro = _dos_opt(costos, orden, limite)
+        mejoro = _or_opt(costos, orden, limite) or mejoro
+        if not mejoro:
+            break
+    return orden, longitud_recorrido(distancias, orden, cerrado)
+
+def _matriz_puntos(puntos: list, deposito: dict, matriz_clientes):
+    """Matriz de los puntos (recibida de la caché o calculada) con el depósito como nodo 0"""
+    latitudes = [punto["latitud"] for punto in puntos]
+    longitudes = [punto["longitud"] for punto in puntos]
+    if matriz_clientes is None:
+        matriz_clientes = matriz_haversine(latitudes, longitudes)
+    if not deposito:
+        return np.asarray(matriz_clientes, dtype=np.float64)
+    n = len(puntos)
+    distancias = np.zeros((n + 1, n + 1), dtype=np.float64)
+    distancias[1:, 1:] = matriz_clientes
+    fila = matriz_haversine([deposito["latitud"]], [deposito["longitud"]], latitudes, longitudes)[0]
+    distancias[0, 1:] = fila
+    distancias[1:, 0] = fila
+    return distancias
+
+def optimizar_puntos(puntos: list, deposito: dict = None, cerrado: bool = False, tiempo_max: float = 0.3,
+                     matriz_clientes=None):
+    """
+    Optimizar una lista de puntos {"latitud", "longitud", ...}; se sale del
+    depósito si se indica, si no del primer punto. matriz_clientes permite
+    pasar las distancias entre los puntos ya calculadas (ver services/distancias).
+    Devuelve los puntos en el nuevo orden (con posicion y
+    distancia_desde_anterior_km), la distancia total y la del orden original.
+    """
+    nodos = ([deposito] if deposito else []) + puntos
+    if not nodos:
+        return [], 0.0, 0.0
+    distancias = _matriz_puntos(puntos, deposito, matriz_clientes)
+    orden, total = optimizar_recorrido(distancias, cerrado, tiempo_max)
+    original = longitud_recorrido(distancias, np.arange(len(nodos)), cerrado)
+
+    ordenados = []
+    for posicion in range(len(orden)):
+        nodo = int(orden[posicion])
+        if deposito and nodo == 0:
+            continue
+        anterior = int(orden[posicion - 1]) if posicion else None
+        ordenados.append({
+            **nodos[nodo],
+            "posicion": len(ordenados) + 1,
+            "distancia_desde_anterior_km": round(float(distancias[anterior, nodo]), 3) if anterior is not None else 0.0
+        })
+    return ordenados, total, original
@@ -0,0 +1,50 @@
+# app/services/planificacion_entregas.py
+import math
+import time
+import numpy as np
+from app.services.agrupacion import agrupar_con_capacidad, ordenar_grupos
+
+def planificar_entregas(ids, latitudes, longitudes, demandas, vehiculos: int, capacidad: float,
+                        deposito: dict = None, regresar: bool = True,
+                        tiempo_total: float = 3.0, tiempo_max_ruta: float = 0.3):
+    """
+    Ruteo de vehículos con capacidad (CVRP) heurístico: primero agrupar, después ordenar.
+
+    Las paradas se reparten con k-means con capacidad (la carga de cada grupo
+    no pasa de `capacidad`), empezando por el mínimo de vehículos que la
+    demanda necesita y sumando vehículos mientras queden paradas fuera y haya
+    vehículos libres. Después cada grupo se ordena con 2-opt / Or-opt desde el
+    depósito. tiempo_total (segundos) cubre las dos fases, como en generar_rutas.
+    Devuelve ([(ids en orden, distancia_km, carga)], ids sin asignar).
+    """
+    inicio = time.perf_counter()
+    ids = np.asarray(ids)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    demandas = np.asarray(demandas, dtype=np.float64)
+    if len(ids) == 0 or vehiculos <= 0:
+        return [], [int(cliente_id) for cliente_id in ids]
+
+    # Una parada que no cabe en ningún vehículo no se puede planificar
+    caben = demandas <= capacidad
+    k = min(vehiculos, len(ids), max(1, math.ceil(demandas[caben].sum() / capacidad)))
+    while True:
+        etiquetas = agrupar_con_capacidad(
+            latitudes, longitudes, k, capacidad, demandas=demandas, limite=inicio + tiempo_total / 2
+        )
+        if k >= min(vehiculos, len(ids)) or not (etiquetas[caben] < 0).any():
+            break
+        k += 1
+
+    # Volver al final solo tiene sentido si se sale de un depósito
+    cerrado = regresar and deposito is not None
+    ordenadas = ordenar_grupos(
+        ids, latitudes, longitudes, etiquetas, k, deposito, cerrado, min(tiempo_max_ruta, tiempo_total / k),
+        limite=inicio + tiempo_total
+    )
+    rutas = []
+    for grupo, ruta in enumerate(ordenadas):
+        if ruta is not None:
+            cliente_ids, distancia = ruta
+            rutas.append((cliente_ids, distancia, float(demandas[etiquetas == grupo].sum())))
+    return rutas, [int(cliente_id) for cliente_id in ids[etiquetas < 0]]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# La configuración exige estas variables; las pruebas no abren la base de datos
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("SECRET_KEY", "pruebas")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,70 @@
+import numpy as np
+import time
+import pytest
+from app.services.agrupacion import (
+    agrupar_con_capacidad, asignar_con_capacidad, centros_cercanos, generar_rutas, ordenar_grupos
+)
+
+def _clientes(semilla: int, n: int):
+    generador = np.random.default_rng(semilla)
+    centros = generador.random((5, 2)) + [14.0, -91.0]
+    grupo = generador.integers(5, size=n)
+    latitudes = centros[grupo, 0] + generador.normal(0, 0.03, n)
+    longitudes = centros[grupo, 1] + generador.normal(0, 0.03, n)
+    return np.arange(1, n + 1), latitudes, longitudes
+
+def test_asignacion_respeta_capacidad():
+    generador = np.random.default_rng(0)
+    distancias = generador.random((500, 7))
+    capacidades = [80, 80, 80, 80, 80, 60, 40]
+    asignacion = asignar_con_capacidad(distancias, capacidades)
+    assert (asignacion >= 0).all()
+    assert (np.bincount(asignacion, minlength=7) <= capacidades).all()
+    with pytest.raises(ValueError):
+        asignar_con_capacidad(distancias, [10] * 7)
+
+def test_asignacion_con_demandas():
+    generador = np.random.default_rng(1)
+    distancias = generador.random((300, 5))
+    demandas = generador.integers(1, 10, size=300).astype(float)
+    demandas[0] = 200  # no cabe en ningún centro
+    asignacion = asignar_con_capacidad(distancias, [100] * 5, demandas)
+    assert asignacion[0] == -1
+    asignados = asignacion >= 0
+    cargas = np.bincount(asignacion[asignados], weights=demandas[asignados], minlength=5)
+    assert (cargas <= 100).all()
+
+def test_agrupar_con_capacidad():
+    _, latitudes, longitudes = _clientes(2, 400)
+    etiquetas = agrupar_con_capacidad(latitudes, longitudes, 9, 45)
+    assert (etiquetas >= 0).all()
+    assert np.bincount(etiquetas, minlength=9).max() <= 45
+
+def test_generar_rutas_asigna_cada_cliente_una_vez():
+    ids, latitudes, longitudes = _clientes(3, 250)
+    rutas = generar_rutas(ids, latitudes, longitudes, 6, 42, tiempo_total=0.5)
+    visitados = [cliente_id for cliente_ids, _ in rutas for cliente_id in cliente_ids]
+    assert sorted(visitados) == ids.tolist()
+    assert max(len(cliente_ids) for cliente_ids, _ in rutas) <= 42
+
+def test_centros_cercanos_igual_a_ordenar_todo():
+    generador = np.random.default_rng(4)
+    puntos, centros = generador.random((5000, 2)), generador.random((300, 2))
+    indices, costos = centros_cercanos(puntos, centros, 8)
+    completos = ((puntos[:, None, :] - centros) ** 2).sum(axis=2)
+    assert np.array_equal(indices, np.argsort(completos, axis=1)[:, :8])
+    assert np.allclose(costos, np.sort(completos, axis=1)[:, :8])
+
+def test_agrupar_muchos_grupos_respeta_capacidad():
+    _, latitudes, longitudes = _clientes(5, 3000)
+    etiquetas = agrupar_con_capacidad(latitudes, longitudes, 300, 10)
+    assert (etiquetas >= 0).all()
+    assert np.bincount(etiquetas, minlength=300).max() <= 10
+
+def test_ordenar_grupos_pasado_el_limite_usa_vecino_mas_cercano():
+    ids, latitudes, longitudes = _clientes(6, 2000)
+    etiquetas = np.arange(2000) % 4
+    inicio = time.perf_counter()
+    rutas = ordenar_grupos(ids, latitudes, longitudes, etiquetas, 4, tiempo_ruta=5.0, limite=inicio)
+    assert time.perf_counter() - inicio < 2.0
+    assert sorted(cliente_id for cliente_ids, _ in rutas for cliente_id in cliente_ids) == ids.tolist()
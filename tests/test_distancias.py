@@ -0,0 +1,60 @@
+import os
+import time
+import numpy as np
+from app.services.distancias import CacheDistancias
+from app.services.optimizacion_rutas import matriz_haversine
+
+LATITUDES = [14.60, 14.62, 14.65, 14.70]
+LONGITUDES = [-90.50, -90.52, -90.48, -90.55]
+
+def test_entradas_leidas_de_disco_respetan_el_limite(tmp_path):
+    escritor = CacheDistancias(max_entradas=10, directorio=str(tmp_path))
+    for ruta in range(5):
+        escritor.matriz(f"ruta:{ruta}", [1, 2, 3, 4], LATITUDES, LONGITUDES)
+
+    lector = CacheDistancias(max_entradas=2, directorio=str(tmp_path))
+    for ruta in range(5):
+        lector.matriz(f"ruta:{ruta}", [1, 2, 3, 4], LATITUDES, LONGITUDES)
+    assert lector.stats()["entradas"] == 2
+    assert lector.reutilizadas == 5 * 16
+
+def test_escritura_fallida_no_deja_temporales(tmp_path, monkeypatch):
+    cache = CacheDistancias(directorio=str(tmp_path))
+
+    def fallar(origen, destino):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(os, "replace", fallar)
+    cache.matriz("ruta:1", [1, 2], LATITUDES[:2], LONGITUDES[:2])
+    assert os.listdir(tmp_path) == []
+
+def test_poda_de_matrices_sin_usar(tmp_path):
+    cache = CacheDistancias(directorio=str(tmp_path), ttl_disco_horas=1)
+    cache.matriz("ruta:vieja", [1, 2], LATITUDES[:2], LONGITUDES[:2])
+    cache.matriz("ruta:nueva", [1, 2], LATITUDES[:2], LONGITUDES[:2])
+    hace_un_dia = time.time() - 86400
+    os.utime(tmp_path / "ruta_vieja.npy", (hace_un_dia, hace_un_dia))
+    assert cache.podar_disco() == 1
+    assert os.listdir(tmp_path) == ["ruta_nueva.npy"]
+    assert np.isfinite(cache.matriz("ruta:vieja", [1, 2], LATITUDES[:2], LONGITUDES[:2])).all()
+
+def test_reutiliza_distancias_tras_cambiar_coordenadas():
+    cache = CacheDistancias()
+    ids = [1, 2, 3, 4]
+    cache.matriz("ruta:1", ids, LATITUDES, LONGITUDES)
+    assert cache.calculadas == 16
+
+    latitudes = list(LATITUDES)
+    latitudes[2] = 14.80  # el cliente 3 se movió
+    matriz = cache.matriz("ruta:1", ids, latitudes, LONGITUDES)
+    # Solo se recalculan la fila y la columna del cliente que cambió
+    assert cache.reutilizadas == 9
+    assert cache.calculadas == 16 + 7
+    np.testing.assert_allclose(matriz, matriz_haversine(latitudes, LONGITUDES), rtol=1e-6)
+
+def test_invalidar_cliente_recalcula_su_fila():
+    cache = CacheDistancias()
+    cache.matriz("ruta:1", [1, 2, 3], LATITUDES[:3], LONGITUDES[:3])
+    cache.invalidar_cliente(2)
+    cache.matriz("ruta:1", [1, 2, 3], LATITUDES[:3], LONGITUDES[:3])
+    assert cache.reutilizadas == 4
@@ -0,0 +1,54 @@
+from datetime import timedelta
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.config.config import settings
+from app.crud import idempotency
+from app.models import IdempotencyKey
+
+ENDPOINT = "POST /pedidos"
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    IdempotencyKey.__table__.create(engine)
+    idempotency._respuestas_recientes.clear()
+    sesion = sessionmaker(bind=engine)()
+    yield sesion
+    sesion.close()
+
+def _envejecer(db, segundos):
+    db.query(IdempotencyKey).update({"created_at": idempotency._ahora() - timedelta(seconds=segundos)})
+    db.commit()
+
+def test_reintento_devuelve_respuesta_guardada(db):
+    assert idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1") is None
+    idempotency.guardar_respuesta(db, 1, ENDPOINT, "k", 200, {"id": 7}, "h1")
+    assert idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1") == (200, {"id": 7})
+    idempotency._respuestas_recientes.clear()
+    assert idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1") == (200, {"id": 7})
+
+def test_clave_con_otro_cuerpo(db):
+    idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1")
+    with pytest.raises(idempotency.ClaveReutilizadaError):
+        idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h2")
+    idempotency.guardar_respuesta(db, 1, ENDPOINT, "k", 200, {"id": 7}, "h1")
+    with pytest.raises(idempotency.ClaveReutilizadaError):
+        idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h2")
+
+def test_reserva_abandonada_se_reclama(db):
+    idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1")
+    with pytest.raises(idempotency.ClaveEnProcesoError):
+        idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1")
+    _envejecer(db, settings.IDEMPOTENCY_CLAIM_TIMEOUT_SECONDS + 1)
+    assert idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1") is None
+    # La reserva vuelve a estar vigente
+    with pytest.raises(idempotency.ClaveEnProcesoError):
+        idempotency.reclamar_clave(db, 1, ENDPOINT, "k", "h1")
+
+def test_purga_por_ttl(db):
+    idempotency.reclamar_clave(db, 1, ENDPOINT, "vieja", "h1")
+    _envejecer(db, settings.IDEMPOTENCY_TTL_HOURS * 3600 + 1)
+    idempotency.reclamar_clave(db, 1, ENDPOINT, "nueva", "h1")
+    assert idempotency.purgar_claves(db) == 1
+    assert [fila.clave for fila in db.query(IdempotencyKey.clave)] == ["nueva"]
@@ -0,0 +1,66 @@
+import threading
+import time
+import numpy as np
+import pytest
+from app.services.indice_espacial import IndiceClientes
+from app.services.optimizacion_rutas import matriz_haversine
+
+def test_reconstruccion_unica_y_sirve_la_rejilla_anterior():
+    indice = IndiceClientes(ttl_seconds=300)
+    indice.asegurar(lambda: [(1, 14.6, -90.5)])
+    indice._construido_en -= 301  # TTL vencido
+
+    llamadas = []
+    liberar = threading.Event()
+
+    def cargar_lento():
+        llamadas.append(1)
+        liberar.wait(5)
+        return [(1, 14.6, -90.5), (2, 14.61, -90.5)]
+
+    hilos = [threading.Thread(target=indice.asegurar, args=(cargar_lento,)) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(0.2)
+    # Mientras se reconstruye las consultas usan la rejilla anterior
+    assert [cliente_id for cliente_id, _ in indice.cercanos(14.6, -90.5, 5)] == [1]
+    liberar.set()
+    for hilo in hilos:
+        hilo.join()
+    assert len(llamadas) == 1
+    assert sorted(cliente_id for cliente_id, _ in indice.cercanos(14.6, -90.5, 5)) == [1, 2]
+
+def test_cambios_durante_la_reconstruccion_no_se_pierden():
+    indice = IndiceClientes()
+
+    def cargar():
+        # La foto se tomó antes de estos cambios
+        indice.actualizar(3, 14.7, -90.6)
+        indice.eliminar(1)
+        return [(1, 14.6, -90.5), (2, 14.61, -90.5)]
+
+    indice.asegurar(cargar)
+    assert sorted(indice._ubicacion) == [2, 3]
+
+@pytest.mark.parametrize("latitud, longitud, radio_km", [
+    (14.6, -90.5, 3),
+    (14.6, -90.5, 40),
+    (14.9, -90.2, 0.5),
+    (0.0, 179.9, 60),   # cruza el antimeridiano
+    (89.5, 10.0, 100),  # cerca del polo
+])
+def test_cercanos_igual_que_fuerza_bruta(latitud, longitud, radio_km):
+    generador = np.random.default_rng(5)
+    n = 3000
+    latitudes = np.concatenate((14.3 + generador.random(n) * 0.8, generador.normal(0, 0.3, 200), 89 + generador.random(200)))
+    longitudes = np.concatenate((-90.8 + generador.random(n) * 0.8, 179.5 + generador.random(200), generador.random(200) * 360 - 180))
+    longitudes = (longitudes + 180) % 360 - 180
+    ids = list(range(len(latitudes)))
+    indice = IndiceClientes(celda_grados=0.05)
+    indice.asegurar(lambda: list(zip(ids, latitudes, longitudes)))
+
+    distancias = matriz_haversine([latitud], [longitud], latitudes, longitudes)[0]
+    esperados = sorted((float(distancias[i]), i) for i in ids if distancias[i] <= radio_km)[:50]
+    obtenidos = indice.cercanos(latitud, longitud, radio_km, limit=50)
+    assert [cliente_id for cliente_id, _ in obtenidos] == [i for _, i in esperados]
+    assert [d for _, d in obtenidos] == pytest.approx([d for d, _ in esperados])
@@ -0,0 +1,47 @@
+import itertools
+import numpy as np
+import pytest
+from app.services.optimizacion_rutas import (
+    longitud_recorrido, matriz_haversine, optimizar_puntos, optimizar_recorrido, vecino_mas_cercano, _costos
+)
+
+def _matriz(semilla: int, n: int):
+    generador = np.random.default_rng(semilla)
+    return matriz_haversine(14.5 + generador.random(n) * 0.3, -90.6 + generador.random(n) * 0.3)
+
+def _es_permutacion_desde_cero(orden, n):
+    return orden[0] == 0 and sorted(orden.tolist()) == list(range(n))
+
+@pytest.mark.parametrize("cerrado", [False, True])
+@pytest.mark.parametrize("semilla", range(40))
+def test_optimo_con_pocas_paradas(semilla, cerrado):
+    n = 3 + semilla % 5  # de 3 a 7 nodos
+    distancias = _matriz(semilla, n)
+    orden, total = optimizar_recorrido(distancias, cerrado)
+    mejor = min(
+        longitud_recorrido(distancias, (0,) + resto, cerrado)
+        for resto in itertools.permutations(range(1, n))
+    )
+    assert _es_permutacion_desde_cero(orden, n)
+    assert total == pytest.approx(mejor)
+
+@pytest.mark.parametrize("cerrado", [False, True])
+def test_mejora_no_empeora_el_vecino_mas_cercano(cerrado):
+    distancias = _matriz(7, 60)
+    inicial = longitud_recorrido(distancias, vecino_mas_cercano(_costos(distancias, cerrado)), cerrado)
+    orden, total = optimizar_recorrido(distancias, cerrado, tiempo_max=1.0)
+    assert _es_permutacion_desde_cero(orden, 60)
+    assert total == pytest.approx(longitud_recorrido(distancias, orden, cerrado))
+    assert total <= inicial + 1e-9
+
+def test_puntos_con_deposito():
+    generador = np.random.default_rng(3)
+    puntos = [
+        {"id": i, "latitud": 14.5 + generador.random() * 0.2, "longitud": -90.6 + generador.random() * 0.2}
+        for i in range(12)
+    ]
+    deposito = {"latitud": 14.6, "longitud": -90.5}
+    ordenados, total, original = optimizar_puntos(puntos, deposito, cerrado=True)
+    assert sorted(punto["id"] for punto in ordenados) == list(range(12))
+    assert [punto["posicion"] for punto in ordenados] == list(range(1, 13))
+    assert total <= original + 1e-9
@@ -0,0 +1,15 @@
+from datetime import date
+from sqlalchemy.dialects import mssql, sqlite
+from app.crud.ruta import sentencia_bloqueo_plan
+
+def test_bloqueo_en_sql_server():
+    sentencia, parametros = sentencia_bloqueo_plan("mssql", date(2026, 10, 20))
+    sql = str(sentencia.compile(dialect=mssql.dialect()))
+    assert "sp_getapplock" in sql
+    assert "@LockMode = 'Exclusive'" in sql
+    assert "@LockOwner = 'Transaction'" in sql
+    assert "THROW" in sql
+    assert parametros["recurso"] == "plan_entregas:2026-10-20"
+
+def test_sin_bloqueo_en_otros_motores():
+    assert sentencia_bloqueo_plan(sqlite.dialect.name, date(2026, 10, 20)) == (None, None)
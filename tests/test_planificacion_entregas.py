@@ -0,0 +1,43 @@
+import time
+import numpy as np
+import pytest
+from app.services.planificacion_entregas import planificar_entregas
+
+def _clientes(semilla: int, n: int):
+    generador = np.random.default_rng(semilla)
+    centros = generador.random((5, 2)) + [14.0, -91.0]
+    grupo = generador.integers(5, size=n)
+    latitudes = centros[grupo, 0] + generador.normal(0, 0.03, n)
+    longitudes = centros[grupo, 1] + generador.normal(0, 0.03, n)
+    return np.arange(1, n + 1), latitudes, longitudes
+
+@pytest.mark.parametrize("vehiculos, capacidad", [(30, 60), (4, 60)])
+def test_planificar_entregas(vehiculos, capacidad):
+    ids, latitudes, longitudes = _clientes(4, 300)
+    demandas = np.random.default_rng(4).integers(1, 6, size=300).astype(float)
+    demandas[10] = capacidad + 1  # parada que no cabe en ningún vehículo
+    deposito = {"latitud": 14.5, "longitud": -90.5}
+    rutas, sin_asignar = planificar_entregas(
+        ids, latitudes, longitudes, demandas, vehiculos, capacidad, deposito, tiempo_total=0.5
+    )
+    planificados = [cliente_id for cliente_ids, _, _ in rutas for cliente_id in cliente_ids]
+    # Cada parada queda exactamente una vez: en una ruta o sin asignar
+    assert sorted(planificados + sin_asignar) == ids.tolist()
+    assert ids[10] in sin_asignar
+    assert len(rutas) <= vehiculos
+    por_id = dict(zip(ids.tolist(), demandas))
+    for cliente_ids, _, carga in rutas:
+        assert carga == sum(por_id[cliente_id] for cliente_id in cliente_ids)
+        assert carga <= capacidad
+    if vehiculos * capacidad >= demandas.sum():
+        assert sin_asignar == [ids[10]]
+
+def test_planificar_entregas_respeta_tiempo_total():
+    ids, latitudes, longitudes = _clientes(5, 4000)
+    demandas = np.ones(4000)
+    inicio = time.perf_counter()
+    rutas, sin_asignar = planificar_entregas(
+        ids, latitudes, longitudes, demandas, 200, 20, {"latitud": 14.5, "longitud": -90.5}, tiempo_total=0.5
+    )
+    assert time.perf_counter() - inicio < 1.5
+    assert sin_asignar == [] and len(rutas) == 200
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+import orjson
+import pytest
+from app.models import Cliente, DetallePedido, Pedido, Producto
+from app.models.pedido import EstadoPedido
+from app.routes.serializacion import FastJSONResponse, volcar
+from app.schemas.cliente import ClienteResponse
+from app.schemas.pedidos import PedidoResponse
+from app.schemas.producto import ProductoResponse
+
+UTC = datetime(2026, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)
+UTC_SIN_MICROS = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+LOCAL = datetime(2026, 1, 2, 3, 4, 5, 120000)
+
+def _cliente():
+    return Cliente(
+        id=1, nombre="Tienda", nit="123", direccion=None, telefono="555", contacto=None,
+        latitud=Decimal("14.600000"), longitud=Decimal("-90.500000"), direccion_geocodificada=None,
+        estado=True, created_at=UTC, updated_at=UTC_SIN_MICROS
+    )
+
+def _producto():
+    return Producto(
+        id=2, nombre="Café", sku="CAF-1", descripcion=None, precio=Decimal("10.50"), stock=7,
+        estado=True, created_at=LOCAL, updated_at=None
+    )
+
+def _pedido():
+    pedido = Pedido(
+        id=3, cliente_id=1, vendedor_id=4, fecha_pedido=UTC, total=Decimal("21.00"),
+        estado=EstadoPedido.PENDIENTE_ENTREGA, created_at=UTC_SIN_MICROS, updated_at=LOCAL
+    )
+    pedido.detalle_pedidos = [
+        DetallePedido(id=5, producto_id=2, cantidad=2, precio_unitario=Decimal("10.50"),
+                      subtotal=Decimal("21.00"), created_at=UTC)
+    ]
+    pedido.cliente = _cliente()
+    return pedido
+
+@pytest.mark.parametrize("esquema, crear", [
+    (ClienteResponse, _cliente),
+    (ProductoResponse, _producto),
+    (PedidoResponse, _pedido),
+])
+def test_volcar_igual_que_pydantic(esquema, crear):
+    objeto = crear()
+    esperado = esquema.model_validate(objeto).model_dump(mode="json")
+    rapido = orjson.loads(FastJSONResponse(volcar(esquema, objeto)).body)
+    assert rapido == esperado